@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+"""
+性能基准测试
+用法见各模块说明，例如 python -m benchmarks.image_benchmarks
+"""
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+ImageUtils 热点路径基准测试
+在多个常见尺寸上测量图像转换函数的耗时和峰值内存，并与保存的基线比较。
+
+用法:
+    python -m benchmarks.image_benchmarks                    # 运行并与基线比较，有回归时退出码为 1
+    python -m benchmarks.image_benchmarks --update-baseline  # 运行并把结果保存为新基线
+    python -m benchmarks.image_benchmarks -k thumbnail --sizes 1024x1536 -r 3
+
+峰值内存由 tracemalloc 统计，包含 base64 字符串、字节缓冲区等 Python 对象，
+不包含 Pillow 在 C 层分配的像素缓冲区。基线与机器相关，更换机器后应重新生成
+"""
+
+import argparse
+import base64
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from utils.image_utils import ImageUtils
+
+# 基线文件
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+# 默认测试尺寸：界面的两种比例和一个更大的尺寸
+DEFAULT_SIZES = ["1024x1536", "1536x1024", "2048x3072"]
+
+# 回归阈值：超过基线的倍数视为回归
+TIME_THRESHOLD = 1.5
+MEMORY_THRESHOLD = 1.25
+
+# 低于该耗时（毫秒）的差异视为测量噪声
+TIME_NOISE_FLOOR_MS = 2.0
+
+
+@contextlib.contextmanager
+def quiet_logging(level: int = logging.WARNING):
+    """测量期间只记录不低于 level 的日志，被测函数的信息日志不写入文件和控制台"""
+    root = logging.getLogger()
+    previous = root.level
+    root.setLevel(level)
+    try:
+        yield
+    finally:
+        root.setLevel(previous)
+
+
+def make_sample_image(size: Tuple[int, int]) -> Image.Image:
+    """
+    生成确定性的测试图像（渐变叠加噪声，PNG 压缩率接近真实的生成图像）
+
+    Args:
+        size: (宽, 高)
+
+    Returns:
+        RGB 图像
+    """
+    width, height = size
+    noise = Image.effect_noise((width, height), 48)
+    gradient = Image.linear_gradient("L").resize((width, height))
+    channels = [Image.blend(noise, gradient, alpha) for alpha in (0.3, 0.5, 0.7)]
+    return Image.merge("RGB", channels)
+
+
+def build_cases(b64_data: str, image: Image.Image, temp_dir: str) -> Dict[str, Callable[[], Any]]:
+    """
+    构建一个尺寸下的所有测试用例
+
+    Args:
+        b64_data: 测试图像的 base64 数据
+        image: 测试图像
+        temp_dir: 保存图像的临时目录
+
+    Returns:
+        函数名 -> 无参调用
+    """
+    save_path = os.path.join(temp_dir, "benchmark.png")
+    return {
+        "base64_to_tk_image": lambda: ImageUtils.base64_to_tk_image(b64_data, (160, 240)),
+        "base64_to_pil_image": lambda: ImageUtils.base64_to_pil_image(b64_data).load(),
+        "resize_image": lambda: ImageUtils.resize_image(b64_data, 800, 800),
+        "create_thumbnail": lambda: ImageUtils.create_thumbnail(b64_data),
+        "pil_to_base64": lambda: ImageUtils.pil_to_base64(image),
+        "save_base64_image": lambda: ImageUtils.save_base64_image(b64_data, save_path),
+        "get_image_info": lambda: ImageUtils.get_image_info(b64_data),
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """
+    测量函数的耗时和峰值内存
+
+    耗时取多次运行的中位数；峰值内存单独运行一次测量，避免 tracemalloc 的开销影响耗时
+
+    Args:
+        fn: 无参调用
+        repeat: 计时次数
+
+    Returns:
+        {"time_ms": 耗时中位数, "peak_kb": 峰值内存}
+    """
+    with quiet_logging():
+        fn()  # 预热
+        timings = []
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {"time_ms": round(statistics.median(timings), 3), "peak_kb": round(peak / 1024, 1)}
+
+
+def run_benchmarks(sizes: Optional[List[str]] = None, repeat: int = 5,
+                   keyword: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """
+    运行基准测试
+
+    Args:
+        sizes: 测试尺寸列表，如 ["1024x1536"]
+        repeat: 每个用例的计时次数
+        keyword: 只运行名称包含该字符串的用例
+
+    Returns:
+        "函数名[尺寸]" -> 测量结果
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for size in sizes or DEFAULT_SIZES:
+            width, height = (int(value) for value in size.lower().split("x", 1))
+            image = make_sample_image((width, height))
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG")
+            b64_data = base64.b64encode(buffer.getvalue()).decode("ascii")
+
+            for name, fn in build_cases(b64_data, image, temp_dir).items():
+                if keyword and keyword not in name:
+                    continue
+                results[f"{name}[{size}]"] = measure(fn, repeat)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            time_threshold: float = TIME_THRESHOLD,
+            memory_threshold: float = MEMORY_THRESHOLD) -> List[str]:
+    """
+    与基线比较，找出回归
+
+    Args:
+        results: 本次结果
+        baseline: 基线结果
+        time_threshold: 耗时回归倍数
+        memory_threshold: 峰值内存回归倍数
+
+    Returns:
+        回归说明列表，为空表示没有回归（基线中没有的用例不比较）
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if (result["time_ms"] > base["time_ms"] * time_threshold
+                and result["time_ms"] - base["time_ms"] > TIME_NOISE_FLOOR_MS):
+            regressions.append(f"{name}: 耗时 {result['time_ms']:.1f}ms，基线 {base['time_ms']:.1f}ms")
+        if result["peak_kb"] > base["peak_kb"] * memory_threshold:
+            regressions.append(f"{name}: 峰值内存 {result['peak_kb']:.0f}KB，基线 {base['peak_kb']:.0f}KB")
+    return regressions
+
+
+def load_baseline(path: str = BASELINE_FILE) -> Dict[str, Dict[str, float]]:
+    """加载基线结果，文件不存在时返回空字典"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("results", {})
+
+
+def save_baseline(results: Dict[str, Dict[str, float]], path: str = BASELINE_FILE) -> None:
+    """保存基线结果和运行环境信息"""
+    data = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "pillow": Image.__version__
+        },
+        "results": results
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write("\n")
+
+
+def format_report(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> str:
+    """格式化结果表格，包含与基线的比值"""
+    lines = [f"{'用例':<38} {'耗时(ms)':>10} {'峰值(KB)':>10} {'耗时/基线':>10}"]
+    for name, result in results.items():
+        base = baseline.get(name)
+        ratio = f"{result['time_ms'] / base['time_ms']:.2f}x" if base and base["time_ms"] else "-"
+        lines.append(f"{name:<38} {result['time_ms']:>10.2f} {result['peak_kb']:>10.0f} {ratio:>10}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    命令行入口
+
+    Args:
+        argv: 命令行参数
+
+    Returns:
+        退出码，有回归时为 1
+    """
+    parser = argparse.ArgumentParser(description="ImageUtils 热点路径基准测试")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="测试尺寸，如 1024x1536")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="每个用例的计时次数")
+    parser.add_argument("-k", "--keyword", help="只运行名称包含该字符串的用例")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="基线文件")
+    parser.add_argument("--update-baseline", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--time-threshold", type=float, default=TIME_THRESHOLD, help="耗时回归倍数")
+    parser.add_argument("--memory-threshold", type=float, default=MEMORY_THRESHOLD, help="峰值内存回归倍数")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.repeat, args.keyword)
+    baseline = load_baseline(args.baseline)
+    print(format_report(results, baseline))
+
+    if args.update_baseline:
+        merged = dict(baseline)
+        merged.update(results)
+        save_baseline(merged, args.baseline)
+        print(f"\n基线已保存: {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.time_threshold, args.memory_threshold)
+    if regressions:
+        print("\n性能回归:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    print("\n没有发现性能回归" if baseline else "\n没有基线，使用 --update-baseline 生成")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
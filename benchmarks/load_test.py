@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+端到端吞吐量和延迟压力测试
+在无界面模式下用 GenerationManager 驱动本地模拟图像服务，按并发数 × 批量大小的矩阵运行，
+统计每分钟图像数、单张完成延迟（从批次开始到图像处理完成）的 P50/P95/P99、峰值线程数和峰值内存。
+
+用法:
+    python -m benchmarks.load_test --concurrency 1 2 5 10 --batch-sizes 1 5 --batches 4
+    python -m benchmarks.load_test --latency 20 --distribution lognormal --spread 0.4 --error-rate 0.05
+    python -m benchmarks.load_test --parallel 3 --json results.json
+
+同时运行的批次数（--parallel）大于 1 时模拟多个窗口或批量任务共享同一个调度器
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.image_benchmarks import quiet_logging
+from utils.image_utils import ImageUtils
+from utils.latency_stats import nearest_rank
+from utils.mock_server import create_mock_server
+from utils.scheduler import GenerationScheduler
+
+# 资源采样间隔（秒）
+SAMPLE_INTERVAL = 0.05
+
+
+def percentile(values: List[float], percent: float) -> Optional[float]:
+    """
+    计算分位数（最近邻法）
+
+    Args:
+        values: 样本
+        percent: 分位数，0-100
+
+    Returns:
+        分位数，没有样本时返回 None
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[nearest_rank(len(ordered), percent)]
+
+
+def current_rss_kb() -> Optional[int]:
+    """
+    获取当前进程的常驻内存（KB）
+
+    Returns:
+        常驻内存，无法获取时返回 None
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 以字节为单位，Linux 以 KB 为单位
+        return peak // 1024 if sys.platform == "darwin" else peak
+    except (ImportError, OSError):
+        return None
+
+
+class ResourceSampler:
+    """后台采样线程数和常驻内存的峰值"""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak_threads = 0
+        self.peak_rss_kb: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="load-test-sampler", daemon=True)
+
+    def _sample(self) -> None:
+        self.peak_threads = max(self.peak_threads, threading.active_count())
+        rss = current_rss_kb()
+        if rss is not None:
+            self.peak_rss_kb = max(self.peak_rss_kb or 0, rss)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._sample()
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "ResourceSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def run_scenario(api_url: str, concurrency: int, batch_size: int, batches: int, parallel: int = 1,
+                 model: str = "sora_image", size: str = "1024x1536",
+                 batch_timeout: float = 600.0) -> Dict[str, Any]:
+    """
+    运行一个场景：parallel 个 GenerationManager 各自依次生成 batches 批，每批 batch_size 张
+
+    Args:
+        api_url: 模拟服务的接口地址
+        concurrency: 调度器的最大并发请求数
+        batch_size: 每批图像数
+        batches: 每个管理器生成的批数
+        parallel: 同时运行的管理器数
+        model: 模型名称
+        size: 图像尺寸
+        batch_timeout: 单批最长等待时间（秒）
+
+    Returns:
+        场景统计
+    """
+    from ui.widgets import GenerationManager
+
+    scheduler = GenerationScheduler(max_workers=concurrency, name="load-test")
+    lock = threading.Lock()
+    latencies: List[float] = []
+    failures = [0]
+
+    def image_utils_factory(api_key: str) -> ImageUtils:
+        image_utils = ImageUtils(api_key)
+        image_utils.api_url = api_url
+        return image_utils
+
+    def drive(worker: int) -> None:
+        for batch in range(batches):
+            finished = threading.Event()
+            started = time.perf_counter()
+
+            def on_complete(index, image_data, thumbnail=None, trace_span=None):
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+
+            def on_error(message):
+                with lock:
+                    failures[0] += 1
+
+            manager = GenerationManager(
+                None,
+                complete_callback=on_complete,
+                error_callback=on_error,
+                finished_callback=finished.set,
+                scheduler=scheduler,
+                image_utils_factory=image_utils_factory,
+                persist_latency=False
+            )
+            manager.start_generation(f"load test {worker}-{batch}", batch_size, "sk-load-test-key", size, model)
+            if not finished.wait(batch_timeout):
+                raise TimeoutError(f"批次超时: 管理器 {worker} 第 {batch + 1} 批")
+
+    drivers = [threading.Thread(target=drive, args=(worker,), name=f"load-test-driver-{worker + 1}")
+               for worker in range(max(1, parallel))]
+    with ResourceSampler() as sampler:
+        started = time.perf_counter()
+        for thread in drivers:
+            thread.start()
+        for thread in drivers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    scheduler.shutdown()
+
+    images = len(latencies)
+    return {
+        "concurrency": concurrency,
+        "batch_size": batch_size,
+        "parallel": parallel,
+        "images": images,
+        "failed": failures[0],
+        "elapsed": round(elapsed, 3),
+        "images_per_min": round(images / elapsed * 60, 1) if elapsed > 0 else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "peak_threads": sampler.peak_threads,
+        "peak_rss_mb": round(sampler.peak_rss_kb / 1024, 1) if sampler.peak_rss_kb else None
+    }
+
+
+def format_report(results: List[Dict[str, Any]]) -> str:
+    """格式化结果表格"""
+    def seconds(value):
+        return f"{value:.2f}" if value is not None else "-"
+
+    lines = [f"{'并发':>4} {'批量':>4} {'并行':>4} {'成功':>5} {'失败':>4} {'张/分钟':>8} "
+             f"{'P50(s)':>7} {'P95(s)':>7} {'P99(s)':>7} {'线程':>5} {'内存(MB)':>9}"]
+    for r in results:
+        lines.append(f"{r['concurrency']:>4} {r['batch_size']:>4} {r['parallel']:>4} {r['images']:>5} "
+                     f"{r['failed']:>4} {r['images_per_min']:>8.1f} {seconds(r['p50']):>7} "
+                     f"{seconds(r['p95']):>7} {seconds(r['p99']):>7} {r['peak_threads']:>5} "
+                     f"{r['peak_rss_mb'] if r['peak_rss_mb'] is not None else '-':>9}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    命令行入口
+
+    Args:
+        argv: 命令行参数
+
+    Returns:
+        退出码
+    """
+    parser = argparse.ArgumentParser(description="端到端吞吐量和延迟压力测试（使用本地模拟图像服务）")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 5, 10], help="调度器并发数")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 5], help="每批图像数")
+    parser.add_argument("--batches", type=int, default=4, help="每个管理器生成的批数")
+    parser.add_argument("--parallel", type=int, default=1, help="同时运行的管理器数")
+    parser.add_argument("--model", default="sora_image", help="模型名称")
+    parser.add_argument("--size", default="1024x1536", help="图像尺寸")
+    parser.add_argument("--latency", type=float, default=1.0, help="模拟生成耗时（秒）")
+    parser.add_argument("--distribution", default="fixed", help="延迟分布")
+    parser.add_argument("--spread", type=float, default=0.5, help="延迟分布宽度")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的比例")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="返回 429 的比例")
+    parser.add_argument("--payload-bytes", type=int, default=0, help="图像数据填充到的字节数")
+    parser.add_argument("--seed", type=int, default=1, help="随机数种子")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    server = create_mock_server(
+        "127.0.0.1", 0, args.latency,
+        latency_distribution=args.distribution,
+        latency_spread=args.spread,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        payload_bytes=args.payload_bytes,
+        seed=args.seed
+    )
+    threading.Thread(target=server.serve_forever, name="load-test-server", daemon=True).start()
+    host, port = server.server_address[:2]
+    api_url = f"http://{host}:{port}{server.path}"
+
+    results = []
+    print(format_report([]))
+    try:
+        for concurrency in args.concurrency:
+            for batch_size in args.batch_sizes:
+                # 每张图像的信息日志会淹没报告，压测时只保留警告和错误
+                with quiet_logging():
+                    result = run_scenario(api_url, concurrency, batch_size, args.batches, args.parallel,
+                                          args.model, args.size)
+                results.append(result)
+                print(format_report([result]).splitlines()[-1], flush=True)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print(f"\n模拟服务请求统计: {server.stats()}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"arguments": vars(args), "results": results}, f, indent=2, ensure_ascii=False)
+        print(f"结果已写入: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
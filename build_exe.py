@@ -5,12 +5,17 @@
 使用PyInstaller进行打包，针对CustomTkinter优化
 """
 
+import argparse
 import os
+import statistics
 import sys
 import subprocess
 import shutil
+import time
 from pathlib import Path
 
+from config.constants import STARTUP_CONFIG
+
 def check_pyinstaller():
     """检查PyInstaller是否已安装"""
     try:
@@ -41,71 +46,122 @@ def clean_build_dirs():
         print(f"🧹 删除文件: {spec_file}")
         os.remove(spec_file)
 
-def build_exe():
-    """构建exe文件"""
-    print("🚀 开始构建CustomTkinter版exe文件...")
-    
-    # PyInstaller命令参数
+# 打包出的程序名
+EXE_NAME = "AI图像生成器"
+
+# 打包模式
+#   onefile: 单个exe文件，便于分发，但每次启动都要把整个包解压到临时目录
+#   fast:    目录形式（onedir），启动时无需解压，字节码预先按 -OO 优化编译，冷启动最快
+BUILD_MODES = ["onefile", "fast"]
+
+# 从不导入、只是出现在 requirements.txt 中的依赖，打包时排除
+UNUSED_MODULES = ["openai"]
+
+# 快速启动模式额外排除的标准库模块（程序运行时不会用到）
+FAST_EXCLUDED_MODULES = ["unittest", "doctest", "pydoc", "pydoc_data", "lib2to3", "test"]
+
+# 启动耗时测量时设置该环境变量，程序在界面全部构建完成后退出
+EXIT_AFTER_START_ENV = STARTUP_CONFIG["exit_after_start_env"]
+
+
+def build_command(mode="onefile", dist_dir="dist"):
+    """
+    生成PyInstaller命令参数
+
+    Args:
+        mode: 打包模式，onefile 或 fast
+        dist_dir: 输出目录
+
+    Returns:
+        命令参数列表
+    """
+    if mode not in BUILD_MODES:
+        raise ValueError(f"未知的打包模式: {mode}，可选: {', '.join(BUILD_MODES)}")
+
+    root = os.path.abspath(".")
     cmd = [
         "pyinstaller",
-        "--onefile",                    # 打包成单个exe文件
+        "--onedir" if mode == "fast" else "--onefile",
         "--windowed",                   # 不显示控制台窗口
-        "--name=AI图像生成器",           # 设置exe文件名
-        "--icon=assets/icon.ico",       # 设置图标
-        "--add-data=assets;assets",     # 包含资源文件
-        
+        f"--name={EXE_NAME}",           # 设置exe文件名
+        f"--icon={os.path.join(root, 'assets', 'icon.ico')}",                          # 设置图标
+        f"--add-data={os.path.join(root, 'assets')}{os.pathsep}assets",              # 包含资源文件
+        f"--distpath={dist_dir}",
+        f"--workpath={os.path.join('build', mode)}",
+        f"--specpath={os.path.join('build', mode)}",
+
         # CustomTkinter相关隐藏导入
         "--hidden-import=customtkinter",
         "--hidden-import=tkinter",
         "--hidden-import=tkinter.ttk",
         "--hidden-import=tkinter.messagebox",
         "--hidden-import=tkinter.filedialog",
-        
+
         # PIL/Pillow相关
         "--hidden-import=PIL",
         "--hidden-import=PIL.Image",
         "--hidden-import=PIL.ImageTk",
         "--hidden-import=PIL._tkinter_finder",
-        
+
         # 网络和API相关
         "--hidden-import=requests",
         "--hidden-import=requests.adapters",
         "--hidden-import=requests.auth",
         "--hidden-import=urllib3",
-        "--hidden-import=openai",
-        
+
         # 基础功能模块
         "--hidden-import=json",
         "--hidden-import=base64",
         "--hidden-import=threading",
         "--hidden-import=uuid",
         "--hidden-import=datetime",
-        
-        # 排除不需要的大型模块
-        "--exclude-module=PyQt5",
-        "--exclude-module=PyQt6",
-        "--exclude-module=PySide2",
-        "--exclude-module=PySide6",
-        "--exclude-module=matplotlib",
-        "--exclude-module=numpy",
-        "--exclude-module=scipy",
-        "--exclude-module=pandas",
-        "--exclude-module=jupyter",
-        "--exclude-module=IPython",
-        "--exclude-module=notebook",
-        "--exclude-module=sphinx",
-        "--exclude-module=pytest",
-        "--exclude-module=setuptools",
-        "--exclude-module=wheel",
-        
+    ]
+
+    # 排除不需要的大型模块
+    excluded = [
+        "PyQt5", "PyQt6", "PySide2", "PySide6", "matplotlib", "numpy", "scipy", "pandas",
+        "jupyter", "IPython", "notebook", "sphinx", "pytest", "setuptools", "wheel"
+    ] + UNUSED_MODULES
+    if mode == "fast":
+        excluded += FAST_EXCLUDED_MODULES
+        # 预先编译优化后的字节码（去掉 assert 和文档字符串），需要 PyInstaller 6.0+
+        cmd.append("--optimize=2")
+    cmd += [f"--exclude-module={name}" for name in excluded]
+
+    cmd += [
         "--clean",                      # 清理临时文件
         "--noconfirm",                  # 不询问确认
-        "main.py"                       # 主程序文件
+        os.path.join(root, "main.py")   # 主程序文件
     ]
-    
+    return cmd
+
+
+def exe_path(mode="onefile", dist_dir="dist"):
+    """获取打包出的可执行文件路径"""
+    file_name = EXE_NAME + (".exe" if sys.platform == "win32" else "")
+    if mode == "fast":
+        return os.path.join(dist_dir, EXE_NAME, file_name)
+    return os.path.join(dist_dir, file_name)
+
+
+def bundle_size(mode="onefile", dist_dir="dist"):
+    """获取打包结果的总大小（字节），目录形式时统计整个目录"""
+    path = exe_path(mode, dist_dir)
+    if mode != "fast":
+        return os.path.getsize(path)
+    total = 0
+    for dir_path, _, file_names in os.walk(os.path.dirname(path)):
+        total += sum(os.path.getsize(os.path.join(dir_path, name)) for name in file_names)
+    return total
+
+
+def build_exe(mode="onefile", dist_dir="dist"):
+    """构建exe文件"""
+    print(f"🚀 开始构建CustomTkinter版exe文件（{mode} 模式）...")
+
     try:
         # 执行PyInstaller命令
-        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+        subprocess.run(build_command(mode, dist_dir), check=True, capture_output=True, text=True)
         print("✅ exe文件构建成功！")
         return True
     except subprocess.CalledProcessError as e:
@@ -113,7 +169,56 @@ def build_exe():
         print(f"错误输出: {e.stderr}")
         return False
 
-def create_installer():
+
+def measure_launch(command, runs=5, timeout=120):
+    """
+    测量程序从启动到界面全部构建完成的耗时
+
+    程序在设置了 EXIT_AFTER_START_ENV 时会在界面创建完成后立即退出，
+    因此进程的运行时间即为启动耗时（onefile 模式包含解压时间）
+
+    Args:
+        command: 启动命令参数列表
+        runs: 测量次数
+        timeout: 单次最长等待时间（秒）
+
+    Returns:
+        每次的耗时（秒）列表
+    """
+    env = dict(os.environ, **{EXIT_AFTER_START_ENV: "1"})
+    timings = []
+    for _ in range(max(1, runs)):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, check=True, timeout=timeout,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def compare_modes(runs=5):
+    """
+    分别以各个模式打包，比较体积和启动耗时
+
+    Args:
+        runs: 每个模式的启动次数
+
+    Returns:
+        全部模式打包成功返回 True
+    """
+    results = []
+    for mode in BUILD_MODES:
+        dist_dir = os.path.join("dist", mode)
+        if not build_exe(mode, dist_dir):
+            return False
+        timings = measure_launch([exe_path(mode, dist_dir)], runs)
+        results.append((mode, bundle_size(mode, dist_dir), timings))
+
+    print(f"\n{'模式':<10} {'体积(MB)':>10} {'启动中位数(s)':>14} {'最快(s)':>9}")
+    for mode, size, timings in results:
+        print(f"{mode:<10} {size / (1024 * 1024):>10.1f} {statistics.median(timings):>14.2f} {min(timings):>9.2f}")
+    return True
+
+def create_installer(mode="onefile"):
     """创建安装包（可选）"""
     print("📦 创建安装包...")
     
@@ -154,6 +259,13 @@ Name: "{commondesktop}\\AI图像生成器"; Filename: "{app}\\AI图像生成器.
 Filename: "{app}\\AI图像生成器.exe"; Description: "{cm:LaunchProgram,AI图像生成器}"; Flags: nowait postinstall skipifsilent
 """
         
+        if mode == "fast":
+            # 目录形式需要安装整个目录
+            inno_script = inno_script.replace(
+                'Source: "dist\\AI图像生成器.exe"; DestDir: "{app}"; Flags: ignoreversion',
+                'Source: "dist\\AI图像生成器\\*"; DestDir: "{app}"; Flags: ignoreversion recursesubdirs createallsubdirs'
+            )
+        
         with open("installer.iss", "w", encoding="utf-8") as f:
             f.write(inno_script)
         
@@ -169,6 +281,13 @@ Filename: "{app}\\AI图像生成器.exe"; Description: "{cm:LaunchProgram,AI图
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="AI图像生成器打包工具")
+    parser.add_argument("--mode", choices=BUILD_MODES, default="onefile",
+                        help="onefile: 单个exe；fast: 目录形式 + 优化字节码，启动最快")
+    parser.add_argument("--compare", action="store_true", help="分别以各个模式打包并比较体积和启动耗时")
+    parser.add_argument("--runs", type=int, default=5, help="比较启动耗时时每个模式的启动次数")
+    args = parser.parse_args()
+    
     print("🎨 AI图像生成器 - CustomTkinter版打包工具")
     print("=" * 60)
     print("🔧 新技术栈: CustomTkinter + PIL + Requests")
@@ -188,15 +307,20 @@ def main():
     # 清理之前的构建
     clean_build_dirs()
     
+    if args.compare:
+        if not compare_modes(args.runs):
+            print("❌ 打包失败，请检查错误信息")
+        return
+    
     # 构建exe
-    if build_exe():
+    if build_exe(args.mode):
         print("\n🎉 打包完成！")
-        print("📁 exe文件位置: dist/AI图像生成器.exe")
+        path = exe_path(args.mode)
+        print(f"📁 exe文件位置: {path}")
         
         # 检查文件大小
-        exe_path = "dist/AI图像生成器.exe"
-        if os.path.exists(exe_path):
-            size_mb = os.path.getsize(exe_path) / (1024 * 1024)
+        if os.path.exists(path):
+            size_mb = bundle_size(args.mode) / (1024 * 1024)
             print(f"📊 exe文件大小: {size_mb:.1f} MB")
             
             if size_mb < 30:
@@ -207,10 +331,13 @@ def main():
                 print("⚠️ 体积较大，建议进一步优化")
         
         # 尝试创建安装包
-        create_installer()
+        create_installer(args.mode)
         
         print("\n📋 使用说明:")
-        print("1. 将生成的exe文件复制到目标机器")
+        if args.mode == "fast":
+            print("1. 将整个 dist/AI图像生成器 目录复制到目标机器")
+        else:
+            print("1. 将生成的exe文件复制到目标机器")
         print("2. 确保目标机器有网络连接（用于调用API）")
         print("3. 首次运行时需要配置API Key")
         print("4. 可选：将assets文件夹与exe文件放在同一目录")
@@ -72,7 +72,6 @@ def build_exe():
         "--hidden-import=urllib3",
         
         # 基本依赖
-        "--hidden-import=openai",
         "--hidden-import=json",
         "--hidden-import=base64",
         "--hidden-import=threading",
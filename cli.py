@@ -0,0 +1,597 @@
+# -*- coding: utf-8 -*-
+"""
+命令行（无界面）模式
+在没有显示环境的服务器上批量生成图像，不导入 customtkinter/tkinter
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List, Optional
+
+from config.constants import (
+    API_CONFIG, CLI_CONFIG, GENERATION_CONFIG, JOB_CONFIG, METRICS_CONFIG, MOCK_SERVER_CONFIG, PERFORMANCE,
+    RESPONSE_CACHE_CONFIG, SERVICE_CONFIG, STARTUP_CONFIG, SWEEP_CONFIG
+)
+from utils.logger import get_logger, log_exception
+
+logger = get_logger(__name__)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    构建命令行参数解析器
+
+    Returns:
+        参数解析器
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="AI 图像生成器命令行模式"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    generate_parser = subparsers.add_parser("generate", help="批量生成图像")
+    generate_parser.add_argument("prompts", nargs="*",
+                                 help="图像描述文本，使用 - 表示从标准输入读取")
+    generate_parser.add_argument("-f", "--file", action="append", default=[],
+                                 help="提示词文件（每行一条），使用 - 表示标准输入，可重复指定")
+    _add_generation_arguments(generate_parser)
+    generate_parser.set_defaults(handler=run_generate)
+
+    jobs_parser = subparsers.add_parser("run-jobs", help="运行提示词任务文件，中断后可续跑")
+    jobs_parser.add_argument("job_file", help="JSONL、JSON 或 CSV 任务文件，每行可指定 prompt/model/size/count")
+    jobs_parser.add_argument("--journal", default=None,
+                             help="任务日志路径，默认为输出目录下的 " + JOB_CONFIG["journal_file"])
+    jobs_parser.add_argument("--max-attempts", type=_positive_int, default=JOB_CONFIG["max_attempts"],
+                             help="每个任务本次运行的最大尝试次数")
+    _add_generation_arguments(jobs_parser)
+    jobs_parser.set_defaults(handler=run_jobs)
+
+    sweep_parser = subparsers.add_parser("sweep", help="提示词 × 模型 × 尺寸矩阵对比")
+    sweep_parser.add_argument("prompts", nargs="*",
+                              help="图像描述文本，使用 - 表示从标准输入读取")
+    sweep_parser.add_argument("-f", "--file", action="append", default=[],
+                              help="提示词文件（每行一条），使用 - 表示标准输入，可重复指定")
+    sweep_parser.add_argument("--models", nargs="+", default=list(API_CONFIG["models"].keys()),
+                              choices=list(API_CONFIG["models"].keys()), help="参与对比的模型")
+    sweep_parser.add_argument("--sizes", nargs="+", default=list(API_CONFIG["sizes"].keys()),
+                              choices=list(API_CONFIG["sizes"].keys()), help="参与对比的尺寸")
+    sweep_parser.add_argument("-r", "--repeats", type=_positive_int,
+                              default=SWEEP_CONFIG["default_repeats"],
+                              help="每个组合的重复次数")
+    sweep_parser.add_argument("--max-attempts", type=_positive_int, default=JOB_CONFIG["max_attempts"],
+                              help="每个任务的最大尝试次数")
+    _add_runtime_arguments(sweep_parser)
+    sweep_parser.set_defaults(handler=run_sweep)
+
+    serve_parser = subparsers.add_parser("serve", help="启动本地 HTTP 任务服务")
+    serve_parser.add_argument("--host", default=SERVICE_CONFIG["host"], help="监听地址")
+    serve_parser.add_argument("--port", type=int, default=SERVICE_CONFIG["port"], help="监听端口")
+    _add_runtime_arguments(serve_parser, with_output=False)
+    serve_parser.set_defaults(handler=run_serve)
+
+    mock_parser = subparsers.add_parser("mock-server", help="启动本地模拟图像服务（离线开发和测试用）")
+    mock_parser.add_argument("--host", default=MOCK_SERVER_CONFIG["host"], help="监听地址")
+    mock_parser.add_argument("--port", type=int, default=MOCK_SERVER_CONFIG["port"], help="监听端口")
+    mock_parser.add_argument("--latency", type=float, default=MOCK_SERVER_CONFIG["latency"],
+                             help="每张图像的模拟生成耗时（秒），随机分布时为均值")
+    mock_parser.add_argument("--latency-distribution", default=MOCK_SERVER_CONFIG["latency_distribution"],
+                             help="延迟分布: fixed、uniform、normal、lognormal 或 exponential")
+    mock_parser.add_argument("--latency-spread", type=float, default=MOCK_SERVER_CONFIG["latency_spread"],
+                             help="延迟分布宽度（uniform/normal 为相对均值的比例，lognormal 为 sigma）")
+    mock_parser.add_argument("--error-rate", type=_rate, default=MOCK_SERVER_CONFIG["error_rate"],
+                             help="返回 500 的比例 (0-1)")
+    mock_parser.add_argument("--rate-limit-rate", type=_rate, default=MOCK_SERVER_CONFIG["rate_limit_rate"],
+                             help="返回 429 的比例 (0-1)")
+    mock_parser.add_argument("--partial-rate", type=_rate, default=MOCK_SERVER_CONFIG["partial_rate"],
+                             help="响应被截断的比例 (0-1)")
+    mock_parser.add_argument("--payload-bytes", type=int, default=MOCK_SERVER_CONFIG["payload_bytes"],
+                             help="图像数据至少填充到的字节数")
+    mock_parser.add_argument("--seed", type=int, default=MOCK_SERVER_CONFIG["seed"],
+                             help="随机数种子，设置后结果可复现")
+    mock_parser.set_defaults(handler=run_mock_server)
+
+    profile_parser = subparsers.add_parser("profile-startup", help="分析图形界面冷启动的模块导入耗时")
+    profile_parser.add_argument("--module", default=STARTUP_CONFIG["profile_module"], help="入口模块")
+    profile_parser.add_argument("--top", type=_positive_int, default=20, help="显示自身耗时最多的模块数")
+    profile_parser.set_defaults(handler=run_profile_startup)
+
+    metrics_parser = subparsers.add_parser("metrics", help="按模型和尺寸汇总上次运行的请求数、错误率和延迟分位数")
+    metrics_parser.add_argument("--file", default=METRICS_CONFIG["json_file"], help="指标 JSON 快照路径")
+    metrics_parser.set_defaults(handler=run_metrics)
+
+    return parser
+
+
+def _add_generation_arguments(parser: argparse.ArgumentParser) -> None:
+    """添加模型、尺寸、数量以及运行相关的通用参数"""
+    parser.add_argument("-m", "--model", default=GENERATION_CONFIG["default_model"],
+                        choices=list(API_CONFIG["models"].keys()), help="使用的模型")
+    parser.add_argument("-s", "--size", default=GENERATION_CONFIG["default_size"],
+                        choices=list(API_CONFIG["sizes"].keys()), help="图像尺寸")
+    parser.add_argument("-n", "--count", type=_positive_int, default=CLI_CONFIG["default_count"],
+                        help="每条提示词生成的图像数量")
+    _add_runtime_arguments(parser)
+
+
+def _add_runtime_arguments(parser: argparse.ArgumentParser, with_output: bool = True) -> None:
+    """添加输出目录、并发和 API 相关的通用参数"""
+    if with_output:
+        parser.add_argument("-o", "--output-dir", default=CLI_CONFIG["default_output_dir"],
+                            help="图像输出目录")
+    parser.add_argument("-j", "--concurrency", type=_positive_int,
+                        default=PERFORMANCE["max_concurrent_generations"],
+                        help="最大并发请求数")
+    parser.add_argument("--api-key", action="append", default=[],
+                        help="API Key，可重复指定组成 Key 池；默认读取配置文件或 OPENAI_API_KEY 环境变量")
+    parser.add_argument("--api-url", action="append", default=[],
+                        help="API URL，可重复指定多个兼容端点（自动按延迟路由和故障切换）；默认读取配置文件")
+    parser.add_argument("--hedge", action="store_true",
+                        help="启用对冲请求：耗时超过近期延迟分位数时发出重复请求，采用先完成的结果")
+    parser.add_argument("--cache", action="store_true",
+                        help="启用响应缓存：完整请求数据相同时直接返回磁盘上的结果（同一批中的各张图像分别缓存）")
+    parser.add_argument("--cache-dir", default=None,
+                        help=f"响应缓存目录（默认 {RESPONSE_CACHE_CONFIG['directory']}，指定时自动启用缓存）")
+
+
+def _positive_int(value: str) -> int:
+    """argparse 类型：正整数"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"不是有效的整数: {value}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"必须大于 0: {value}")
+    return number
+
+
+def _rate(value: str) -> float:
+    """argparse 类型：0 到 1 之间的比例"""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"不是有效的数字: {value}")
+    if not 0 <= number <= 1:
+        raise argparse.ArgumentTypeError(f"必须在 0 到 1 之间: {value}")
+    return number
+
+
+def read_prompt_lines(lines) -> List[str]:
+    """
+    从文本行中读取提示词，忽略空行和以 # 开头的注释行
+
+    Args:
+        lines: 可迭代的文本行
+
+    Returns:
+        提示词列表
+    """
+    prompts = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            prompts.append(line)
+    return prompts
+
+
+def collect_prompts(args: argparse.Namespace, stdin=None) -> List[str]:
+    """
+    汇总命令行参数、提示词文件和标准输入中的提示词
+
+    Args:
+        args: 解析后的命令行参数
+        stdin: 标准输入流，默认使用 sys.stdin
+
+    Returns:
+        提示词列表
+    """
+    stdin = stdin or sys.stdin
+    prompts: List[str] = []
+    stdin_used = False
+
+    for prompt in args.prompts:
+        if prompt == "-":
+            if not stdin_used:
+                prompts.extend(read_prompt_lines(stdin))
+                stdin_used = True
+        elif prompt.strip():
+            prompts.append(prompt.strip())
+
+    for file_path in args.file:
+        if file_path == "-":
+            if not stdin_used:
+                prompts.extend(read_prompt_lines(stdin))
+                stdin_used = True
+            continue
+        with open(file_path, "r", encoding="utf-8") as f:
+            prompts.extend(read_prompt_lines(f))
+
+    # 未提供任何提示词且标准输入为管道时，从标准输入读取
+    if not prompts and not stdin_used and not stdin.isatty():
+        prompts.extend(read_prompt_lines(stdin))
+
+    return prompts
+
+
+def build_output_path(output_dir: str, prompt_index: int, image_index: int,
+                      model: str, size: str) -> str:
+    """
+    构建输出文件路径
+
+    Args:
+        output_dir: 输出目录
+        prompt_index: 提示词序号
+        image_index: 该提示词下的图像序号
+        model: 模型名称
+        size: 图像尺寸
+
+    Returns:
+        输出文件路径
+    """
+    filename = CLI_CONFIG["filename_template"].format(
+        prompt_index=prompt_index,
+        image_index=image_index,
+        model=model,
+        size=size
+    )
+    return os.path.join(output_dir, filename)
+
+
+def run_generate(args: argparse.Namespace) -> int:
+    """
+    执行批量生成
+
+    Args:
+        args: 解析后的命令行参数
+
+    Returns:
+        进程退出码，全部成功返回 0，部分失败返回 1，参数错误返回 2
+    """
+    from utils.exceptions import ValidationException
+    from utils.image_utils import ImageUtils
+    from utils.scheduler import GenerationScheduler
+    from utils.validators import InputValidator
+
+    try:
+        prompts = collect_prompts(args)
+        if not prompts:
+            print("没有可用的提示词，请通过参数、--file 或标准输入提供", file=sys.stderr)
+            return 2
+        for prompt in prompts:
+            InputValidator.validate_prompt(prompt)
+        for api_url in args.api_url:
+            InputValidator.validate_url(api_url)
+    except (OSError, ValidationException) as e:
+        print(f"参数错误: {e}", file=sys.stderr)
+        return 2
+
+    image_utils = _create_image_utils(args)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    total = len(prompts) * args.count
+    logger.info(f"命令行批量生成: {len(prompts)} 条提示词 x {args.count} 张, "
+                f"模型: {args.model}, 尺寸: {args.size}, 并发: {args.concurrency}")
+
+    scheduler = GenerationScheduler(max_workers=args.concurrency, name="cli", reserved_interactive=0)
+    tasks = []
+    start_time = time.time()
+    for prompt_index, prompt in enumerate(prompts):
+        for image_index in range(args.count):
+            output_path = build_output_path(args.output_dir, prompt_index, image_index,
+                                            args.model, args.size)
+            future = scheduler.submit_generation(image_utils, prompt, args.size, args.model, index=image_index)
+            tasks.append((future, output_path))
+
+    succeeded = 0
+    try:
+        for done, (future, output_path) in enumerate(tasks, start=1):
+            result = scheduler.get_result(future)
+            if result and ImageUtils.save_base64_image(result, output_path):
+                succeeded += 1
+                print(f"[{done}/{total}] ✅ {output_path}")
+            else:
+                print(f"[{done}/{total}] ❌ 生成失败: {output_path}", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("用户中断，正在取消剩余任务...", file=sys.stderr)
+        scheduler.shutdown(wait=False, cancel_pending=True)
+        return 130
+    else:
+        scheduler.shutdown()
+
+    duration = time.time() - start_time
+    print(f"完成: {succeeded}/{total} 张图像，耗时 {duration:.1f}s，输出目录: {args.output_dir}")
+    return 0 if succeeded == total else 1
+
+
+def _create_image_utils(args: argparse.Namespace):
+    """根据命令行参数创建 ImageUtils 实例"""
+    from utils.image_utils import ImageUtils
+    from utils.key_pool import APIKeyPool
+
+    key_pool = APIKeyPool(args.api_key) if args.api_key else None
+    image_utils = ImageUtils(key_pool=key_pool)
+    if args.api_url:
+        image_utils.api_urls = args.api_url
+    if args.hedge:
+        image_utils.enable_hedging()
+    if args.cache or args.cache_dir:
+        image_utils.enable_response_cache(args.cache_dir)
+    return image_utils
+
+
+def run_jobs(args: argparse.Namespace) -> int:
+    """
+    运行提示词任务文件
+
+    Args:
+        args: 解析后的命令行参数
+
+    Returns:
+        进程退出码，全部成功返回 0，部分失败返回 1，参数错误返回 2
+    """
+    from utils.exceptions import FileOperationException, ValidationException
+    from utils.job_runner import JobJournal, JobRunner, load_job_file
+    from utils.scheduler import GenerationScheduler
+    from utils.validators import InputValidator
+
+    try:
+        tasks = load_job_file(args.job_file, default_model=args.model,
+                              default_size=args.size, default_count=args.count)
+        for api_url in args.api_url:
+            InputValidator.validate_url(api_url)
+    except (FileOperationException, ValidationException) as e:
+        print(f"参数错误: {e}", file=sys.stderr)
+        return 2
+
+    journal_path = args.journal or os.path.join(args.output_dir, JOB_CONFIG["journal_file"])
+    journal = JobJournal(journal_path)
+    scheduler = GenerationScheduler(max_workers=args.concurrency, name="jobs", reserved_interactive=0)
+
+    def on_progress(task, state, done, total):
+        mark = "✅" if state == "done" else "❌"
+        print(f"[{done}/{total}] {mark} {task.task_id} ({task.model}, {task.size})",
+              file=sys.stdout if state == "done" else sys.stderr)
+
+    runner = JobRunner(tasks, journal, args.output_dir, _create_image_utils(args), scheduler,
+                       max_attempts=args.max_attempts, progress_callback=on_progress)
+    try:
+        summary = runner.run()
+    except KeyboardInterrupt:
+        print("用户中断，已完成的任务记录在日志中，重新运行即可续跑", file=sys.stderr)
+        scheduler.shutdown(wait=False, cancel_pending=True)
+        journal.close()
+        return 130
+
+    scheduler.shutdown()
+    journal.close()
+    print(f"完成: 成功 {summary['succeeded']}，失败 {summary['failed']}，"
+          f"跳过已完成 {summary['skipped']}，共 {summary['total']} 个任务，日志: {journal_path}")
+    return 0 if summary["failed"] == 0 else 1
+
+
+def run_sweep(args: argparse.Namespace) -> int:
+    """
+    执行矩阵对比：展开、去重、按模型交错调度，并实时更新对比网格
+
+    Args:
+        args: 解析后的命令行参数
+
+    Returns:
+        进程退出码，全部成功返回 0，部分失败返回 1，参数错误返回 2
+    """
+    from utils.exceptions import ValidationException
+    from utils.job_runner import JobJournal, JobRunner
+    from utils.scheduler import GenerationScheduler
+    from utils.sweep import SweepGrid, expand_matrix, interleave_tasks
+    from utils.validators import InputValidator
+
+    try:
+        prompts = collect_prompts(args)
+        if not prompts:
+            print("没有可用的提示词，请通过参数、--file 或标准输入提供", file=sys.stderr)
+            return 2
+        for prompt in prompts:
+            InputValidator.validate_prompt(prompt)
+        for api_url in args.api_url:
+            InputValidator.validate_url(api_url)
+    except (OSError, ValidationException) as e:
+        print(f"参数错误: {e}", file=sys.stderr)
+        return 2
+
+    tasks = expand_matrix(prompts, args.models, args.sizes, args.repeats)
+    requested = len(prompts) * len(args.models) * len(args.sizes) * args.repeats
+    if requested > len(tasks):
+        print(f"已去除 {requested - len(tasks)} 个重复组合")
+    tasks = interleave_tasks(tasks)
+
+    grid = SweepGrid(tasks, args.output_dir)
+    journal = JobJournal(os.path.join(args.output_dir, JOB_CONFIG["journal_file"]))
+    scheduler = GenerationScheduler(max_workers=args.concurrency, name="sweep", reserved_interactive=0)
+    runner = JobRunner(tasks, journal, args.output_dir, _create_image_utils(args), scheduler,
+                       max_attempts=args.max_attempts)
+
+    def on_progress(task, state, done, total):
+        grid.update(task, runner.output_path(task) if state == "done" else None)
+        mark = "✅" if state == "done" else "❌"
+        print(f"[{done}/{total}] {mark} {task.model} {task.size} {task.prompt[:40]}")
+
+    runner.progress_callback = on_progress
+    # 续跑时已完成的任务直接填入网格
+    for task in tasks:
+        if runner.is_completed(task):
+            grid.update(task, runner.output_path(task))
+    grid.flush()
+    print(f"对比网格: {grid.html_path}")
+
+    try:
+        summary = runner.run()
+    except KeyboardInterrupt:
+        print("用户中断，重新运行同一命令即可续跑", file=sys.stderr)
+        grid.flush()
+        scheduler.shutdown(wait=False, cancel_pending=True)
+        journal.close()
+        return 130
+
+    scheduler.shutdown()
+    journal.close()
+    grid.flush()
+    sheet_path = grid.render_contact_sheet()
+    print(f"完成: 成功 {summary['succeeded']}，失败 {summary['failed']}，"
+          f"跳过已完成 {summary['skipped']}，共 {summary['total']} 个组合")
+    if sheet_path:
+        print(f"对比图: {sheet_path}")
+    return 0 if summary["failed"] == 0 else 1
+
+
+def run_serve(args: argparse.Namespace) -> int:
+    """
+    启动本地 HTTP 任务服务，直到收到中断信号
+
+    Args:
+        args: 解析后的命令行参数
+
+    Returns:
+        进程退出码
+    """
+    from utils.job_service import JobService, create_server
+    from utils.scheduler import GenerationScheduler
+
+    scheduler = GenerationScheduler(max_workers=args.concurrency, name="service")
+    service = JobService(_create_image_utils(args), scheduler)
+    server = create_server(service, args.host, args.port)
+    host, port = server.server_address[:2]
+    print(f"任务服务已启动: http://{host}:{port} （并发上限 {args.concurrency}，Ctrl+C 停止）")
+    logger.info(f"任务服务已启动: http://{host}:{port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("正在停止任务服务...", file=sys.stderr)
+    finally:
+        server.server_close()
+        scheduler.shutdown(wait=False, cancel_pending=True)
+    return 0
+
+
+def run_mock_server(args: argparse.Namespace) -> int:
+    """
+    启动本地模拟图像服务，直到收到中断信号
+
+    Args:
+        args: 解析后的命令行参数
+
+    Returns:
+        进程退出码
+    """
+    from utils.mock_server import create_mock_server
+
+    try:
+        server = create_mock_server(
+            args.host, args.port, args.latency,
+            latency_distribution=args.latency_distribution,
+            latency_spread=args.latency_spread,
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+            partial_rate=args.partial_rate,
+            payload_bytes=args.payload_bytes,
+            seed=args.seed
+        )
+    except ValueError as e:
+        print(f"参数错误: {e}", file=sys.stderr)
+        return 2
+    host, port = server.server_address[:2]
+    print(f"模拟图像服务已启动: http://{host}:{port}{server.path} （Ctrl+C 停止）")
+    logger.info(f"模拟图像服务已启动: http://{host}:{port}{server.path}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("正在停止模拟图像服务...", file=sys.stderr)
+    finally:
+        server.server_close()
+    return 0
+
+
+def run_profile_startup(args: argparse.Namespace) -> int:
+    """
+    在新的解释器中导入入口模块，打印导入耗时分析
+
+    Args:
+        args: 解析后的命令行参数
+
+    Returns:
+        进程退出码，超过启动耗时上限或提前加载了应延迟导入的模块时为 1
+    """
+    from utils.startup_profile import format_profile, profile_import
+
+    profile = profile_import(args.module)
+    print(format_profile(profile, args.top))
+    eager = [name for name in STARTUP_CONFIG["deferred_modules"] if name in profile["loaded"]]
+    return 0 if profile["total_ms"] <= STARTUP_CONFIG["import_budget_ms"] and not eager else 1
+
+
+def run_metrics(args: argparse.Namespace) -> int:
+    """
+    读取指标 JSON 快照，打印每个模型和尺寸的生成汇总
+
+    Args:
+        args: 解析后的命令行参数
+
+    Returns:
+        进程退出码，快照不存在或无法解析时为 1
+    """
+    import json
+
+    from utils.metrics import format_generation_summary, generation_summary
+
+    try:
+        with open(args.file, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"无法读取指标快照 {args.file}: {e}", file=sys.stderr)
+        return 1
+    print(format_generation_summary(generation_summary(snapshot)))
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    命令行入口
+
+    Args:
+        argv: 命令行参数列表，默认使用 sys.argv[1:]
+
+    Returns:
+        进程退出码
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not getattr(args, "handler", None):
+        parser.print_help()
+        return 2
+
+    try:
+        return args.handler(args)
+    except Exception as e:
+        log_exception(logger, e, "命令行模式执行失败")
+        print(f"执行失败: {e}", file=sys.stderr)
+        return 1
+    finally:
+        _export_diagnostics()
+
+
+def _export_diagnostics() -> None:
+    """本次运行记录了指标或追踪区间时写出快照（只读命令不覆盖上次的快照）"""
+    from utils.metrics import export_metrics, metrics
+    from utils.tracing import tracer
+
+    if len(metrics):
+        export_metrics()
+    if len(tracer):
+        tracer.export_chrome_trace()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -26,7 +26,26 @@ __all__ = [
     'PLACEHOLDERS',
     'VALIDATION',
     'PERFORMANCE',
+    'SCHEDULER_CONFIG',
+    'PIPELINE_CONFIG',
+    'STARTUP_CONFIG',
     'LOG_CONFIG',
+    'CLI_CONFIG',
+    'JOB_CONFIG',
+    'SWEEP_CONFIG',
+    'SERVICE_CONFIG',
+    'KEY_POOL_CONFIG',
+    'ROUTER_CONFIG',
+    'LATENCY_CONFIG',
+    'ETA_CONFIG',
+    'HEDGE_CONFIG',
+    'CIRCUIT_BREAKER_CONFIG',
+    'DEADLINE_CONFIG',
+    'RESPONSE_CACHE_CONFIG',
+    'STREAMING_CONFIG',
+    'MOCK_SERVER_CONFIG',
+    'METRICS_CONFIG',
+    'TRACING_CONFIG',
     
     # 消息字典
     'ERROR_MESSAGES',
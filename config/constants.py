@@ -58,7 +58,9 @@ COLORS = {
 # API 配置
 API_CONFIG = {
     "default_url": "https://api.apicore.ai/v1/images/generations",
-    "timeout": 300,  # 5分钟
+    "connect_timeout": 10,  # 秒，建立连接的超时，端点不可达时几秒内失败
+    "first_byte_timeout": 300,  # 秒，等待响应开始的超时（图像在此期间生成），自适应模式下的上限
+    "total_timeout": 360,  # 秒，整个请求（含下载响应体）的截止时间
     "max_retries": 3,
     "models": {
         "sora_image": "Sora",
@@ -121,7 +123,9 @@ ERROR_MESSAGES = {
     "config_load_failed": "配置文件加载失败",
     "config_save_failed": "配置文件保存失败",
     "invalid_response": "API 响应格式无效",
-    "generation_failed": "图像生成失败"
+    "generation_failed": "图像生成失败",
+    "circuit_open": "API 服务暂时不可用，请稍后重试",
+    "request_cancelled": "请求已取消"
 }
 
 # 成功消息
@@ -149,7 +153,13 @@ LOG_CONFIG = {
     "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     "max_size": 10 * 1024 * 1024,  # 10MB
     "backup_count": 5,
-    "encoding": "utf-8"
+    "encoding": "utf-8",
+    # 异步日志：调用方只把记录放入队列，由后台线程写文件和控制台
+    "async": True,
+    "queue_size": 10000,  # 队列容量，满时按 overflow_policy 处理
+    "overflow_policy": "drop_oldest",  # drop_oldest、drop_new 或 block
+    "block_level": "ERROR",  # 不低于该级别的日志在队列满时等待而不是丢弃
+    "block_timeout": 1.0  # 秒，等待队列空位的最长时间，超时后仍然丢弃
 }
 
 # 字体配置
@@ -209,4 +219,174 @@ PERFORMANCE = {
     "max_concurrent_generations": 5,
     "image_load_timeout": 30,
     "ui_update_interval": 100  # 毫秒
-} 
\ No newline at end of file
+} 
+
+# 生成结果处理流水线配置（网络请求之后的解码 → 缩略图 → 显示 → 保存）
+PIPELINE_CONFIG = {
+    "queue_size": 4,  # 每个阶段的输入队列容量，队列满时上游等待，限制内存中堆积的图像
+    "decode_workers": 2,
+    "thumbnail_workers": 2,
+    "persist_workers": 1
+}
+
+# 启动耗时配置
+STARTUP_CONFIG = {
+    "profile_module": "ui.main_window",  # 启动耗时分析的入口模块
+    "import_budget_ms": 250,  # 入口模块冷启动导入耗时上限（毫秒）
+    # 测试中的相对上限：入口模块导入耗时不超过同一台机器上导入界面库耗时的若干倍，不受机器快慢影响
+    "baseline_module": "customtkinter",
+    "import_budget_ratio": 2.0,
+    # 启动时不应加载的模块，首次生成或使用相关功能时才导入
+    "deferred_modules": ["requests", "ui.widgets", "utils.image_utils", "utils.pipeline", "utils.scheduler"],
+    # 设置该环境变量时，图形界面在全部构建完成后退出，用于测量启动耗时
+    "exit_after_start_env": "AI_IMAGE_GENERATOR_EXIT_AFTER_START",
+    # 启动画面
+    "splash_size": (360, 140),
+    "splash_background": "#1f2937",
+    "splash_foreground": "white"
+}
+
+# 生成任务优先级配置
+SCHEDULER_CONFIG = {
+    "reserved_interactive": 1,  # 为界面操作保留的工作线程数，批量任务不能占用
+    "starvation_timeout": 30.0  # 秒，低优先级任务等待超过该时间后按提交顺序优先执行
+}
+
+# 命令行（无界面）模式配置
+CLI_CONFIG = {
+    "default_output_dir": "output",
+    "default_count": 1,
+    "filename_template": "{prompt_index:04d}_{image_index:02d}_{model}_{size}.png"
+}
+
+# 批量任务（提示词文件）配置
+JOB_CONFIG = {
+    "journal_file": "journal.jsonl",
+    "max_attempts": 3,
+    "retry_backoff": 2.0,  # 秒，按尝试次数指数增长
+    "retry_backoff_max": 60.0,
+    "fsync": True  # 每条日志记录落盘，崩溃后可恢复
+}
+
+# 参数矩阵对比配置
+SWEEP_CONFIG = {
+    "default_repeats": 1,
+    "grid_html": "grid.html",
+    "grid_image": "grid.png",
+    "cell_width": 200,
+    "cell_padding": 8,
+    "grid_refresh_interval": 2.0  # 秒，网格页面最多每隔这么久重写一次，全部完成时立即写入
+}
+
+# 本地 HTTP 任务服务配置
+SERVICE_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 8765,
+    "max_jobs": 200,  # 内存中保留的任务数，超过后淘汰最早结束的任务
+    "max_body_size": 64 * 1024,
+    "event_keepalive": 15  # 秒，SSE 心跳间隔
+}
+
+# API Key 池配置
+KEY_POOL_CONFIG = {
+    "strategy": "least_loaded",  # 可选: "least_loaded", "weighted_round_robin"
+    "rate_limit_cooldown": 30,  # 秒，429 后暂停的初始时长（无 Retry-After 时按连续次数翻倍）
+    "rate_limit_cooldown_max": 300,
+    "auth_cooldown": 600  # 秒，401/403 后暂停的时长
+}
+
+# 多端点路由配置
+ROUTER_CONFIG = {
+    "ewma_alpha": 0.3,  # 延迟和错误率的指数加权系数
+    "error_penalty": 4.0,  # 错误率对评分的放大系数（端点熔断见 CIRCUIT_BREAKER_CONFIG）
+    "max_failover_attempts": 3  # 单次生成最多尝试的端点数
+}
+
+# 延迟统计配置
+LATENCY_CONFIG = {
+    "window_size": 200  # 每个模型/尺寸保留的最近延迟样本数
+}
+
+# 生成进度预估配置
+ETA_CONFIG = {
+    "history_file": "cache/latency_history.json",  # 延迟样本持久化文件，重启后预估仍然可用
+    "percentile": 50,  # 用历史延迟的中位数作为单张预计耗时
+    "min_samples": 3,  # 样本不足时使用默认耗时
+    "default_seconds": 60.0,
+    "max_running_fraction": 0.95  # 超出预计耗时的任务进度停在该比例，完成后才计满
+}
+
+# 对冲请求配置
+HEDGE_CONFIG = {
+    "enabled": False,  # 默认关闭，对冲会额外消耗配额
+    "percentile": 95,  # 请求耗时超过最近延迟的该分位数时发出对冲请求
+    "min_samples": 20,  # 样本不足时不对冲
+    "min_delay": 5.0,  # 秒，对冲等待的下限
+    "budget_ratio": 0.1,  # 每个请求积累的对冲额度，即对冲请求最多约占 10%
+    "max_budget": 5.0  # 额度上限，限制突发对冲数
+}
+
+# 熔断器配置（按端点）
+CIRCUIT_BREAKER_CONFIG = {
+    "window_size": 20,  # 统计失败率的最近请求数
+    "min_requests": 5,  # 窗口内请求数达到该值才按失败率熔断
+    "failure_rate_threshold": 0.5,
+    "consecutive_failures": 3,  # 连续失败多少次直接熔断
+    "open_duration": 30  # 秒，熔断持续时间，之后放行一个探测请求
+}
+
+# 自适应超时配置
+DEADLINE_CONFIG = {
+    "adaptive": True,  # 按同模型、同尺寸的历史延迟设置等待响应的超时
+    "percentile": 99,
+    "multiplier": 2.0,  # 超时 = 历史延迟分位数 × 该系数
+    "min_first_byte": 30,  # 秒，自适应超时的下限
+    "min_samples": 20,  # 样本不足时使用固定超时
+    "read_chunk_size": 64 * 1024  # 读取响应体的块大小
+}
+
+# 响应缓存配置（按完整请求数据缓存生成结果，用于回归测试和演示流程）
+RESPONSE_CACHE_CONFIG = {
+    "enabled": False,
+    "directory": "cache/responses",
+    "ttl": 7 * 24 * 3600,  # 秒，缓存有效期
+    "max_bytes": 500 * 1024 * 1024  # 缓存总大小上限，超过时淘汰最久未使用的图像
+}
+
+# 流式预览配置
+STREAMING_CONFIG = {
+    "models": ["gpt-image-1"],  # 支持流式返回预览帧的模型
+    "partial_images": 2  # 每张图像的预览帧数（1-3）
+}
+
+# 本地模拟图像服务配置（开发和测试用，无需 API Key）
+MOCK_SERVER_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 8766,
+    "latency": 3.0,  # 秒，模拟的生成耗时（分布的均值或中位数）
+    "latency_distribution": "fixed",  # fixed、uniform、normal、lognormal 或 exponential
+    "latency_spread": 0.5,  # 分布宽度：uniform/normal 为相对均值的比例，lognormal 为 sigma
+    "error_rate": 0.0,  # 返回 500 的比例
+    "rate_limit_rate": 0.0,  # 返回 429 的比例
+    "retry_after": 1,  # 秒，429 响应的 Retry-After
+    "partial_rate": 0.0,  # 只返回一半响应体后断开连接的比例
+    "payload_bytes": 0,  # 图像数据至少填充到的字节数，0 表示不填充
+    "seed": None,  # 随机数种子，设置后故障注入和延迟可复现
+    "path": "/v1/images/generations"
+}
+
+# 指标统计配置
+METRICS_CONFIG = {
+    "json_file": "cache/metrics.json",  # JSON 快照
+    "prometheus_file": "cache/metrics.prom",  # Prometheus 文本格式，可由 node_exporter 的 textfile 收集器读取
+    "histogram_lowest": 1e-4,  # 秒，直方图可区分的最小值
+    "histogram_significant_digits": 2,  # 有效数字位数，分位数相对误差不超过 1%
+    "quantiles": [0.5, 0.9, 0.95, 0.99]
+}
+
+# 链路追踪配置
+TRACING_CONFIG = {
+    "enabled": True,
+    "max_spans": 10000,  # 内存中保留的最近区间数
+    "trace_file": "cache/trace.json"  # Chrome trace-event JSON，可在 chrome://tracing 或 ui.perfetto.dev 中打开
+}
@@ -3,11 +3,13 @@
 """
 AI图像生成器主程序
 使用 CustomTkinter 构建的轻量级图像生成器应用
+
+不带参数运行时启动图形界面，带参数运行时进入命令行（无界面）模式：
+    python main.py generate "一只可爱的小猫" -n 3 -o output
 """
 
 import sys
 import os
-import tkinter.messagebox as messagebox
 
 # 添加项目根目录到 Python 路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -15,14 +17,24 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 # 初始化日志系统
 from utils.logger import log_manager, get_logger, log_exception
 from utils.exceptions import ImageGeneratorException
-from config.constants import APP_NAME, APP_VERSION
+from config.constants import APP_NAME, APP_VERSION, STARTUP_CONFIG
 
 # 获取主程序日志记录器
 logger = get_logger(__name__)
 
 
+def show_error(title: str, message: str) -> None:
+    """显示错误对话框，仅在需要时导入 tkinter"""
+    import tkinter.messagebox as messagebox
+    messagebox.showerror(title, message)
+
+
 def main():
-    """主函数，启动应用程序"""
+    """主函数，带命令行参数时进入无界面模式，否则启动图形界面"""
+    if len(sys.argv) > 1:
+        from cli import main as cli_main
+        return cli_main(sys.argv[1:])
+    
     try:
         logger.info(f"{APP_NAME} v{APP_VERSION} 启动中...")
         
@@ -30,18 +42,16 @@ def main():
         if sys.version_info < (3, 7):
             error_msg = "此应用程序需要 Python 3.7 或更高版本"
             logger.error(error_msg)
-            messagebox.showerror("版本错误", error_msg)
+            show_error("版本错误", error_msg)
             sys.exit(1)
         
-        # 检查必要的依赖
-        try:
-            import customtkinter
-            import requests
-            import PIL
-        except ImportError as e:
-            error_msg = f"缺少必要的依赖包: {str(e)}\n请运行: pip install -r requirements.txt"
+        # 检查必要的依赖（只查找模块而不导入，requests 和 PIL 在首次使用时才加载）
+        import importlib.util
+        missing = [name for name in ("customtkinter", "requests", "PIL") if importlib.util.find_spec(name) is None]
+        if missing:
+            error_msg = f"缺少必要的依赖包: {', '.join(missing)}\n请运行: pip install -r requirements.txt"
             logger.error(error_msg)
-            messagebox.showerror("依赖错误", error_msg)
+            show_error("依赖错误", error_msg)
             sys.exit(1)
         
         # 导入并创建主窗口
@@ -50,6 +60,10 @@ def main():
         logger.info("创建主窗口...")
         app = MainWindow()
         
+        # 测量启动耗时时，界面全部构建完成后立即退出
+        if os.environ.get(STARTUP_CONFIG["exit_after_start_env"]):
+            app.on_ready(app.quit)
+        
         logger.info("应用程序启动完成，开始主循环")
         app.mainloop()
         
@@ -59,14 +73,14 @@ def main():
         # 自定义异常处理
         error_msg = f"应用程序错误: {str(e)}"
         logger.error(error_msg)
-        messagebox.showerror("应用程序错误", str(e))
+        show_error("应用程序错误", str(e))
         sys.exit(1)
         
     except ImportError as e:
         # 模块导入错误
         error_msg = f"模块导入失败: {str(e)}"
         log_exception(logger, e, "模块导入错误")
-        messagebox.showerror("导入错误", error_msg)
+        show_error("导入错误", error_msg)
         sys.exit(1)
         
     except Exception as e:
@@ -76,7 +90,7 @@ def main():
         
         # 尝试显示错误对话框
         try:
-            messagebox.showerror("启动错误", error_msg)
+            show_error("启动错误", error_msg)
         except:
             # 如果连对话框都无法显示，则输出到控制台
             print(f"严重错误: {error_msg}")
@@ -134,6 +148,10 @@ if __name__ == "__main__":
     sys.excepthook = handle_exception
     
     try:
+        # 命令行模式：不检查界面资源目录，也不加载图形界面
+        if len(sys.argv) > 1:
+            sys.exit(main())
+        
         # 检查环境
         check_environment()
         
@@ -146,7 +164,7 @@ if __name__ == "__main__":
     except Exception as e:
         logger.critical(f"程序启动前发生严重错误: {str(e)}", exc_info=True)
         try:
-            messagebox.showerror("严重错误", f"程序无法启动: {str(e)}")
+            show_error("严重错误", f"程序无法启动: {str(e)}")
         except:
             print(f"严重错误: {str(e)}")
         sys.exit(1) 
\ No newline at end of file
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试工具测试
+只验证运行和比较逻辑，完整基准测试请运行 python -m benchmarks.image_benchmarks
+"""
+
+from benchmarks.image_benchmarks import (
+    DEFAULT_SIZES, compare, load_baseline, main, run_benchmarks, save_baseline
+)
+
+
+class TestImageBenchmarks:
+    """图像基准测试工具测试类"""
+
+    def test_run_small_size(self):
+        """测试在小尺寸上运行所有用例"""
+        results = run_benchmarks(["64x96"], repeat=1)
+
+        assert len(results) == 7
+        assert set(results["create_thumbnail[64x96]"]) == {"time_ms", "peak_kb"}
+        assert all(result["time_ms"] >= 0 for result in results.values())
+
+    def test_compare_detects_regressions(self):
+        """测试超过阈值的耗时和内存被判为回归，噪声范围内的差异忽略"""
+        baseline = {
+            "a[1x1]": {"time_ms": 10.0, "peak_kb": 100.0},
+            "b[1x1]": {"time_ms": 1.0, "peak_kb": 100.0},
+        }
+        results = {
+            "a[1x1]": {"time_ms": 20.0, "peak_kb": 200.0},
+            "b[1x1]": {"time_ms": 2.5, "peak_kb": 110.0},
+            "c[1x1]": {"time_ms": 99.0, "peak_kb": 999.0},
+        }
+
+        regressions = compare(results, baseline)
+
+        assert len(regressions) == 2
+        assert all(line.startswith("a[1x1]") for line in regressions)
+
+    def test_baseline_round_trip_and_exit_code(self, tmp_path):
+        """测试保存基线后，回归时命令行返回 1"""
+        path = str(tmp_path / "baselines.json")
+        save_baseline({"create_thumbnail[64x96]": {"time_ms": 0.001, "peak_kb": 0.001}}, path)
+
+        assert load_baseline(path)["create_thumbnail[64x96]"]["peak_kb"] == 0.001
+        assert main(["--sizes", "64x96", "-r", "1", "-k", "create_thumbnail", "--baseline", path]) == 1
+
+    def test_stored_baseline_covers_default_sizes(self):
+        """测试仓库中的基线包含所有默认尺寸的用例"""
+        baseline = load_baseline()
+
+        for size in DEFAULT_SIZES:
+            assert f"base64_to_pil_image[{size}]" in baseline
+            assert f"save_base64_image[{size}]" in baseline
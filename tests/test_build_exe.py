@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+打包脚本测试
+只验证打包参数和启动耗时测量，不实际运行 PyInstaller
+"""
+
+import os
+import sys
+
+import pytest
+
+from build_exe import EXIT_AFTER_START_ENV, build_command, exe_path, measure_launch
+
+
+class TestBuildCommand:
+    """打包参数测试类"""
+
+    def test_onefile_mode(self):
+        """测试默认模式打包成单个文件，并排除从不导入的依赖"""
+        cmd = build_command("onefile")
+
+        assert "--onefile" in cmd
+        assert "--optimize=2" not in cmd
+        assert "--exclude-module=openai" in cmd
+        assert "--hidden-import=openai" not in cmd
+
+    def test_fast_mode(self):
+        """测试快速启动模式使用目录形式和优化字节码"""
+        cmd = build_command("fast", dist_dir="dist/fast")
+
+        assert "--onedir" in cmd and "--onefile" not in cmd
+        assert "--optimize=2" in cmd
+        assert "--exclude-module=unittest" in cmd
+        assert "--distpath=dist/fast" in cmd
+        assert exe_path("fast", "dist/fast").startswith(os.path.join("dist/fast", "AI图像生成器"))
+
+    def test_unknown_mode(self):
+        """测试未知的打包模式"""
+        with pytest.raises(ValueError):
+            build_command("tiny")
+
+    def test_measure_launch_sets_exit_env(self):
+        """测试启动耗时测量时设置了立即退出的环境变量"""
+        script = f"import os, sys; sys.exit(0 if os.environ.get({EXIT_AFTER_START_ENV!r}) else 1)"
+
+        timings = measure_launch([sys.executable, "-c", script], runs=2)
+
+        assert len(timings) == 2
+        assert all(t > 0 for t in timings)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+熔断器测试
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from utils.circuit_breaker import (
+    STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker, get_circuit_breaker, reset_circuit_breakers
+)
+from utils.endpoint_router import reset_routers
+from utils.exceptions import CircuitOpenException
+from utils.image_utils import ImageUtils
+
+URL = "https://down.example.com/v1/images/generations"
+
+
+@pytest.fixture(autouse=True)
+def _reset_breakers():
+    """熔断器和路由器按端点在进程内共享，每个测试前重置"""
+    reset_circuit_breakers()
+    reset_routers()
+    yield
+    reset_circuit_breakers()
+    reset_routers()
+
+
+class TestCircuitBreaker:
+    """熔断器测试类"""
+
+    def test_opens_on_failure_rate(self):
+        """测试失败率达到阈值后熔断"""
+        breaker = CircuitBreaker("test", window_size=10, min_requests=4,
+                                 failure_rate_threshold=0.5, consecutive_failures=10)
+        for success in (True, False, True, False):
+            breaker.record_success() if success else breaker.record_failure()
+
+        assert breaker.state == STATE_OPEN
+        assert not breaker.allow_request()
+        assert breaker.retry_after() > 0
+
+    def test_half_open_allows_single_probe(self):
+        """测试半开状态只放行一个探测请求"""
+        breaker = CircuitBreaker("test", consecutive_failures=1, open_duration=0)
+        breaker.record_failure()
+
+        assert breaker.state == STATE_HALF_OPEN
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+
+        breaker.record_success()
+        assert breaker.state == STATE_CLOSED
+        assert breaker.allow_request()
+
+    def test_failed_probe_reopens(self):
+        """测试探测失败后重新熔断"""
+        breaker = CircuitBreaker("test", consecutive_failures=1, open_duration=60)
+        breaker.record_failure()
+        breaker._opened_at -= 60
+
+        assert breaker.allow_request()
+        breaker.record_failure()
+
+        assert breaker.state == STATE_OPEN
+        assert breaker.to_dict()["trips"] == 2
+
+
+class TestImageUtilsCircuitBreaker:
+    """ImageUtils 熔断测试类"""
+
+    def _utils(self):
+        utils = ImageUtils(api_key="sk-test-key-123456")
+        utils.api_url = URL
+        return utils
+
+    def test_fails_fast_while_open(self):
+        """测试熔断期间不再发出请求"""
+        session = MagicMock()
+        session.post.side_effect = requests.exceptions.ConnectionError("down")
+        utils = self._utils()
+
+        with patch.object(ImageUtils, "get_session", return_value=session):
+            for _ in range(3):
+                with pytest.raises(Exception):
+                    utils.request_image("a cat")
+            with pytest.raises(CircuitOpenException):
+                utils.request_image("a cat")
+            with pytest.raises(CircuitOpenException):
+                utils.check_availability()
+
+        assert session.post.call_count == 3
+
+    def _open_and_cool_down(self, utils):
+        for _ in range(3):
+            utils.router.choose()
+            utils.router.record(URL, success=False)
+        get_circuit_breaker(URL)._opened_at -= 3600
+
+    def test_check_availability_probes_with_connection_test(self):
+        """测试冷却结束后读取模型列表探测并恢复，不发出生成请求"""
+        session = MagicMock()
+        session.get.return_value = MagicMock(status_code=200, headers={})
+        utils = self._utils()
+        self._open_and_cool_down(utils)
+
+        with patch.object(ImageUtils, "get_session", return_value=session):
+            utils.check_availability()
+
+        assert session.post.call_count == 0
+        assert session.get.call_args[0][0] == "https://down.example.com/v1/models"
+        assert get_circuit_breaker(URL).state == STATE_CLOSED
+        assert utils.key_pool.stats()[0]["in_flight"] == 0
+
+    def test_rate_limited_probe_not_recovered(self):
+        """测试探测被限流时端点仍视为未恢复"""
+        session = MagicMock()
+        session.get.return_value = MagicMock(status_code=429, headers={"Retry-After": "5"})
+        utils = self._utils()
+        self._open_and_cool_down(utils)
+
+        with patch.object(ImageUtils, "get_session", return_value=session):
+            with pytest.raises(CircuitOpenException):
+                utils.check_availability()
+
+        assert get_circuit_breaker(URL).state == STATE_OPEN
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+命令行模式测试
+"""
+
+import io
+import os
+import subprocess
+import sys
+
+import cli
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestCommandLine:
+    """命令行模式测试类"""
+    
+    def test_collect_prompts_from_args_file_and_stdin(self, tmp_path):
+        """测试从参数、文件和标准输入汇总提示词"""
+        prompt_file = tmp_path / "prompts.txt"
+        prompt_file.write_text("# 注释\nfile prompt one\n\nfile prompt two\n", encoding="utf-8")
+        
+        args = cli.build_parser().parse_args(
+            ["generate", "arg prompt", "-", "-f", str(prompt_file)]
+        )
+        stdin = io.StringIO("stdin prompt\n")
+        prompts = cli.collect_prompts(args, stdin=stdin)
+        
+        assert prompts == ["arg prompt", "stdin prompt", "file prompt one", "file prompt two"]
+    
+    def test_build_output_path(self):
+        """测试输出文件命名"""
+        path = cli.build_output_path("out", 3, 1, "sora_image", "1024x1536")
+        assert path == os.path.join("out", "0003_01_sora_image_1024x1536.png")
+    
+    def test_headless_startup_does_not_import_tkinter(self):
+        """测试命令行模式启动时不导入 tkinter/customtkinter"""
+        code = (
+            "import sys; sys.argv = ['main.py', 'generate', '--help']\n"
+            "import main\n"
+            "try:\n"
+            "    main.main()\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "loaded = [m for m in ('tkinter', 'customtkinter') if m in sys.modules]\n"
+            "assert not loaded, loaded\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+请求超时测试
+"""
+
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from config.constants import API_CONFIG, DEADLINE_CONFIG
+from utils.deadlines import DeadlinePolicy, Deadlines
+from utils.exceptions import APITimeoutException
+from utils.image_utils import ImageUtils
+from utils.latency_stats import LatencyStats
+
+KEY = "sora_image|1024x1536"
+
+
+class TestDeadlinePolicy:
+    """超时策略测试类"""
+
+    def test_static_deadlines_without_samples(self):
+        """测试样本不足时使用固定超时"""
+        deadlines = DeadlinePolicy(LatencyStats()).for_key(KEY)
+
+        assert deadlines.connect == API_CONFIG["connect_timeout"]
+        assert deadlines.first_byte == API_CONFIG["first_byte_timeout"]
+        assert deadlines.requests_timeout()[0] == API_CONFIG["connect_timeout"]
+
+    def test_adaptive_first_byte(self):
+        """测试按历史延迟设置等待响应的超时"""
+        stats = LatencyStats()
+        for _ in range(DEADLINE_CONFIG["min_samples"]):
+            stats.record(KEY, 40.0)
+
+        deadlines = DeadlinePolicy(stats).for_key(KEY)
+        assert deadlines.first_byte == 40.0 * DEADLINE_CONFIG["multiplier"]
+
+        static = DeadlinePolicy(stats, adaptive=False).for_key(KEY)
+        assert static.first_byte == API_CONFIG["first_byte_timeout"]
+
+    def test_config_overrides(self):
+        """测试配置文件覆盖默认超时并忽略未知项"""
+        policy = DeadlinePolicy.from_config(LatencyStats(), {"connect": 3, "total": 60, "unknown": 1})
+
+        deadlines = policy.for_key(KEY)
+        assert deadlines.connect == 3
+        assert deadlines.total == 60
+        assert deadlines.first_byte == 60
+
+    def test_read_timeout_bounded_by_remaining_total(self):
+        """测试读取超时不超过剩余总时间"""
+        deadlines = Deadlines(connect=1, first_byte=100, total=10)
+        deadlines.started_at -= 8
+
+        assert deadlines.requests_timeout()[1] <= 2
+
+
+class TestImageUtilsDeadlines:
+    """ImageUtils 超时测试类"""
+
+    def _response(self, chunks):
+        response = MagicMock(status_code=200, headers={})
+        response.iter_content.return_value = chunks
+        return response
+
+    def test_post_uses_split_timeouts(self):
+        """测试请求分别使用连接超时和读取超时"""
+        response = self._response([b'{"data": [{"b64_json": "aW1hZ2U="}]}'])
+        response.json.side_effect = lambda: {"data": [{"b64_json": "aW1hZ2U="}]}
+        session = MagicMock()
+        session.post.return_value = response
+        utils = ImageUtils(api_key="sk-test-key-123456")
+
+        with patch.object(ImageUtils, "get_session", return_value=session):
+            assert utils.request_image("a cat") == "aW1hZ2U="
+
+        kwargs = session.post.call_args.kwargs
+        assert kwargs["timeout"][0] == API_CONFIG["connect_timeout"]
+        assert kwargs["stream"] is True
+
+    def test_total_deadline_while_reading_body(self):
+        """测试读取响应体超过总截止时间时超时"""
+        def slow_chunks():
+            while True:
+                time.sleep(0.05)
+                yield b"x"
+
+        response = self._response(slow_chunks())
+        deadlines = Deadlines(connect=1, first_byte=1, total=0.2)
+
+        with pytest.raises(APITimeoutException):
+            ImageUtils._read_body(response, deadlines, "https://api.example.com")
+        response.close.assert_called_once()
+
+    def test_stalled_body_read_is_timeout(self):
+        """测试流式读取停滞按超时处理"""
+        response = MagicMock()
+        response.iter_content.side_effect = requests.exceptions.ConnectionError("read timed out")
+
+        with pytest.raises(APITimeoutException):
+            ImageUtils._read_body(response, Deadlines(1, 1, 10), "https://api.example.com")
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+端点路由器测试
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from config.constants import CIRCUIT_BREAKER_CONFIG
+from utils.circuit_breaker import reset_circuit_breakers
+from utils.endpoint_router import EndpointRouter, get_router, reset_routers
+from utils.exceptions import APIException
+from utils.image_utils import ImageUtils
+
+URL_A = "https://a.example.com/v1/images/generations"
+URL_B = "https://b.example.com/v1/images/generations"
+
+
+def _response(status_code):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = {}
+    response.text = "error"
+    response.json.return_value = {"data": [{"b64_json": "aW1hZ2U="}]}
+    return response
+
+
+@pytest.fixture(autouse=True)
+def _reset_breakers():
+    """熔断器和路由器按端点在进程内共享，每个测试前重置"""
+    reset_circuit_breakers()
+    reset_routers()
+    yield
+    reset_circuit_breakers()
+    reset_routers()
+
+
+class TestEndpointRouter:
+    """端点路由器测试类"""
+    
+    def test_prefers_faster_endpoint(self):
+        """测试优先选择延迟更低的端点"""
+        router = EndpointRouter([URL_A, URL_B])
+        router.record(router.choose(), success=True, latency=20.0)
+        router.record(router.choose(exclude=[URL_A]), success=True, latency=5.0)
+        
+        assert router.choose() == URL_B
+    
+    def test_consecutive_failures_take_endpoint_down(self):
+        """测试连续失败后端点被熔断"""
+        router = EndpointRouter([URL_A, URL_B])
+        for _ in range(CIRCUIT_BREAKER_CONFIG["consecutive_failures"]):
+            router.record(URL_A, success=False)
+        
+        assert all(router.choose() == URL_B for _ in range(3))
+        assert router.stats()[0]["circuit"]["state"] == "open"
+    
+    def test_router_shared_by_url_list(self):
+        """测试相同端点列表的 ImageUtils 共享路由器评分"""
+        first = ImageUtils(api_key="sk-test-key-123456")
+        first.api_urls = [URL_A, URL_B]
+        first.router.record(first.router.choose(), success=True, latency=20.0)
+        
+        second = ImageUtils(api_key="sk-test-key-123456")
+        second.api_urls = [URL_A, f" {URL_B} "]
+        
+        assert second.router is first.router
+        assert second.router.stats()[0]["ewma_latency"] == 20.0
+        assert get_router([URL_B, URL_A]) is not first.router
+
+
+class TestImageUtilsFailover:
+    """ImageUtils 端点故障切换测试类"""
+    
+    def _utils(self, *responses):
+        session = MagicMock()
+        session.post.side_effect = list(responses)
+        utils = ImageUtils(api_key="sk-test-key-123456")
+        utils.api_urls = [URL_A, URL_B]
+        return utils, session
+    
+    def test_fails_over_on_5xx_and_connection_error(self):
+        """测试 5xx 和连接错误时切换端点"""
+        utils, session = self._utils(_response(502), _response(200))
+        with patch.object(ImageUtils, "get_session", return_value=session):
+            assert utils.request_image("a cute cat playing") == "aW1hZ2U="
+        assert [c.args[0] for c in session.post.call_args_list] == [URL_A, URL_B]
+        
+        utils, session = self._utils(requests.exceptions.ConnectionError(), _response(200))
+        with patch.object(ImageUtils, "get_session", return_value=session):
+            assert utils.request_image("a cute cat playing") == "aW1hZ2U="
+    
+    def test_client_error_does_not_fail_over(self):
+        """测试 4xx 错误不切换端点"""
+        utils, session = self._utils(_response(400), _response(200))
+        with patch.object(ImageUtils, "get_session", return_value=session):
+            with pytest.raises(APIException) as error:
+                utils.request_image("a cute cat playing")
+        assert error.value.status_code == 400
+        assert session.post.call_count == 1
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+生成进度预估测试
+"""
+
+import threading
+
+from utils.eta import (
+    SLOT_DONE, SLOT_FAILED, SLOT_QUEUED, SLOT_RUNNING,
+    EtaEstimator, GenerationProgress, format_seconds, load_latency_history, save_latency_history
+)
+from utils.latency_stats import LatencyStats, latency_key
+from utils.scheduler import GenerationScheduler
+
+
+class FakeClock:
+    """可手动推进的时钟"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestEtaEstimator:
+    """单张耗时预估测试类"""
+
+    def test_default_until_enough_samples(self):
+        """测试样本不足时使用默认耗时，足够后使用历史中位数"""
+        stats = LatencyStats()
+        estimator = EtaEstimator(stats, percentile=50, min_samples=3, default_seconds=60)
+        key = latency_key("sora_image", "1024x1536")
+
+        stats.record(key, 10)
+        assert estimator.expected("sora_image", "1024x1536") == 60
+
+        stats.record(key, 20)
+        stats.record(key, 30)
+        assert estimator.expected("sora_image", "1024x1536") == 20
+        assert estimator.expected("sora_image", "1536x1024") == 60
+
+
+class TestGenerationProgress:
+    """逐张进度测试类"""
+
+    def test_slots_and_fraction(self):
+        """测试每张图像的状态、已用时间和整体进度"""
+        clock = FakeClock()
+        progress = GenerationProgress(3, expected_seconds=20, concurrency=2, clock=clock)
+        progress.start(0)
+        progress.start(1)
+        clock.now += 10
+        progress.finish(0)
+
+        slots = progress.slots()
+        assert [s["state"] for s in slots] == [SLOT_DONE, SLOT_RUNNING, SLOT_QUEUED]
+        assert slots[1]["elapsed"] == 10 and slots[1]["expected"] == 20
+        assert progress.fraction() == (1 + 0.5) / 3
+        assert progress.finished_count == 1
+
+    def test_overdue_slot_is_capped(self):
+        """测试超出预计耗时的图像不会让进度达到 100%"""
+        clock = FakeClock()
+        progress = GenerationProgress(1, expected_seconds=10, clock=clock)
+        progress.start(0)
+        clock.now += 100
+
+        assert progress.fraction() < 1.0
+        progress.finish(0, success=False)
+        assert progress.fraction() == 1.0
+        assert progress.slots()[0]["state"] == SLOT_FAILED
+
+    def test_remaining_accounts_for_queue(self):
+        """测试剩余时间按并发数估计排队图像"""
+        clock = FakeClock()
+        progress = GenerationProgress(4, expected_seconds=20, concurrency=2, clock=clock)
+        assert progress.remaining() == 40
+
+        progress.start(0)
+        progress.start(1)
+        clock.now += 5
+        # 进行中剩余 15 + 15，排队 2 × 20，两路并发
+        assert progress.remaining() == 35
+
+        for index in range(4):
+            progress.start(index)
+            progress.finish(index)
+        assert progress.remaining() == 0
+
+
+class TestLatencyHistory:
+    """延迟历史持久化测试类"""
+
+    def test_save_and_load(self, tmp_path):
+        """测试保存后在新的统计实例中加载"""
+        path = str(tmp_path / "history.json")
+        stats = LatencyStats()
+        stats.record("gpt-image-1|1024x1536", 12.5)
+        stats.record("gpt-image-1|1024x1536", 14.0)
+        assert save_latency_history(path, stats)
+
+        restored = LatencyStats()
+        restored.record("gpt-image-1|1024x1536", 16.0)
+        assert load_latency_history(path, restored) == 2
+        assert restored.snapshot() == {"gpt-image-1|1024x1536": [12.5, 14.0, 16.0]}
+
+    def test_missing_or_corrupt_file(self, tmp_path):
+        """测试文件不存在或损坏时忽略"""
+        path = tmp_path / "history.json"
+        assert load_latency_history(str(path), LatencyStats()) == 0
+        path.write_text("not json", encoding="utf-8")
+        assert load_latency_history(str(path), LatencyStats()) == 0
+
+    def test_format_seconds(self):
+        """测试时长格式化"""
+        assert format_seconds(45.4) == "45秒"
+        assert format_seconds(125) == "2分05秒"
+
+
+class TestSchedulerStartCallback:
+    """调度器开始回调测试类"""
+
+    def test_start_callback_runs_in_worker(self):
+        """测试任务开始执行时回调图像索引"""
+        class FakeUtils:
+            def generate_image(self, prompt, size, model):
+                return "data"
+
+        scheduler = GenerationScheduler(max_workers=1)
+        started = []
+        worker_names = []
+
+        def on_start(index):
+            started.append(index)
+            worker_names.append(threading.current_thread().name)
+
+        try:
+            future = scheduler.submit_generation(FakeUtils(), "a cat", "1024x1536", "sora_image",
+                                                 index=3, start_callback=on_start)
+            assert future.result(timeout=2) == "data"
+        finally:
+            scheduler.shutdown()
+
+        assert started == [3]
+        assert worker_names[0].startswith("generation-worker")
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+对冲请求测试
+"""
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from utils.hedging import HedgePolicy, defer_cancel, is_cancelled
+from utils.image_utils import ImageUtils
+from utils.latency_stats import LatencyStats
+
+KEY = "sora_image|1024x1536"
+
+
+def _policy(samples=20, latency=0.05, **options):
+    stats = LatencyStats()
+    for _ in range(samples):
+        stats.record(KEY, latency)
+    options.setdefault("min_samples", 20)
+    options.setdefault("min_delay", 0.0)
+    options.setdefault("budget_ratio", 1.0)
+    return HedgePolicy(stats, **options)
+
+
+class TestLatencyStats:
+    """延迟统计测试类"""
+
+    def test_percentile(self):
+        """测试最近邻法分位数：第 ceil(p/100*n) 个样本"""
+        stats = LatencyStats(window_size=10)
+        for value in range(1, 11):
+            stats.record(KEY, float(value))
+
+        assert stats.percentile(KEY, 50) == 5.0
+        assert stats.percentile(KEY, 90) == 9.0
+        assert stats.percentile(KEY, 100) == 10.0
+        assert stats.percentile("other", 50) is None
+
+        stats = LatencyStats(window_size=20)
+        for value in range(1, 21):
+            stats.record(KEY, float(value))
+        assert stats.percentile(KEY, 95) == 19.0
+
+    def test_window(self):
+        """测试滚动窗口只保留最近的样本"""
+        stats = LatencyStats(window_size=100)
+        for value in range(1, 201):
+            stats.record(KEY, float(value))
+
+        assert stats.count(KEY) == 100
+        assert stats.percentile(KEY, 100) == 200.0
+
+
+class TestHedgePolicy:
+    """对冲策略测试类"""
+
+    def test_no_hedge_without_samples(self):
+        """测试样本不足时不发出对冲"""
+        policy = _policy(samples=5)
+        hedge_calls = []
+
+        result = policy.execute(KEY, lambda: "primary", lambda: hedge_calls.append(1))
+
+        assert result == "primary"
+        assert not hedge_calls
+        assert policy.stats()["hedged"] == 0
+
+    def test_slow_primary_is_hedged(self):
+        """测试主请求过慢时采用对冲结果"""
+        policy = _policy()
+        release = threading.Event()
+
+        def slow_primary():
+            release.wait(2)
+            return "primary"
+
+        start = time.time()
+        result = policy.execute(KEY, slow_primary, lambda: "hedge")
+        release.set()
+
+        assert result == "hedge"
+        assert time.time() - start < 1
+        stats = policy.stats()
+        assert stats["hedged"] == 1
+        assert stats["hedge_wins"] == 1
+        assert stats["abandoned"] == 1
+
+    def test_loser_is_cancelled(self):
+        """测试采用对冲结果后立即取消主请求并执行其登记的清理"""
+        policy = _policy()
+        cleaned = threading.Event()
+        observed = []
+
+        def slow_primary():
+            owns = defer_cancel(cleaned.set)
+            cleaned.wait(2)
+            observed.append((is_cancelled(), owns()))
+            return "primary"
+
+        assert policy.execute(KEY, slow_primary, lambda: "hedge") == "hedge"
+        assert cleaned.wait(1)
+        for _ in range(100):
+            if observed:
+                break
+            time.sleep(0.01)
+        assert observed == [(True, False)]
+
+    def test_budget_limits_hedges(self):
+        """测试额度不足时等待主请求而不对冲"""
+        policy = _policy(budget_ratio=0.5)
+        hedge_calls = []
+
+        def slow_primary():
+            time.sleep(0.1)
+            return "primary"
+
+        result = policy.execute(KEY, slow_primary, lambda: hedge_calls.append(1))
+
+        assert result == "primary"
+        assert not hedge_calls
+
+    def test_failed_hedge_falls_back_to_primary(self):
+        """测试对冲失败时仍采用主请求结果"""
+        policy = _policy()
+
+        def slow_primary():
+            time.sleep(0.2)
+            return "primary"
+
+        def failing_hedge():
+            raise RuntimeError("hedge failed")
+
+        assert policy.execute(KEY, slow_primary, failing_hedge) == "primary"
+
+    def test_both_fail_raises(self):
+        """测试两个请求都失败时抛出异常"""
+        policy = _policy()
+
+        def slow_failure():
+            time.sleep(0.1)
+            raise RuntimeError("primary failed")
+
+        def failing_hedge():
+            raise RuntimeError("hedge failed")
+
+        with pytest.raises(RuntimeError):
+            policy.execute(KEY, slow_failure, failing_hedge)
+
+
+class TestImageUtilsHedging:
+    """ImageUtils 对冲请求测试类"""
+
+    def test_hedge_goes_to_other_endpoint(self):
+        """测试对冲请求发往另一个端点并采用其结果"""
+        url_a = "https://a.example.com/v1/images/generations"
+        url_b = "https://b.example.com/v1/images/generations"
+        release = threading.Event()
+
+        def post(url, **kwargs):
+            if url == url_a:
+                release.wait(2)
+            response = MagicMock(status_code=200, headers={})
+            response.json.return_value = {"data": [{"b64_json": url[8]}]}
+            return response
+
+        session = MagicMock()
+        session.post.side_effect = post
+        utils = ImageUtils(api_key="sk-test-key-123456")
+        utils.api_urls = [url_a, url_b]
+        utils.latency_stats = LatencyStats()
+        for _ in range(20):
+            utils.latency_stats.record("sora_image|1024x1536", 0.05)
+        utils.enable_hedging(min_delay=0.0, budget_ratio=1.0)
+
+        with patch.object(ImageUtils, "get_session", return_value=session):
+            result = utils.request_image("a cat", "1024x1536", "sora_image")
+        # 落后的请求仍在等待响应，但 Key 和端点的在途计数已经归还
+        in_flight = ([state["in_flight"] for state in utils.key_pool.stats()]
+                     + [state["in_flight"] for state in utils.router.stats()])
+        release.set()
+
+        assert result == "b"
+        assert utils.hedge_policy.stats()["hedge_wins"] == 1
+        assert in_flight == [0] * len(in_flight)
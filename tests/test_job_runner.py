@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+批量任务运行器测试
+"""
+
+import base64
+import json
+import os
+import threading
+
+import pytest
+
+from utils.exceptions import ValidationException
+from utils.image_utils import ImageUtils
+from utils.job_runner import (
+    STATE_DONE, STATE_FAILED, JobJournal, JobRunner, expand_rows, load_job_file
+)
+from utils.mock_server import create_mock_server
+from utils.scheduler import GenerationScheduler
+
+FAKE_IMAGE = base64.b64encode(b"fake-png").decode("ascii")
+
+
+class FakeImageUtils:
+    """模拟的图像工具，指定提示词的前 N 次调用失败"""
+    
+    def __init__(self, failures=None):
+        self.failures = dict(failures or {})
+        self.calls = []
+    
+    def generate_image(self, prompt, size, model):
+        self.calls.append(prompt)
+        if self.failures.get(prompt, 0) > 0:
+            self.failures[prompt] -= 1
+            return None
+        return FAKE_IMAGE
+    
+    @staticmethod
+    def save_base64_image(base64_data, file_path):
+        with open(file_path, "wb") as f:
+            f.write(base64.b64decode(base64_data))
+        return True
+
+
+class TestJobFile:
+    """任务文件解析测试类"""
+    
+    def test_task_ids_are_stable_across_reordering(self):
+        """测试任务 ID 与行顺序无关"""
+        rows = [
+            {"prompt": "a red apple on a table", "count": 2},
+            {"prompt": "a blue car in the rain", "model": "gpt-image-1", "size": "1536x1024"},
+        ]
+        first = [t.task_id for t in expand_rows(rows)]
+        second = [t.task_id for t in expand_rows(list(reversed(rows)))]
+        
+        assert len(first) == 3
+        assert sorted(first) == sorted(second)
+    
+    def test_load_csv_with_defaults(self, tmp_path):
+        """测试读取 CSV 并应用缺省值"""
+        job_file = tmp_path / "jobs.csv"
+        job_file.write_text("prompt,model,size,count\n"
+                            "a quiet mountain lake,,,2\n"
+                            "a neon city street,gpt-image-1,1536x1024,\n", encoding="utf-8")
+        tasks = load_job_file(str(job_file), default_count=1)
+        
+        assert [(t.model, t.size) for t in tasks] == [
+            ("sora_image", "1024x1536"), ("sora_image", "1024x1536"), ("gpt-image-1", "1536x1024")
+        ]
+    
+    def test_load_json_array(self, tmp_path):
+        """测试读取 JSON 对象数组"""
+        job_file = tmp_path / "jobs.json"
+        job_file.write_text(json.dumps([
+            {"prompt": "a quiet mountain lake", "count": 2},
+            {"prompt": "a neon city street", "size": "1536x1024"},
+        ], indent=2), encoding="utf-8")
+        tasks = load_job_file(str(job_file))
+        
+        assert [t.size for t in tasks] == ["1024x1536", "1024x1536", "1536x1024"]
+        
+        job_file.write_text(json.dumps({"prompt": "a quiet mountain lake"}), encoding="utf-8")
+        with pytest.raises(ValidationException):
+            load_job_file(str(job_file))
+    
+    def test_invalid_row_raises(self, tmp_path):
+        """测试无效的任务行"""
+        job_file = tmp_path / "jobs.jsonl"
+        job_file.write_text(json.dumps({"prompt": "a quiet lake", "model": "nope"}) + "\n",
+                            encoding="utf-8")
+        with pytest.raises(ValidationException):
+            load_job_file(str(job_file))
+
+
+class TestJobRunner:
+    """批量任务运行器测试类"""
+    
+    def test_journal_ignores_truncated_record(self, tmp_path):
+        """测试日志重放忽略写了一半的记录"""
+        journal_path = tmp_path / "journal.jsonl"
+        journal_path.write_text(json.dumps({"task_id": "t1", "state": "done"}) + "\n"
+                                + '{"task_id": "t2", "sta', encoding="utf-8")
+        journal = JobJournal(str(journal_path), fsync=False)
+        
+        assert journal.get_state("t1") == STATE_DONE
+        assert journal.get_state("t2") == "pending"
+        
+        # 新记录不应与损坏的最后一行粘连
+        journal.record("t2", STATE_DONE)
+        journal.close()
+        assert JobJournal(str(journal_path), fsync=False).get_state("t2") == STATE_DONE
+    
+    def test_resume_skips_completed_and_retries_failures(self, tmp_path):
+        """测试续跑时跳过已完成任务并重试失败任务"""
+        rows = [{"prompt": "a red apple on a table"}, {"prompt": "a blue car in the rain"}]
+        tasks = expand_rows(rows)
+        journal_path = str(tmp_path / "journal.jsonl")
+        output_dir = str(tmp_path / "out")
+        
+        # 第一次运行：第二个任务始终失败
+        fake = FakeImageUtils(failures={"a blue car in the rain": 10})
+        scheduler = GenerationScheduler(max_workers=2)
+        journal = JobJournal(journal_path, fsync=False)
+        summary = JobRunner(tasks, journal, output_dir, fake, scheduler,
+                            max_attempts=2, retry_backoff=0).run()
+        journal.close()
+        
+        assert summary == {"total": 2, "skipped": 0, "succeeded": 1, "failed": 1}
+        assert journal.get_state(tasks[1].task_id) == STATE_FAILED
+        
+        # 第二次运行：只执行失败的任务
+        fake = FakeImageUtils()
+        journal = JobJournal(journal_path, fsync=False)
+        summary = JobRunner(tasks, journal, output_dir, fake, scheduler,
+                            max_attempts=2, retry_backoff=0).run()
+        journal.close()
+        scheduler.shutdown()
+        
+        assert summary == {"total": 2, "skipped": 1, "succeeded": 1, "failed": 0}
+        assert fake.calls == ["a blue car in the rain"]
+        assert journal.get_record(tasks[1].task_id)["attempt"] == 3
+    
+    def test_retry_backoff_does_not_block_worker(self, tmp_path):
+        """测试重试退避期间工作线程可以执行其他任务"""
+        tasks = expand_rows([{"prompt": "a red apple on a table"}, {"prompt": "a blue car in the rain"}])
+        fake = FakeImageUtils(failures={"a red apple on a table": 1})
+        scheduler = GenerationScheduler(max_workers=1)
+        journal = JobJournal(str(tmp_path / "journal.jsonl"), fsync=False)
+        summary = JobRunner(tasks, journal, str(tmp_path / "out"), fake, scheduler,
+                            max_attempts=2, retry_backoff=0.2).run()
+        journal.close()
+        scheduler.shutdown()
+        
+        assert summary["succeeded"] == 2
+        assert fake.calls == ["a red apple on a table", "a blue car in the rain", "a red apple on a table"]
+    
+    def test_repeats_cached_separately(self, tmp_path):
+        """测试启用响应缓存时相同请求的各次重复分别请求和缓存"""
+        tasks = expand_rows([{"prompt": "a red apple on a table", "count": 3}])
+        server = create_mock_server("127.0.0.1", 0, 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address[:2]
+        image_utils = ImageUtils(api_key="sk-test-key-123456")
+        image_utils.api_url = f"http://{host}:{port}{server.path}"
+        cache = image_utils.enable_response_cache(str(tmp_path / "cache"))
+        scheduler = GenerationScheduler(max_workers=2)
+        try:
+            for run in range(2):
+                journal = JobJournal(str(tmp_path / f"journal{run}.jsonl"), fsync=False)
+                summary = JobRunner(tasks, journal, str(tmp_path / f"out{run}"), image_utils, scheduler).run()
+                journal.close()
+                assert summary["succeeded"] == 3
+        finally:
+            scheduler.shutdown()
+            server.shutdown()
+            server.server_close()
+        
+        # 第二次运行全部命中缓存
+        assert server.stats()["requests"] == 3
+        assert cache.stats()["entries"] == 3
+        assert len(os.listdir(tmp_path / "out1")) == 3
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+本地 HTTP 任务服务测试
+"""
+
+import base64
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from utils.job_service import JobService, create_server
+from utils.scheduler import GenerationScheduler
+
+FAKE_PNG = b"\x89PNG fake image bytes"
+
+
+class FakeImageUtils:
+    """模拟的图像工具"""
+    
+    def generate_image(self, prompt, size, model):
+        time.sleep(0.02)
+        if "fail" in prompt:
+            return None
+        return base64.b64encode(FAKE_PNG).decode("ascii")
+
+
+@pytest.fixture
+def service_url():
+    """启动临时任务服务"""
+    scheduler = GenerationScheduler(max_workers=2)
+    server = create_server(JobService(FakeImageUtils(), scheduler), "127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:%d" % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+    scheduler.shutdown()
+
+
+def _request(url, data=None):
+    body = json.dumps(data).encode("utf-8") if data is not None else None
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+class TestJobService:
+    """任务服务测试类"""
+    
+    def test_submit_events_and_fetch_image(self, service_url):
+        """测试提交任务、接收进度事件并获取图像"""
+        status, body = _request(service_url + "/jobs", {"prompt": "a cute cat playing", "count": 2})
+        assert status == 202
+        job = json.loads(body)
+        
+        status, body = _request(f"{service_url}/jobs/{job['job_id']}/events")
+        assert status == 200
+        events = [line for line in body.decode("utf-8").splitlines() if line.startswith("event:")]
+        assert events[-1] == "event: complete"
+        
+        status, body = _request(f"{service_url}/jobs/{job['job_id']}")
+        job = json.loads(body)
+        assert job["state"] == "done"
+        
+        status, body = _request(service_url + job["images"][1]["url"])
+        assert status == 200
+        assert body == FAKE_PNG
+    
+    def test_failed_image_and_validation(self, service_url):
+        """测试失败的图像和无效的请求"""
+        status, body = _request(service_url + "/jobs", {"prompt": "please fail this one"})
+        job_id = json.loads(body)["job_id"]
+        _request(f"{service_url}/jobs/{job_id}/events")
+        
+        status, body = _request(f"{service_url}/jobs/{job_id}")
+        assert json.loads(body)["state"] == "failed"
+        assert _request(f"{service_url}/jobs/{job_id}/images/0")[0] == 409
+        
+        assert _request(service_url + "/jobs", {"prompt": "a cat", "model": "nope"})[0] == 400
+        assert _request(service_url + "/jobs", {"prompt": "a cute cat", "count": 99})[0] == 400
+        assert _request(service_url + "/jobs", {"prompt": "a cute cat", "priority": "urgent"})[0] == 400
+        assert _request(service_url + "/jobs/" + "0" * 32)[0] == 404
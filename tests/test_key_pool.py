@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+API Key 池测试
+"""
+
+from collections import Counter
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from utils.exceptions import APIException
+from utils.image_utils import ImageUtils
+from utils.key_pool import APIKeyPool, get_key_pool
+
+
+def _response(status_code, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.text = "error"
+    response.json.return_value = {"data": [{"b64_json": "aW1hZ2U="}]}
+    return response
+
+
+class TestAPIKeyPool:
+    """API Key 池测试类"""
+    
+    def test_least_loaded_spreads_in_flight_requests(self):
+        """测试最少负载策略分散在途请求"""
+        pool = APIKeyPool(["key-aaaaaaaa", "key-bbbbbbbb", "key-cccccccc"])
+        leases = [pool.acquire() for _ in range(6)]
+        
+        assert Counter(lease.key for lease in leases) == {
+            "key-aaaaaaaa": 2, "key-bbbbbbbb": 2, "key-cccccccc": 2
+        }
+    
+    def test_weighted_round_robin(self):
+        """测试加权轮询按权重分配"""
+        pool = APIKeyPool([{"key": "key-heavy-1", "weight": 3}, "key-light-1"],
+                          strategy="weighted_round_robin")
+        keys = []
+        for _ in range(8):
+            lease = pool.acquire()
+            keys.append(lease.key)
+            pool.release(lease, 200)
+        
+        assert Counter(keys) == {"key-heavy-1": 6, "key-light-1": 2}
+        assert keys[:4].count("key-light-1") == 1
+    
+    def test_rate_limited_key_is_benched(self):
+        """测试 429 后 Key 被暂停，全部暂停时退回最早恢复的 Key"""
+        pool = APIKeyPool(["key-aaaaaaaa", "key-bbbbbbbb"])
+        lease = pool.acquire()
+        pool.release(lease, 429, retry_after="60")
+        benched = lease.key
+        
+        for _ in range(3):
+            other = pool.acquire()
+            assert other.key != benched
+            pool.release(other, 200)
+        
+        pool.release(pool.acquire(), 401)
+        fallback = pool.acquire()
+        assert fallback.key == benched
+        
+        stats = pool.stats()
+        assert sum(s["rate_limited"] for s in stats) == 1
+        assert sum(s["unauthorized"] for s in stats) == 1
+    
+    def test_endpoint_bound_keys(self):
+        """测试绑定端点的 Key 只用于该端点"""
+        pool = APIKeyPool([{"key": "key-for-a-only", "endpoint": "https://a.example.com"},
+                           "key-for-anyone"])
+        assert all(pool.acquire("https://b.example.com").key == "key-for-anyone" for _ in range(3))
+    
+    def test_empty_pool_rejected(self):
+        """测试空的 Key 池"""
+        with pytest.raises(Exception):
+            APIKeyPool(["", "  "])
+
+
+class TestSharedKeyPool:
+    """共享 Key 池测试类"""
+    
+    def test_same_keys_share_pool(self):
+        """测试相同 Key 列表共享 Key 池，停用状态跨实例保留"""
+        pool = get_key_pool(["key-shared-aaaa", "key-shared-bbbb"])
+        lease = pool.acquire()
+        pool.release(lease, 429)
+        
+        assert get_key_pool(["key-shared-aaaa", "key-shared-bbbb"]) is pool
+        assert get_key_pool(["key-shared-aaaa"]) is not pool
+        assert [state["rate_limited"] for state in get_key_pool(["key-shared-aaaa", "key-shared-bbbb"]).stats()
+                if state["rate_limited"]] == [1]
+    
+    def test_gui_uses_configured_pool(self):
+        """测试界面创建的 ImageUtils 使用配置的 Key 池并在批次之间复用"""
+        from ui.widgets import create_image_utils
+        
+        keys = ["key-config-aaaa", {"key": "key-config-bbbb", "weight": 2}]
+        with patch("ui.widgets.config_manager.get_api_keys", side_effect=lambda: list(keys)):
+            first = create_image_utils("key-config-aaaa")
+            second = create_image_utils("key-config-aaaa")
+            typed = create_image_utils("key-typed-cccc")
+        
+        assert first.key_pool is second.key_pool
+        assert len(first.key_pool) == 2
+        assert typed.key_pool.primary_key == "key-typed-cccc"
+        assert len(typed.key_pool) == 3
+
+
+class TestImageUtilsKeyRotation:
+    """ImageUtils 使用 Key 池的测试类"""
+    
+    def test_request_rotates_keys_and_surfaces_errors(self):
+        """测试请求在 Key 之间切换并抛出 API 错误"""
+        session = MagicMock()
+        session.post.side_effect = [_response(429, {"Retry-After": "30"}), _response(200)]
+        pool = APIKeyPool(["key-aaaaaaaa", "key-bbbbbbbb"])
+        utils = ImageUtils(key_pool=pool)
+        
+        with patch.object(ImageUtils, "get_session", return_value=session):
+            with pytest.raises(APIException) as error:
+                utils.request_image("a cute cat playing")
+            assert error.value.status_code == 429
+            assert utils.request_image("a cute cat playing") == "aW1hZ2U="
+        
+        used = [call.kwargs["headers"]["Authorization"] for call in session.post.call_args_list]
+        assert used[0] != used[1]
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+端到端压力测试工具测试
+只运行很小的场景，完整压测请运行 python -m benchmarks.load_test
+"""
+
+import threading
+
+import pytest
+
+from benchmarks.load_test import current_rss_kb, format_report, percentile, run_scenario
+from utils.mock_server import create_mock_server
+
+
+@pytest.fixture
+def mock_url():
+    server = create_mock_server("127.0.0.1", 0, 0.05, seed=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    yield f"http://{host}:{port}{server.path}"
+    server.shutdown()
+    server.server_close()
+
+
+class TestLoadTest:
+    """压力测试工具测试类"""
+
+    def test_run_scenario(self, mock_url):
+        """测试场景运行完成并报告所有统计字段"""
+        result = run_scenario(mock_url, concurrency=2, batch_size=2, batches=2, size="64x96",
+                              batch_timeout=30)
+
+        assert result["images"] == 4
+        assert result["failed"] == 0
+        assert result["images_per_min"] > 0
+        assert 0 < result["p50"] <= result["p95"] <= result["p99"]
+        assert result["peak_threads"] >= 2
+        assert "P99" in format_report([result])
+
+    def test_percentile(self):
+        """测试最近邻分位数"""
+        values = list(range(1, 101))
+
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([3.0], 95) == 3.0
+        assert percentile([], 50) is None
+
+    def test_current_rss(self):
+        """测试能读取当前进程的内存"""
+        rss = current_rss_kb()
+
+        assert rss is None or rss > 0
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+异步日志和结构化事件日志测试
+"""
+
+import logging
+import sys
+import threading
+import time
+
+import pytest
+
+from utils.image_utils import ImageUtils
+from utils.logger import (
+    OVERFLOW_BLOCK, OVERFLOW_DROP_NEW, OVERFLOW_DROP_OLDEST, BoundedQueueHandler, _BoundedQueueListener,
+    get_request_id, log_event, log_manager, request_context
+)
+from utils.mock_server import create_mock_server
+
+
+class ListHandler(logging.Handler):
+    """把记录保存在列表中"""
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def make_record(message, level=logging.INFO):
+    return logging.LogRecord("test", level, __file__, 0, message, None, None)
+
+
+def queued_messages(handler):
+    return [record.getMessage() for record in list(handler.queue.queue)]
+
+
+class TestBoundedQueueHandler:
+    """有界队列日志处理器测试类"""
+
+    def test_drop_new(self):
+        """测试队列满时丢弃新记录"""
+        handler = BoundedQueueHandler(2, policy=OVERFLOW_DROP_NEW)
+
+        for message in ("a", "b", "c"):
+            handler.handle(make_record(message))
+
+        assert queued_messages(handler) == ["a", "b"]
+        assert handler.dropped == 1
+
+    def test_drop_oldest(self):
+        """测试队列满时丢弃最旧的记录"""
+        handler = BoundedQueueHandler(2, policy=OVERFLOW_DROP_OLDEST)
+
+        for message in ("a", "b", "c"):
+            handler.handle(make_record(message))
+
+        assert queued_messages(handler) == ["b", "c"]
+        assert handler.dropped == 1
+
+    def test_drop_oldest_keeps_errors(self):
+        """测试 drop_oldest 不会挤出错误日志，只剩错误日志时丢弃新记录"""
+        handler = BoundedQueueHandler(2, policy=OVERFLOW_DROP_OLDEST)
+
+        for message, level in (("e1", logging.ERROR), ("i1", logging.INFO), ("i2", logging.INFO)):
+            handler.handle(make_record(message, level))
+        assert queued_messages(handler) == ["e1", "i2"]
+
+        handler = BoundedQueueHandler(2, policy=OVERFLOW_DROP_OLDEST)
+        for message, level in (("e1", logging.ERROR), ("e2", logging.CRITICAL), ("i1", logging.INFO)):
+            handler.handle(make_record(message, level))
+
+        assert queued_messages(handler) == ["e1", "e2"]
+        assert handler.dropped == 1
+
+    def test_errors_wait_for_space(self):
+        """测试错误日志在队列满时等待空位，而不是被丢弃"""
+        handler = BoundedQueueHandler(1, policy=OVERFLOW_DROP_NEW, block_timeout=5)
+        handler.handle(make_record("a"))
+        threading.Timer(0.05, handler.queue.get).start()
+
+        handler.handle(make_record("boom", logging.ERROR))
+
+        assert queued_messages(handler) == ["boom"]
+        assert handler.dropped == 0
+
+    def test_block_timeout_drops(self):
+        """测试等待超时后丢弃"""
+        handler = BoundedQueueHandler(1, policy=OVERFLOW_BLOCK, block_timeout=0.05)
+        handler.handle(make_record("a"))
+
+        start = time.monotonic()
+        handler.handle(make_record("b"))
+
+        assert time.monotonic() - start >= 0.05
+        assert handler.dropped == 1
+
+    def test_invalid_policy(self):
+        """测试无效的策略"""
+        with pytest.raises(ValueError):
+            BoundedQueueHandler(10, policy="drop_random")
+
+    def test_listener_writes_in_background(self):
+        """测试后台线程写出日志，异常信息在入队前格式化"""
+        handler = BoundedQueueHandler(100)
+        target = ListHandler()
+        listener = _BoundedQueueListener(handler.queue, target)
+        listener.start()
+        try:
+            handler.handle(make_record("hello"))
+            try:
+                raise RuntimeError("boom")
+            except RuntimeError:
+                record = make_record("failed", logging.ERROR)
+                record.exc_info = sys.exc_info()
+                handler.handle(record)
+            handler.queue.join()
+        finally:
+            listener.stop()
+
+        assert target.messages[0] == "hello"
+        assert "RuntimeError: boom" in target.messages[1]
+
+    def test_stop_with_full_queue(self):
+        """测试队列满时停止监听线程不会抛出异常"""
+        handler = BoundedQueueHandler(2)
+        target = ListHandler()
+        listener = _BoundedQueueListener(handler.queue, target)
+        for message in ("a", "b"):
+            handler.handle(make_record(message))
+
+        listener.start()
+        listener.stop()
+
+        assert target.messages == ["a", "b"]
+
+
+class TestLogManagerAsync:
+    """日志管理器异步模式测试类"""
+
+    def test_stats(self):
+        """测试队列状态"""
+        logging.getLogger("test").info("stats")
+        log_manager.flush()
+
+        stats = log_manager.get_stats()
+
+        assert stats["async"] is True
+        assert stats["queued"] == 0
+        assert stats["policy"] == OVERFLOW_DROP_OLDEST
+
+
+class TestLogEvent:
+    """结构化事件日志测试类"""
+
+    def test_fields_and_request_id(self, caplog):
+        """测试事件字段格式和自动附加的请求 ID"""
+        logger = logging.getLogger("test.events")
+
+        with caplog.at_level(logging.INFO, logger="test.events"):
+            with request_context("req-1") as request_id:
+                log_event(logger, logging.INFO, "image_saved", path="a.png", duration=0.12345)
+
+        record = caplog.records[-1]
+        assert request_id == "req-1"
+        assert record.getMessage() == "image_saved request_id=req-1 path=a.png duration=0.123"
+        assert record.fields["path"] == "a.png"
+        assert get_request_id() is None
+
+    def test_disabled_level_skips_formatting(self, caplog):
+        """测试级别未启用时不格式化字段"""
+        class Explosive:
+            def __str__(self):
+                raise AssertionError("不应被格式化")
+
+        logger = logging.getLogger("test.events.quiet")
+        with caplog.at_level(logging.INFO, logger="test.events.quiet"):
+            log_event(logger, logging.DEBUG, "image_decoded", value=Explosive())
+
+        assert not caplog.records
+
+    def test_generation_events(self, caplog):
+        """测试生成请求记录带有请求 ID、模型、尺寸、耗时和字节数的事件"""
+        server = create_mock_server("127.0.0.1", 0, 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            host, port = server.server_address[:2]
+            utils = ImageUtils(api_key="sk-test-key-123456")
+            utils.api_url = f"http://{host}:{port}{server.path}"
+            with caplog.at_level(logging.INFO, logger="utils.image_utils"):
+                assert utils.generate_image("a cat", "1024x1536", "sora_image")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        fields = next(r.fields for r in caplog.records if getattr(r, "event", None) == "image_generated")
+        assert fields["model"] == "sora_image" and fields["size"] == "1024x1536"
+        assert fields["request_id"] and fields["duration"] > 0 and fields["bytes"] > 0
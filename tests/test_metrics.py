@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+指标统计测试
+"""
+
+import json
+import math
+import random
+import threading
+
+import pytest
+
+from utils.image_utils import ImageUtils
+from utils.metrics import Histogram, MetricsRegistry, export_metrics, generation_summary, metrics
+from utils.mock_server import create_mock_server
+
+
+class TestHistogram:
+    """延迟直方图测试类"""
+
+    def test_percentiles_within_relative_error(self):
+        """测试分位数相对误差不超过有效数字对应的精度"""
+        histogram = Histogram(significant_digits=2)
+        rng = random.Random(1)
+        values = [rng.lognormvariate(0, 1) for _ in range(2000)]
+        for value in values:
+            histogram.observe(value)
+
+        ordered = sorted(values)
+        for percent in (50, 90, 95, 99):
+            exact = ordered[math.ceil(percent / 100 * len(ordered)) - 1]
+            assert histogram.percentile(percent) == pytest.approx(exact, rel=0.01)
+
+    def test_exact_count_sum_and_bounds(self):
+        """测试计数、总和和最小/最大值精确，分位数不超出实际范围"""
+        histogram = Histogram()
+        for value in (0.5, 1.5, 2.5):
+            histogram.observe(value)
+
+        assert histogram.count == 3
+        assert histogram.sum == pytest.approx(4.5)
+        assert histogram.min == 0.5 and histogram.max == 2.5
+        assert histogram.percentile(0) >= 0.5
+        assert histogram.percentile(100) == 2.5
+
+    def test_empty_and_tiny_values(self):
+        """测试没有样本时返回 None，小于下限的值计入最低的桶"""
+        histogram = Histogram(lowest=0.001)
+        assert histogram.percentile(50) is None
+
+        histogram.observe(0)
+        assert histogram.percentile(50) == 0
+
+    def test_time_records_on_error(self):
+        """测试计时上下文在异常时也记录样本"""
+        histogram = Histogram()
+        with pytest.raises(RuntimeError):
+            with histogram.time():
+                raise RuntimeError("boom")
+
+        assert histogram.count == 1
+
+
+class TestMetricsRegistry:
+    """指标注册表测试类"""
+
+    def test_same_labels_share_metric(self):
+        """测试名称和标签相同时返回同一个指标，标签顺序无关"""
+        registry = MetricsRegistry()
+
+        first = registry.counter("requests_total", model="a", size="s")
+        second = registry.counter("requests_total", size="s", model="a")
+        other = registry.counter("requests_total", model="b", size="s")
+
+        assert first is second
+        assert first is not other
+        assert len(registry) == 2
+
+    def test_type_mismatch(self):
+        """测试同名指标类型不一致"""
+        registry = MetricsRegistry()
+        registry.counter("requests_total")
+
+        with pytest.raises(ValueError):
+            registry.gauge("requests_total")
+        with pytest.raises(ValueError):
+            registry.counter("requests_total").inc(-1)
+
+    def test_concurrent_increments(self):
+        """测试多线程并发计数不丢失"""
+        registry = MetricsRegistry()
+
+        def work():
+            for _ in range(1000):
+                registry.counter("hits_total").inc()
+                registry.histogram("work_seconds").observe(0.01)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert registry.counter("hits_total").value == 8000
+        assert registry.histogram("work_seconds").count == 8000
+
+    def test_prometheus_format(self):
+        """测试 Prometheus 文本格式"""
+        registry = MetricsRegistry()
+        registry.counter("image_generation_total", "生成请求数", model="m", outcome="ok").inc(2)
+        registry.gauge("in_flight", model='a"b').set(3)
+        registry.histogram("image_generation_seconds", model="m").observe(1.0)
+
+        text = registry.to_prometheus()
+
+        assert "# HELP image_generation_total 生成请求数" in text
+        assert "# TYPE image_generation_total counter" in text
+        assert 'image_generation_total{model="m",outcome="ok"} 2.0' in text
+        assert 'in_flight{model="a\\"b"} 3.0' in text
+        assert "# TYPE image_generation_seconds summary" in text
+        assert 'image_generation_seconds{model="m",quantile="0.95"}' in text
+        assert 'image_generation_seconds_count{model="m"} 1' in text
+
+    def test_export_and_summary(self, tmp_path):
+        """测试导出 JSON 快照和 Prometheus 文件，并按模型汇总错误率和 p95"""
+        registry = MetricsRegistry()
+        registry.counter("image_generation_total", model="m", size="s", outcome="ok").inc(3)
+        registry.counter("image_generation_total", model="m", size="s", outcome="timeout").inc(1)
+        for value in (1.0, 2.0, 3.0):
+            registry.histogram("image_generation_seconds", model="m", size="s").observe(value)
+        json_path, prom_path = tmp_path / "metrics.json", tmp_path / "metrics.prom"
+
+        assert export_metrics(str(json_path), str(prom_path), registry=registry)
+
+        with open(json_path, "r", encoding="utf-8") as f:
+            summary = generation_summary(json.load(f))
+        assert prom_path.read_text(encoding="utf-8") == registry.to_prometheus()
+        assert len(summary) == 1
+        assert summary[0]["requests"] == 4 and summary[0]["error_rate"] == 0.25
+        assert summary[0]["p95"] == pytest.approx(3.0, rel=0.01)
+
+
+class TestGenerationMetrics:
+    """生成请求指标测试类"""
+
+    def test_generation_recorded(self):
+        """测试生成请求记录结果计数和耗时直方图"""
+        server = create_mock_server("127.0.0.1", 0, 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            host, port = server.server_address[:2]
+            utils = ImageUtils(api_key="sk-test-key-123456")
+            utils.api_url = f"http://{host}:{port}{server.path}"
+            ok = metrics.counter("image_generation_total", model="sora_image", size="1536x1024", outcome="ok")
+            histogram = metrics.histogram("image_generation_seconds", model="sora_image", size="1536x1024")
+            before_ok, before_count = ok.value, histogram.count
+
+            assert utils.generate_image("a cat", "1536x1024", "sora_image")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert ok.value == before_ok + 1
+        assert histogram.count == before_count + 1
+        assert metrics.gauge("image_generation_in_flight", model="sora_image").value == 0
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+本地模拟图像服务故障注入测试
+通过模拟服务驱动 ImageUtils.generate_image 的完整请求流程
+"""
+
+import base64
+import io
+import random
+import statistics
+import threading
+
+import pytest
+from PIL import Image
+
+from utils.exceptions import APIException
+from utils.image_utils import ImageUtils
+from utils.mock_server import create_mock_server, pad_png, render_image, sample_latency
+
+
+@pytest.fixture
+def start_server():
+    servers = []
+
+    def start(**profile):
+        server = create_mock_server("127.0.0.1", 0, **profile)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        host, port = server.server_address[:2]
+        utils = ImageUtils(api_key="sk-test-key-123456")
+        utils.api_url = f"http://{host}:{port}{server.path}"
+        return server, utils
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class TestMockServerFaults:
+    """故障注入测试类"""
+
+    def test_generate_image_success(self, start_server):
+        """测试正常响应"""
+        server, utils = start_server(latency=0.05)
+
+        info = ImageUtils.get_image_info(utils.generate_image("a cat", "1536x1024", "sora_image"))
+
+        assert (info["width"], info["height"]) == (1536, 1024)
+        assert server.stats()["ok"] == 1
+
+    def test_rate_limited(self, start_server):
+        """测试 429 响应带 Retry-After，客户端得到限流错误"""
+        server, utils = start_server(latency=0, rate_limit_rate=1.0, retry_after=7)
+
+        with pytest.raises(APIException) as exc_info:
+            utils.request_image("a cat", "1024x1536", "sora_image")
+
+        assert exc_info.value.status_code == 429
+        assert server.stats()["rate_limited"] == 1
+
+    def test_server_error_returns_none(self, start_server):
+        """测试 500 响应时 generate_image 返回 None"""
+        server, utils = start_server(latency=0, error_rate=1.0)
+
+        assert utils.generate_image("a cat", "1024x1536", "sora_image") is None
+        assert server.stats()["error"] >= 1
+
+    def test_truncated_response_returns_none(self, start_server):
+        """测试响应体被截断时 generate_image 返回 None"""
+        server, utils = start_server(latency=0, partial_rate=1.0)
+
+        assert utils.generate_image("a cat", "1024x1536", "sora_image") is None
+        assert server.stats()["partial"] >= 1
+
+    def test_truncated_stream_raises(self, start_server):
+        """测试事件流没有最终图像时请求失败"""
+        _, utils = start_server(latency=0.05, partial_rate=1.0)
+        partials = []
+
+        with pytest.raises(APIException):
+            utils.request_image("a cat", "1024x1536", "gpt-image-1",
+                                on_partial=lambda data, index: partials.append(index))
+        assert partials == [0, 1]
+
+    def test_payload_padding(self, start_server):
+        """测试按配置填充响应大小，图像仍可正常解码"""
+        _, utils = start_server(latency=0, payload_bytes=200_000)
+
+        image_bytes = base64.b64decode(utils.generate_image("a cat", "1024x1536", "sora_image"))
+
+        assert len(image_bytes) == 200_000
+        assert Image.open(io.BytesIO(image_bytes)).size == (1024, 1536)
+
+    def test_unknown_option(self):
+        """测试未知的配置项"""
+        with pytest.raises(ValueError):
+            create_mock_server("127.0.0.1", 0, error_ratio=0.5)
+        with pytest.raises(ValueError):
+            create_mock_server("127.0.0.1", 0, latency_distribution="pareto")
+
+
+class TestMockServerHelpers:
+    """模拟服务辅助函数测试类"""
+
+    @pytest.mark.parametrize("distribution", ["uniform", "normal", "lognormal", "exponential"])
+    def test_latency_distributions(self, distribution):
+        """测试随机延迟非负且中心值接近配置的延迟"""
+        rng = random.Random(42)
+        samples = [sample_latency(rng, 2.0, distribution, 0.3) for _ in range(2000)]
+
+        assert min(samples) >= 0
+        center = statistics.median(samples) if distribution == "lognormal" else statistics.mean(samples)
+        assert center == pytest.approx(2.0, rel=0.1)
+
+    def test_fixed_latency(self):
+        """测试固定延迟"""
+        assert sample_latency(random.Random(), 1.5) == 1.5
+
+    def test_pad_png_keeps_image(self):
+        """测试填充后的 PNG 仍是有效图像，小于当前大小时不填充"""
+        data = render_image("a cat", (64, 96))
+
+        padded = pad_png(data, len(data) + 1000)
+
+        assert len(padded) == len(data) + 1000
+        assert Image.open(io.BytesIO(padded)).size == (64, 96)
+        assert pad_png(data, 10) == data
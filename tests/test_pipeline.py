@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+分阶段处理流水线测试
+"""
+
+import base64
+import io
+import queue
+import threading
+
+import pytest
+from PIL import Image
+
+from utils.pipeline import Pipeline, PipelineStage
+
+
+def _collector():
+    results = {}
+    done = threading.Condition()
+
+    def on_result(context, value):
+        with done:
+            results[context] = value
+            done.notify_all()
+
+    def wait_for(count, timeout=5.0):
+        with done:
+            assert done.wait_for(lambda: len(results) >= count, timeout)
+        return results
+
+    return on_result, wait_for
+
+
+class TestPipeline:
+    """流水线测试类"""
+
+    def test_items_pass_through_all_stages(self):
+        """测试条目依次经过所有阶段"""
+        on_result, wait_for = _collector()
+        pipeline = Pipeline([
+            PipelineStage("double", lambda x: x * 2, workers=2),
+            PipelineStage("increment", lambda x: x + 1, workers=2)
+        ], on_result=on_result)
+
+        for i in range(10):
+            pipeline.submit(i, context=i)
+        results = wait_for(10)
+        pipeline.close()
+
+        assert results == {i: i * 2 + 1 for i in range(10)}
+        assert [stage["processed"] for stage in pipeline.stats()] == [10, 10]
+
+    def test_failed_item_reported_and_not_forwarded(self):
+        """测试失败的条目回调 on_error，不再传给下游"""
+        errors = []
+        on_result, wait_for = _collector()
+
+        def check(x):
+            if x == 3:
+                raise ValueError("bad item")
+            return x
+
+        pipeline = Pipeline([PipelineStage("check", check), PipelineStage("copy", lambda x: x)],
+                            on_result=on_result,
+                            on_error=lambda context, stage, error: errors.append((context, stage)))
+        for i in range(5):
+            pipeline.submit(i, context=i)
+        pipeline.close()
+
+        assert errors == [(3, "check")]
+        assert sorted(wait_for(4)) == [0, 1, 2, 4]
+        assert pipeline.stats()[0]["failed"] == 1
+
+    def test_backpressure_blocks_submit(self):
+        """测试下游处理不过来时提交方被阻塞"""
+        release = threading.Event()
+        pipeline = Pipeline([
+            PipelineStage("fast", lambda x: x, queue_size=1),
+            PipelineStage("slow", lambda x: release.wait(5), queue_size=1)
+        ])
+
+        # slow 处理中 1 个 + slow 队列 1 个 + fast 手上 1 个 + fast 队列 1 个
+        for i in range(4):
+            pipeline.submit(i, timeout=1)
+        with pytest.raises(queue.Full):
+            pipeline.submit(4, timeout=0.2)
+
+        release.set()
+        pipeline.close()
+
+    def test_close_drains_and_rejects_new_items(self):
+        """测试关闭时处理完已提交的条目，之后拒绝提交"""
+        on_result, wait_for = _collector()
+        pipeline = Pipeline([PipelineStage("a", lambda x: x), PipelineStage("b", lambda x: x)],
+                            on_result=on_result)
+        for i in range(3):
+            pipeline.submit(i, context=i)
+        pipeline.close()
+
+        assert len(wait_for(3, timeout=0)) == 3
+        with pytest.raises(RuntimeError):
+            pipeline.submit(99)
+
+    def test_requires_stage(self):
+        """测试没有阶段时报错"""
+        with pytest.raises(ValueError):
+            Pipeline([])
+
+
+class TestRenderStages:
+    """生成结果处理阶段测试类"""
+
+    def test_decode_and_thumbnail(self):
+        """测试解码和缩略图阶段输出界面使用的缩略图尺寸，并释放原图"""
+        from ui.widgets import GenerationManager
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (1024, 1536), "red").save(buffer, format="PNG")
+        item = {"index": 0, "data": base64.b64encode(buffer.getvalue()).decode("ascii")}
+
+        item = GenerationManager._thumbnail_stage(GenerationManager._decode_stage(item))
+
+        assert item["thumbnail"].size == (160, 240)
+        assert "image" not in item
+
+    def test_display_does_not_wait_for_persist(self, tmp_path):
+        """测试配置了自动保存目录时，图像在写入 PNG 之前已经交给界面"""
+        from unittest.mock import patch
+
+        from ui.widgets import GenerationManager
+        from utils.scheduler import GenerationScheduler
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 96), "red").save(buffer, format="PNG")
+        image_data = base64.b64encode(buffer.getvalue()).decode("ascii")
+
+        class FakeImageUtils:
+            def check_availability(self):
+                pass
+
+            def generate_image_async(self, index, callback, **kwargs):
+                callback(index, image_data)
+
+        release = threading.Event()
+        shown = threading.Event()
+        saved = threading.Event()
+
+        def slow_persist(item):
+            release.wait(5)
+            saved.set()
+            return item
+
+        scheduler = GenerationScheduler(max_workers=1, name="persist-test")
+        manager = GenerationManager(None, complete_callback=lambda *args: shown.set(), scheduler=scheduler,
+                                    image_utils_factory=lambda api_key: FakeImageUtils(), persist_latency=False)
+        try:
+            with patch("ui.widgets.config_manager.get", return_value=str(tmp_path)), \
+                    patch.object(GenerationManager, "_persist_stage", staticmethod(slow_persist)):
+                manager.start_generation("a cat", 1, "sk-test-key-123456", "1024x1536", "sora_image")
+                assert shown.wait(5)
+                assert not saved.is_set()
+                release.set()
+                assert saved.wait(5)
+        finally:
+            release.set()
+            scheduler.shutdown()
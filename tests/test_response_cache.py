@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+响应缓存测试
+"""
+
+import base64
+import os
+import time
+from unittest.mock import MagicMock, patch
+
+from utils.image_utils import ImageUtils
+from utils.response_cache import ResponseCache
+
+
+def _b64(size):
+    return base64.b64encode(b"x" * size).decode("ascii")
+
+
+class TestResponseCache:
+    """响应缓存测试类"""
+
+    def test_put_and_get(self, tmp_path):
+        """测试写入后命中，并在重新打开后仍然有效"""
+        cache = ResponseCache(str(tmp_path))
+        cache.put("abc", _b64(10))
+
+        assert cache.get("abc") == _b64(10)
+        assert cache.get("missing") is None
+        assert ResponseCache(str(tmp_path)).get("abc") == _b64(10)
+        assert cache.stats()["hits"] == 1
+
+    def test_ttl_expiry(self, tmp_path):
+        """测试过期条目不再命中并被删除"""
+        cache = ResponseCache(str(tmp_path), ttl=60)
+        cache.put("abc", _b64(10))
+        path = os.path.join(str(tmp_path), "abc.png")
+        old = time.time() - 120
+        os.utime(path, (old, old))
+
+        assert cache.get("abc") is None
+        assert not os.path.exists(path)
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """测试超过大小上限时淘汰最久未使用的条目"""
+        cache = ResponseCache(str(tmp_path), max_bytes=250)
+        cache.put("a", _b64(100))
+        cache.put("b", _b64(100))
+        cache.get("a")
+        cache.put("c", _b64(100))
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        assert cache.stats()["bytes"] == 200
+
+
+class TestImageUtilsResponseCache:
+    """ImageUtils 响应缓存测试类"""
+
+    def test_cache_hit_skips_network(self, tmp_path):
+        """测试相同请求第二次直接从缓存返回"""
+        response = MagicMock(status_code=200, headers={})
+        response.json.return_value = {"data": [{"b64_json": "aW1hZ2U="}]}
+        session = MagicMock()
+        session.post.return_value = response
+        utils = ImageUtils(api_key="sk-test-key-123456")
+        utils.enable_response_cache(str(tmp_path))
+
+        with patch.object(ImageUtils, "get_session", return_value=session):
+            first = utils.request_image("a cat", "1024x1536", "sora_image")
+            second = utils.request_image("a cat", "1024x1536", "sora_image")
+            utils.request_image("a dog", "1024x1536", "sora_image")
+
+        assert first == second == "aW1hZ2U="
+        assert session.post.call_count == 2
+
+    def test_slots_cached_separately(self, tmp_path):
+        """测试同一批的各张图像分别缓存，不会得到同一张图像"""
+        images = iter(["aW1hZ2Ux", "aW1hZ2Uy"])
+
+        def post(url, **kwargs):
+            response = MagicMock(status_code=200, headers={})
+            response.json.return_value = {"data": [{"b64_json": next(images)}]}
+            return response
+
+        session = MagicMock()
+        session.post.side_effect = post
+        utils = ImageUtils(api_key="sk-test-key-123456")
+        utils.enable_response_cache(str(tmp_path))
+
+        with patch.object(ImageUtils, "get_session", return_value=session):
+            first = [utils.request_image("a cat", cache_slot=slot) for slot in (0, 1)]
+            second = [utils.request_image("a cat", cache_slot=slot) for slot in (0, 1)]
+
+        assert first == second == ["aW1hZ2Ux", "aW1hZ2Uy"]
+        assert session.post.call_count == 2
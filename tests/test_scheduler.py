@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+调度器模块测试
+"""
+
+import threading
+import time
+
+import pytest
+
+from utils.scheduler import (
+    PRIORITY_BULK, PRIORITY_INTERACTIVE, PRIORITY_NORMAL, GenerationScheduler
+)
+
+
+class FakeImageUtils:
+    """模拟的图像工具，记录并发度"""
+    
+    def __init__(self, delay: float = 0.05, fail_prompts=()):
+        self.delay = delay
+        self.fail_prompts = set(fail_prompts)
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+    
+    def generate_image(self, prompt, size, model):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+        if prompt in self.fail_prompts:
+            raise RuntimeError("boom")
+        return f"{prompt}|{size}|{model}"
+
+
+class TestGenerationScheduler:
+    """生成任务调度器测试类"""
+    
+    def test_submit_returns_result(self):
+        """测试提交任务并获取结果"""
+        scheduler = GenerationScheduler(max_workers=2)
+        future = scheduler.submit(lambda a, b: a + b, 1, b=2)
+        assert future.result(timeout=5) == 3
+        scheduler.shutdown()
+    
+    def test_concurrency_is_bounded(self):
+        """测试并发数不超过上限"""
+        fake = FakeImageUtils()
+        scheduler = GenerationScheduler(max_workers=3)
+        futures = [scheduler.submit_generation(fake, f"p{i}", "1024x1536", "sora_image")
+                   for i in range(10)]
+        results = [f.result(timeout=5) for f in futures]
+        scheduler.shutdown()
+        
+        assert results[0] == "p0|1024x1536|sora_image"
+        assert fake.max_running <= 3
+    
+    def test_callback_receives_none_on_failure(self):
+        """测试任务异常时回调收到 None"""
+        fake = FakeImageUtils(delay=0, fail_prompts=["bad"])
+        scheduler = GenerationScheduler(max_workers=1)
+        received = {}
+        done = threading.Event()
+        
+        def callback(index, result):
+            received[index] = result
+            if len(received) == 2:
+                done.set()
+        
+        scheduler.submit_generation(fake, "good", "1024x1536", "sora_image", callback, index=0)
+        scheduler.submit_generation(fake, "bad", "1024x1536", "sora_image", callback, index=1)
+        assert done.wait(5)
+        scheduler.shutdown()
+        
+        assert received[0] == "good|1024x1536|sora_image"
+        assert received[1] is None
+    
+    def test_shutdown_cancels_pending(self):
+        """测试关闭时取消未开始的任务"""
+        started = threading.Event()
+        release = threading.Event()
+        
+        def blocking():
+            started.set()
+            release.wait(5)
+        
+        scheduler = GenerationScheduler(max_workers=1)
+        first = scheduler.submit(blocking)
+        second = scheduler.submit(lambda: "never")
+        assert started.wait(5)
+        
+        scheduler.shutdown(wait=False, cancel_pending=True)
+        release.set()
+        first.result(timeout=5)
+        assert second.cancelled()
+        
+        with pytest.raises(RuntimeError):
+            scheduler.submit(lambda: None)
+
+
+class TestSchedulerPriority:
+    """任务优先级测试类"""
+    
+    def _blocked_scheduler(self, **kwargs):
+        """创建一个唯一工作线程被占用的调度器，便于控制后续任务的执行顺序"""
+        scheduler = GenerationScheduler(max_workers=1, **kwargs)
+        started = threading.Event()
+        release = threading.Event()
+        
+        def blocking():
+            started.set()
+            release.wait(5)
+        
+        scheduler.submit(blocking)
+        assert started.wait(5)
+        return scheduler, release
+    
+    def test_higher_priority_runs_first(self):
+        """测试排队任务按优先级执行"""
+        scheduler, release = self._blocked_scheduler()
+        order = []
+        futures = [
+            scheduler.submit_with_priority(PRIORITY_BULK, order.append, "bulk"),
+            scheduler.submit_with_priority(PRIORITY_NORMAL, order.append, "normal"),
+            scheduler.submit_with_priority(PRIORITY_INTERACTIVE, order.append, "interactive"),
+        ]
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+        scheduler.shutdown()
+        
+        assert order == ["interactive", "normal", "bulk"]
+    
+    def test_starving_task_is_not_bypassed(self):
+        """测试等待超时的低优先级任务不再被插队"""
+        scheduler, release = self._blocked_scheduler(starvation_timeout=0.05)
+        order = []
+        bulk = scheduler.submit_with_priority(PRIORITY_BULK, order.append, "bulk")
+        time.sleep(0.1)
+        interactive = scheduler.submit_with_priority(PRIORITY_INTERACTIVE, order.append, "interactive")
+        release.set()
+        bulk.result(timeout=5)
+        interactive.result(timeout=5)
+        scheduler.shutdown()
+        
+        assert order == ["bulk", "interactive"]
+    
+    def test_reserved_worker_for_interactive(self):
+        """测试批量任务占满可用线程时，界面操作仍能立即执行"""
+        release = threading.Event()
+        scheduler = GenerationScheduler(max_workers=3, reserved_interactive=1)
+        bulk = [scheduler.submit_with_priority(PRIORITY_BULK, release.wait, 5) for _ in range(4)]
+        time.sleep(0.1)
+        
+        assert scheduler.queue_stats()[PRIORITY_BULK] == {"active": 2, "queued": 2}
+        assert scheduler.submit_with_priority(PRIORITY_INTERACTIVE, lambda: "ok").result(timeout=2) == "ok"
+        
+        release.set()
+        for future in bulk:
+            future.result(timeout=5)
+        scheduler.shutdown()
+    
+    def test_invalid_priority(self):
+        """测试无效的优先级"""
+        scheduler = GenerationScheduler(max_workers=1)
+        with pytest.raises(ValueError):
+            scheduler.submit_with_priority("urgent", lambda: None)
+        scheduler.shutdown()
+    
+    def test_delayed_task_does_not_hold_worker(self):
+        """测试延后任务到期前不占用工作线程"""
+        scheduler = GenerationScheduler(max_workers=1)
+        start = time.monotonic()
+        delayed = scheduler.submit_later(0.3, PRIORITY_BULK, time.monotonic)
+        immediate = scheduler.submit(time.monotonic)
+        
+        assert immediate.result(timeout=5) - start < 0.2
+        assert delayed.result(timeout=5) - start >= 0.3
+        scheduler.shutdown()
+    
+    def test_shutdown_cancels_delayed(self):
+        """测试关闭时取消尚未到期的延后任务"""
+        scheduler = GenerationScheduler(max_workers=1)
+        delayed = scheduler.submit_later(60, PRIORITY_NORMAL, lambda: "never")
+        
+        scheduler.shutdown(cancel_pending=True)
+        assert delayed.cancelled()
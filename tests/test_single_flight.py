@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+请求合并测试
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from utils.image_utils import ImageUtils
+from utils.single_flight import SingleFlight
+
+
+def _wait_until(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.01)
+
+
+class TestSingleFlight:
+    """请求合并测试类"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        """测试同时进行的相同调用只执行一次"""
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            started.set()
+            release.wait(2)
+            return "result"
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            first = pool.submit(flight.do, "key", work)
+            started.wait(2)
+            others = [pool.submit(flight.do, "key", work) for _ in range(3)]
+            _wait_until(lambda: flight.stats()["coalesced"] == 3)
+            release.set()
+            results = [first.result(timeout=2)] + [f.result(timeout=2) for f in others]
+
+        assert results == ["result"] * 4
+        assert len(calls) == 1
+        assert flight.stats() == {"executed": 1, "coalesced": 3, "in_flight": 0}
+
+    def test_error_is_shared_and_not_cached(self):
+        """测试异常传递给所有等待方，完成后的调用重新执行"""
+        flight = SingleFlight()
+
+        def fail():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            flight.do("key", fail)
+        assert flight.do("key", lambda: "ok") == "ok"
+        assert flight.stats()["executed"] == 2
+
+
+class TestImageUtilsCoalescing:
+    """ImageUtils 请求合并测试类"""
+
+    def test_identical_requests_coalesced(self):
+        """测试相同的进行中请求只调用一次 API"""
+        release = threading.Event()
+
+        def post(url, **kwargs):
+            release.wait(2)
+            response = MagicMock(status_code=200, headers={})
+            response.json.return_value = {"data": [{"b64_json": "aW1hZ2U="}]}
+            return response
+
+        session = MagicMock()
+        session.post.side_effect = post
+        utils = ImageUtils(api_key="sk-test-key-123456")
+        before = ImageUtils._single_flight.stats()["coalesced"]
+
+        with patch.object(ImageUtils, "get_session", return_value=session):
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                futures = [pool.submit(utils.generate_image, "a cat", coalesce=True) for _ in range(2)]
+                _wait_until(lambda: ImageUtils._single_flight.stats()["coalesced"] > before)
+                release.set()
+                results = [f.result(timeout=2) for f in futures]
+
+        assert results == ["aW1hZ2U="] * 2
+        assert session.post.call_count == 1
+
+    def test_payload_hash_is_order_independent(self):
+        """测试请求哈希与字段顺序无关"""
+        assert ImageUtils.payload_hash({"a": 1, "b": 2}) == ImageUtils.payload_hash({"b": 2, "a": 1})
+        assert ImageUtils.payload_hash({"a": 1}) != ImageUtils.payload_hash({"a": 2})
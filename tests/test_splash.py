@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+延迟构建步骤测试
+用手动触发的调度函数代替窗口的 after_idle，不需要显示环境
+"""
+
+from ui.splash import DeferredSteps
+
+
+class FakeIdle:
+    """记录待执行的空闲回调，手动逐个触发"""
+
+    def __init__(self):
+        self.pending = []
+
+    def __call__(self, callback):
+        self.pending.append(callback)
+
+    def run_once(self):
+        self.pending.pop(0)()
+
+
+class TestDeferredSteps:
+    """延迟构建步骤测试类"""
+
+    def test_one_step_per_idle(self):
+        """测试每次空闲只执行一个步骤，全部完成后通知"""
+        idle = FakeIdle()
+        steps = DeferredSteps(idle)
+        calls, ready = [], []
+        steps.add("a", lambda: calls.append("a"))
+        steps.add("b", lambda: calls.append("b"))
+        steps.on_ready(lambda: ready.append(True))
+
+        steps.start()
+        idle.run_once()
+        assert calls == ["a"] and not ready
+
+        idle.run_once()
+        assert calls == ["a", "b"] and ready == [True]
+        assert steps.done
+        assert [name for name, _ in steps.timings] == ["a", "b"]
+        assert idle.pending == []
+
+    def test_run_all_finishes_remaining(self):
+        """测试需要延迟构建的部分时可以立即完成剩余步骤，之后的空闲回调不重复执行"""
+        idle = FakeIdle()
+        steps = DeferredSteps(idle)
+        calls, ready = [], []
+        for name in ("a", "b", "c"):
+            steps.add(name, lambda name=name: calls.append(name))
+        steps.on_ready(lambda: ready.append(True))
+        steps.start()
+
+        steps.run_all()
+        idle.run_once()
+
+        assert calls == ["a", "b", "c"]
+        assert ready == [True]
+
+    def test_on_ready_when_done(self):
+        """测试已完成时立即调用回调"""
+        steps = DeferredSteps(FakeIdle())
+        ready = []
+
+        steps.on_ready(lambda: ready.append(True))
+
+        assert ready == [True]
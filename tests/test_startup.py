@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+启动耗时测试
+在新的解释器中导入图形界面入口模块，检查冷启动导入耗时和延迟导入的模块
+"""
+
+import json
+
+from config.constants import STARTUP_CONFIG
+from utils.config_manager import ConfigManager
+from utils.startup_profile import measure_cold_start, parse_importtime, profile_import
+
+
+class TestStartupBudget:
+    """冷启动预算测试类"""
+
+    def test_deferred_modules_not_loaded(self):
+        """测试启动时不加载 requests、生成相关的模块"""
+        profile = profile_import()
+
+        eager = [name for name in STARTUP_CONFIG["deferred_modules"] if name in profile["loaded"]]
+        assert eager == []
+
+    def test_cold_start_budget(self):
+        """测试入口模块的冷启动导入耗时不超过同一进程中测得的界面库导入耗时的若干倍"""
+        baseline = measure_cold_start(STARTUP_CONFIG["baseline_module"], runs=3)
+
+        assert measure_cold_start(runs=3) <= baseline * STARTUP_CONFIG["import_budget_ratio"]
+
+
+class TestStartupProfile:
+    """启动耗时分析测试类"""
+
+    def test_parse_importtime(self):
+        """测试解析 -X importtime 输出"""
+        output = "\n".join([
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |   json.decoder",
+            "import time:       300 |        420 | json",
+            "other output",
+        ])
+
+        entries = parse_importtime(output)
+
+        assert [e["module"] for e in entries] == ["json.decoder", "json"]
+        assert entries[0]["depth"] == 1
+        assert entries[1]["cumulative_us"] == 420
+
+    def test_config_loaded_on_first_access(self, tmp_path):
+        """测试配置文件在首次访问时才读取"""
+        config_file = tmp_path / "config.json"
+        manager = ConfigManager(str(config_file))
+        config_file.write_text(json.dumps({"api_key": "sk-late"}), encoding="utf-8")
+
+        assert manager.config["api_key"] == "sk-late"
+
+    def test_utils_lazy_export(self):
+        """测试 utils 包按需导出 ImageUtils"""
+        import utils
+        from utils.image_utils import ImageUtils
+
+        assert utils.ImageUtils is ImageUtils
+        assert "ImageUtils" in dir(utils)
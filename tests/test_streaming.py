@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+流式预览和本地模拟图像服务测试
+"""
+
+import threading
+import time
+
+import pytest
+
+from utils.exceptions import APIException
+from utils.image_utils import ImageUtils
+from utils.mock_server import create_mock_server
+
+
+@pytest.fixture
+def mock_url():
+    server = create_mock_server("127.0.0.1", 0, latency=0.2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    yield f"http://{host}:{port}{server.path}"
+    server.shutdown()
+    server.server_close()
+
+
+class TestStreamingPreview:
+    """流式预览测试类"""
+
+    def test_partial_frames_then_final_image(self, mock_url):
+        """测试先收到预览帧，再返回最终图像"""
+        utils = ImageUtils(api_key="sk-test-key-123456")
+        utils.api_url = mock_url
+        partials = []
+
+        b64_data = utils.request_image("a cat", "1024x1536", "gpt-image-1",
+                                       on_partial=lambda data, index: partials.append(index))
+
+        info = ImageUtils.get_image_info(b64_data)
+        assert partials == [0, 1]
+        assert (info["width"], info["height"]) == (1024, 1536)
+
+    def test_partial_frames_arrive_progressively(self):
+        """测试预览帧在生成过程中陆续到达，而不是与最终图像一起在响应结束时到达"""
+        server = create_mock_server("127.0.0.1", 0, latency=1.5)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            host, port = server.server_address[:2]
+            utils = ImageUtils(api_key="sk-test-key-123456")
+            utils.api_url = f"http://{host}:{port}{server.path}"
+            arrivals = {}
+            start = time.perf_counter()
+
+            utils.request_image("a cat", "1024x1536", "gpt-image-1",
+                                on_partial=lambda data, index: arrivals.setdefault(index, time.perf_counter()))
+            total = time.perf_counter() - start
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        # 两个预览帧分别约在 0.5s 和 1.0s 到达，最终图像约在 1.5s
+        assert sorted(arrivals) == [0, 1]
+        assert arrivals[0] - start < total - 0.7
+        assert arrivals[1] - start < total - 0.3
+
+    def test_non_streaming_model_returns_json(self, mock_url):
+        """测试不支持流式的模型仍按普通请求返回"""
+        utils = ImageUtils(api_key="sk-test-key-123456")
+        utils.api_url = mock_url
+        partials = []
+
+        b64_data = utils.request_image("a cat", "1536x1024", "sora_image",
+                                       on_partial=lambda data, index: partials.append(index))
+
+        info = ImageUtils.get_image_info(b64_data)
+        assert partials == []
+        assert (info["width"], info["height"]) == (1536, 1024)
+
+    def test_error_event_raises(self):
+        """测试事件流中的错误事件"""
+        with pytest.raises(APIException):
+            ImageUtils._handle_stream_event(b'{"type": "error", "error": {"message": "bad"}}')
+
+    def test_partial_event_does_not_finish(self):
+        """测试预览帧事件不作为最终结果"""
+        frames = []
+        event = b'{"type": "image_generation.partial_image", "b64_json": "eA==", "partial_image_index": 0}'
+
+        assert ImageUtils._handle_stream_event(event, lambda data, index: frames.append(data)) is None
+        assert frames == ["eA=="]
+
+
+class TestPreviewFailure:
+    """预览后失败的图像测试类"""
+
+    def test_failed_slot_reports_index(self):
+        """测试显示过预览帧的图像失败时按索引通知，界面据此撤下预览帧"""
+        from ui.widgets import GenerationManager
+        from utils.scheduler import GenerationScheduler
+
+        class FailingImageUtils:
+            def check_availability(self):
+                pass
+
+            def generate_image_async(self, index, callback, partial_callback, **kwargs):
+                partial_callback(index, "cHJldmlldw==")
+                callback(index, None)
+
+        events = []
+        finished = threading.Event()
+        scheduler = GenerationScheduler(max_workers=1, name="preview-failure-test")
+        manager = GenerationManager(None, preview_callback=lambda index, *args: events.append(("preview", index)),
+                                    failed_callback=lambda index: events.append(("failed", index)),
+                                    error_callback=lambda message: events.append(("error", message)),
+                                    finished_callback=finished.set, scheduler=scheduler,
+                                    image_utils_factory=lambda api_key: FailingImageUtils(), persist_latency=False)
+        try:
+            manager.start_generation("a cat", 1, "sk-test-key-123456", "1024x1536", "sora_image")
+            assert finished.wait(5)
+        finally:
+            scheduler.shutdown()
+
+        assert events == [("preview", 0), ("failed", 0), ("error", "第 1 张图片生成失败")]
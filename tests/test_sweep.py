@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+参数矩阵对比测试
+"""
+
+import os
+
+from utils.sweep import SweepGrid, expand_matrix, interleave_tasks
+
+
+class TestSweep:
+    """参数矩阵对比测试类"""
+    
+    def test_expand_matrix_deduplicates(self):
+        """测试展开矩阵并去除重复组合"""
+        tasks = expand_matrix(
+            ["a red apple", "a red apple ", "a blue car"],
+            ["sora_image", "gpt-image-1", "sora_image"],
+            ["1024x1536"],
+            repeats=2
+        )
+        
+        assert len(tasks) == 2 * 2 * 1 * 2
+        assert len({t.task_id for t in tasks}) == len(tasks)
+    
+    def test_interleave_alternates_models(self):
+        """测试任务按模型交错排列"""
+        tasks = expand_matrix(["a red apple", "a blue car"], ["sora_image", "gpt-image-1"],
+                              ["1024x1536", "1536x1024"])
+        models = [t.model for t in interleave_tasks(tasks)]
+        
+        assert sorted(models) == sorted(t.model for t in tasks)
+        assert all(a != b for a, b in zip(models, models[1:]))
+    
+    def test_grid_page_tracks_results(self, tmp_path):
+        """测试对比网格页面随结果更新"""
+        tasks = expand_matrix(["a red apple"], ["sora_image", "gpt-image-1"], ["1024x1536"])
+        grid = SweepGrid(tasks, str(tmp_path))
+        
+        grid.update(tasks[0], os.path.join(str(tmp_path), "a.png"))
+        grid.update(tasks[1], None)
+        page = open(grid.html_path, encoding="utf-8").read()
+        
+        assert 'src="a.png"' in page
+        assert "❌" in page
+        assert "<h3>2/2</h3>" in page
+    
+    def test_grid_page_is_throttled(self, tmp_path):
+        """测试刷新间隔内不重写网格页面，全部完成或 flush 时写入"""
+        tasks = expand_matrix(["a red apple"], ["sora_image", "gpt-image-1"], ["1024x1536"], repeats=2)
+        grid = SweepGrid(tasks, str(tmp_path), refresh_interval=3600)
+        
+        def page():
+            return open(grid.html_path, encoding="utf-8").read()
+        
+        grid.update(tasks[0], None)
+        grid.update(tasks[1], None)
+        assert "<h3>1/4</h3>" in page()
+        
+        grid.flush()
+        assert "<h3>2/4</h3>" in page()
+        
+        grid.update(tasks[2], None)
+        grid.update(tasks[3], None)
+        assert "<h3>4/4</h3>" in page()
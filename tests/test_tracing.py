@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+链路追踪测试
+"""
+
+import json
+import threading
+
+from utils.image_utils import ImageUtils
+from utils.mock_server import create_mock_server
+from utils.scheduler import GenerationScheduler
+from utils.tracing import Tracer, current_trace_id, tracer
+
+
+class TestTracer:
+    """区间收集器测试类"""
+
+    def test_nested_spans_share_trace(self):
+        """测试嵌套区间继承 trace_id 并记录父区间，退出后恢复上下文"""
+        local = Tracer()
+
+        with local.span("outer", model="m") as outer:
+            with local.span("inner") as inner:
+                assert local.current() is inner
+
+        assert local.current() is None
+        assert inner.trace_id == outer.trace_id
+        assert inner.parent_id == outer.span_id
+        assert [span.name for span in local.spans()] == ["outer", "inner"]
+        assert outer.duration >= inner.duration >= 0
+
+    def test_error_attribute(self):
+        """测试代码块抛出异常时记录 error 属性"""
+        local = Tracer()
+
+        try:
+            with local.span("failing"):
+                raise ValueError("boom")
+        except ValueError:
+            pass
+
+        assert local.spans()[0].attributes["error"] == "ValueError"
+
+    def test_detached_span_and_record(self):
+        """测试跨线程区间和已测得起止时间的区间"""
+        local = Tracer()
+        root = local.start_span("generation", count=2)
+        start = local.clock()
+
+        with local.use(root):
+            queued = local.record("queued", start, index=0)
+        thread = threading.Thread(target=root.finish)
+        thread.start()
+        thread.join()
+
+        assert queued.parent_id == root.span_id
+        assert {span.name for span in local.spans(root.trace_id)} == {"generation", "queued"}
+
+    def test_disabled(self):
+        """测试未启用时不记录区间，调用方仍可设置属性和结束区间"""
+        local = Tracer(enabled=False)
+
+        with local.span("outer") as span:
+            span.set(outcome="ok")
+            assert local.current() is None
+        local.start_span("root").finish()
+
+        assert len(local) == 0
+
+    def test_bounded(self):
+        """测试只保留最近的区间"""
+        local = Tracer(max_spans=3)
+
+        for index in range(5):
+            with local.span("step", index=index):
+                pass
+
+        assert [span.attributes["index"] for span in local.spans()] == [2, 3, 4]
+
+    def test_chrome_trace(self, tmp_path):
+        """测试导出 Chrome trace-event JSON"""
+        local = Tracer()
+        root = local.start_span("generation")
+        with local.use(root), local.span("image.generate", size=(160, 240)):
+            pass
+        root.finish()
+        path = tmp_path / "trace.json"
+
+        assert local.export_chrome_trace(str(path))
+
+        events = json.loads(path.read_text(encoding="utf-8"))["traceEvents"]
+        phases = sorted(event["ph"] for event in events)
+        assert phases == ["M", "X", "b", "e"]
+        complete = next(event for event in events if event["ph"] == "X")
+        assert complete["cat"] == "image" and complete["dur"] >= 0
+        assert complete["args"]["trace_id"] == root.trace_id
+        assert complete["args"]["parent_id"] == root.span_id
+        assert complete["args"]["size"] == "(160, 240)"
+
+
+class TestTracePropagation:
+    """追踪上下文传递测试类"""
+
+    def test_scheduler_propagates_context(self):
+        """测试调度器在提交时的上下文中执行任务"""
+        scheduler = GenerationScheduler(max_workers=2, name="trace-test")
+        try:
+            with tracer.span("submit") as root:
+                future = scheduler.submit(current_trace_id)
+            assert future.result(timeout=5) == root.trace_id
+            assert scheduler.submit(current_trace_id).result(timeout=5) is None
+        finally:
+            scheduler.shutdown()
+
+    def test_generation_lifecycle(self):
+        """测试一次生成的排队、请求、下载、解码和缩放区间都属于同一个 trace"""
+        from ui.widgets import GenerationManager
+
+        server = create_mock_server("127.0.0.1", 0, 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        scheduler = GenerationScheduler(max_workers=2, name="trace-test")
+        host, port = server.server_address[:2]
+
+        def image_utils_factory(api_key):
+            image_utils = ImageUtils(api_key)
+            image_utils.api_url = f"http://{host}:{port}{server.path}"
+            return image_utils
+
+        finished = threading.Event()
+        completed_spans = []
+        manager = GenerationManager(None, finished_callback=finished.set, scheduler=scheduler,
+                                    complete_callback=lambda *args: completed_spans.append(args[3]),
+                                    image_utils_factory=image_utils_factory, persist_latency=False)
+        try:
+            manager.start_generation("a cat", 2, "sk-test-key-123456", "1024x1536", "sora_image")
+            root = manager.trace_span
+            assert finished.wait(10)
+        finally:
+            scheduler.shutdown()
+            server.shutdown()
+            server.server_close()
+
+        assert completed_spans == [root, root]
+        names = [span.name for span in tracer.spans(root.trace_id)]
+        assert names.count("generation") == 1
+        for name in ("scheduler.queued", "scheduler.task", "image.generate", "http.wait_response",
+                     "http.download", "http.parse_json", "pipeline.decode", "pipeline.thumbnail"):
+            assert names.count(name) == 2, name
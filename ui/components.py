@@ -4,9 +4,17 @@ CustomTkinter UI组件模块
 包含可重用的用户界面组件
 """
 
+import logging
+import time
+
 import customtkinter as ctk
 from typing import Dict, Callable, Optional
 
+from utils.eta import SLOT_DONE, SLOT_FAILED, SLOT_RUNNING, format_seconds
+from utils.logger import get_logger, log_event
+
+logger = get_logger(__name__)
+
 
 class ModernFrame(ctk.CTkFrame):
     """现代化框架组件"""
@@ -305,6 +313,15 @@ class ProgressFrame(ctk.CTkFrame):
         self.progress_bar.grid(row=1, column=0, padx=15, pady=(0, 10), sticky="ew")
         self.progress_bar.set(0)
         
+        # 每张图像的已用/预计耗时（生成时显示）
+        self.slots_label = ctk.CTkLabel(
+            self,
+            text="",
+            font=ctk.CTkFont(size=11),
+            justify="left",
+            anchor="w"
+        )
+        
         # 配置网格
         self.grid_columnconfigure(0, weight=1)
     
@@ -316,6 +333,35 @@ class ProgressFrame(ctk.CTkFrame):
         """设置进度值 (0.0 - 1.0)"""
         self.progress_bar.set(value)
     
+    def set_slots(self, slots: list):
+        """
+        显示每张图像的进度
+        
+        Args:
+            slots: GenerationProgress.slots() 的返回值，为空时隐藏
+        """
+        if not slots:
+            self.slots_label.configure(text="")
+            self.slots_label.grid_remove()
+            return
+        
+        parts = []
+        for slot in slots:
+            if slot["state"] == SLOT_DONE:
+                text = f"{format_seconds(slot['elapsed'])} ✓"
+            elif slot["state"] == SLOT_FAILED:
+                text = "失败"
+            elif slot["state"] == SLOT_RUNNING:
+                text = f"{format_seconds(slot['elapsed'])}/{format_seconds(slot['expected'])}"
+            else:
+                text = "排队中"
+            parts.append(f"#{slot['index'] + 1} {text}")
+        
+        # 每行最多显示 5 张
+        lines = ["   ".join(parts[i:i + 5]) for i in range(0, len(parts), 5)]
+        self.slots_label.configure(text="\n".join(lines))
+        self.slots_label.grid(row=2, column=0, padx=15, pady=(0, 10), sticky="w")
+    
     def start_indeterminate(self):
         """开始不确定进度模式"""
         self.progress_bar.configure(mode="indeterminate")
@@ -339,29 +385,63 @@ class ImageDisplayFrame(ctk.CTkScrollableFrame):
         
         self.images = []  # 存储图像数据
         self.image_widgets = []  # 存储图像控件
+        self.thumbnails = {}  # 图像索引 -> 缩略图控件（预览帧和最终图像共用一个控件）
         
         # 配置网格权重
         for i in range(3):  # 支持3列布局
             self.grid_columnconfigure(i, weight=1)
     
-    def add_image(self, image_data: str, index: int):
-        """添加图像"""
-        from ui.widgets import ImageThumbnail
-        
+    def add_image(self, image_data: str, index: int, thumbnail_image=None):
+        """添加图像（已有预览帧时替换为最终图像），thumbnail_image 为后台线程缩放好的缩略图"""
+        start_time = time.perf_counter()
         try:
-            # 计算网格位置
-            row = index // 3
-            col = index % 3
-            
-            # 创建图像缩略图
-            thumbnail = ImageThumbnail(self, image_data, index)
-            thumbnail.grid(row=row, column=col, padx=10, pady=10, sticky="nsew")
+            thumbnail = self.thumbnails.get(index)
+            if thumbnail is not None:
+                thumbnail.update_image(image_data, thumbnail_image=thumbnail_image)
+            else:
+                self._create_thumbnail(image_data, index, thumbnail_image=thumbnail_image)
             
             self.images.append(image_data)
-            self.image_widgets.append(thumbnail)
+            log_event(logger, logging.DEBUG, "image_displayed", index=index, chars=len(image_data),
+                      prescaled=thumbnail_image is not None, duration=time.perf_counter() - start_time)
             
         except Exception as e:
-            print(f"添加图像失败: {str(e)}")
+            log_event(logger, logging.ERROR, "image_display_failed", index=index, error=e)
+    
+    def show_preview(self, image_data: str, index: int):
+        """显示流式返回的预览帧，最终图像到达后忽略"""
+        try:
+            thumbnail = self.thumbnails.get(index)
+            if thumbnail is not None:
+                thumbnail.update_image(image_data, is_preview=True)
+            else:
+                self._create_thumbnail(image_data, index, is_preview=True)
+        except Exception as e:
+            log_event(logger, logging.WARNING, "preview_display_failed", index=index, error=e)
+    
+    def remove_preview(self, index: int):
+        """移除生成失败的位置上残留的预览帧（最终图像不受影响）"""
+        thumbnail = self.thumbnails.get(index)
+        if thumbnail is None or not thumbnail.is_preview:
+            return
+        del self.thumbnails[index]
+        self.image_widgets.remove(thumbnail)
+        thumbnail.destroy()
+    
+    def _create_thumbnail(self, image_data: str, index: int, is_preview: bool = False, thumbnail_image=None):
+        """创建缩略图并放到网格中"""
+        from ui.widgets import ImageThumbnail
+        
+        # 计算网格位置
+        row = index // 3
+        col = index % 3
+        
+        # 创建图像缩略图
+        thumbnail = ImageThumbnail(self, image_data, index, is_preview=is_preview, thumbnail_image=thumbnail_image)
+        thumbnail.grid(row=row, column=col, padx=10, pady=10, sticky="nsew")
+        
+        self.image_widgets.append(thumbnail)
+        self.thumbnails[index] = thumbnail
     
     def clear_images(self):
         """清除所有图像"""
@@ -370,6 +450,7 @@ class ImageDisplayFrame(ctk.CTkScrollableFrame):
         
         self.images.clear()
         self.image_widgets.clear()
+        self.thumbnails.clear()
     
     def get_image_count(self) -> int:
         """获取图像数量"""
@@ -4,6 +4,8 @@
 使用 CustomTkinter 构建的现代化主窗口
 """
 
+import time
+
 import customtkinter as ctk
 from tkinter import messagebox
 from typing import Optional
@@ -13,15 +15,25 @@ from ui.components import (
     HeaderFrame, ModernFrame, CustomTextBox, CustomEntry,
     NumberSlider, RatioSwitchSelector, ModelSwitchSelector, ProgressFrame, ImageDisplayFrame
 )
-from ui.widgets import GenerationManager
+from ui.splash import DeferredSteps, SplashWindow
+from utils.tracing import tracer
 
 
 class MainWindow(ctk.CTk):
     """主窗口"""
     
     def __init__(self):
+        started = time.perf_counter()
         super().__init__()
         
+        # 主窗口先设为完全透明并显示启动画面，界面构建期间用户能立即看到反馈。
+        # 不能在主循环开始前调用 withdraw()：Windows 上 CTk.mainloop() 看到窗口在创建前被隐藏后
+        # 不会再显示它（设置标题栏颜色时会再次隐藏窗口且不恢复）
+        self.attributes("-alpha", 0.0)
+        self.splash = SplashWindow(self)
+        self.splash.update()
+        self.startup_timings = {"splash": time.perf_counter() - started}
+        
         # 设置外观模式和颜色主题
         ctk.set_appearance_mode("dark")  # 可选: "light", "dark", "system"
         ctk.set_default_color_theme("blue")  # 可选: "blue", "green", "dark-blue"
@@ -29,11 +41,14 @@ class MainWindow(ctk.CTk):
         # 初始化变量
         self.generation_manager = None
         self.is_generating = False
+        self.image_frame = None
+        self.image_display = None
         
         # 设置窗口
         self.setup_window()
         
-        # 创建UI
+        # 创建关键界面（输入和控制区域）
+        self.splash.set_status("正在创建界面...")
         self.create_widgets()
         
         # 设置事件绑定
@@ -41,6 +56,59 @@ class MainWindow(ctk.CTk):
         
         # 加载配置
         self.load_settings()
+        
+        # 主循环开始（CTk 完成窗口首次显示）后再显示主窗口并关闭启动画面
+        self.after_idle(lambda: self.reveal(started))
+        
+        # 非关键部分在主循环空闲时逐步构建
+        self.deferred_steps = DeferredSteps(self.after_idle)
+        self.deferred_steps.add("window_icon", self.setup_icon)
+        self.deferred_steps.add("image_section", self.create_deferred_image_section)
+        self.deferred_steps.add("latency_history", self.load_latency_history)
+        self.deferred_steps.add("generation_modules", self.preload_generation_modules)
+        self.deferred_steps.on_ready(lambda: self.log_startup_timings(started))
+        self.deferred_steps.start()
+    
+    def reveal(self, started: float):
+        """显示主窗口，关闭启动画面"""
+        self.attributes("-alpha", 1.0)
+        self.deiconify()
+        self.splash.destroy()
+        self.splash = None
+        self.startup_timings["first_paint"] = time.perf_counter() - started
+    
+    def on_ready(self, callback):
+        """界面全部构建完成后调用回调"""
+        self.deferred_steps.on_ready(callback)
+    
+    def ensure_ready(self):
+        """立即完成剩余的延迟构建步骤（需要用到延迟构建的部分时调用）"""
+        self.deferred_steps.run_all()
+    
+    def create_deferred_image_section(self):
+        """创建图像显示区域"""
+        self.image_frame = self.create_image_section()
+        self.image_frame.grid(row=5, column=0, padx=15, pady=(5, 15), sticky="nsew")
+    
+    def load_latency_history(self):
+        """加载历史延迟，用于预估生成耗时"""
+        from utils.eta import load_latency_history
+        load_latency_history()
+    
+    def preload_generation_modules(self):
+        """预先导入生成和预览相关的模块，避免首次点击生成时卡顿"""
+        import ui.widgets  # noqa: F401
+    
+    def log_startup_timings(self, started: float):
+        """记录启动各阶段耗时"""
+        from utils.logger import get_logger, log_performance
+        logger = get_logger(__name__)
+        self.startup_timings["ready"] = time.perf_counter() - started
+        log_performance(logger, "显示启动画面", self.startup_timings["splash"])
+        log_performance(logger, "主窗口首次显示", self.startup_timings["first_paint"])
+        for name, duration in self.deferred_steps.timings:
+            log_performance(logger, f"延迟构建 {name}", duration)
+        log_performance(logger, "界面全部就绪", self.startup_timings["ready"])
     
     def setup_window(self):
         """设置窗口属性"""
@@ -48,7 +116,17 @@ class MainWindow(ctk.CTk):
         self.geometry("1000x800")
         self.minsize(800, 600)
         
-        # 设置窗口图标
+        # 配置网格权重
+        self.grid_rowconfigure(0, weight=0)  # 头部固定
+        self.grid_rowconfigure(1, weight=0)  # API设置固定
+        self.grid_rowconfigure(2, weight=0)  # 输入区域固定
+        self.grid_rowconfigure(3, weight=0)  # 控制区域固定
+        self.grid_rowconfigure(4, weight=0)  # 进度区域固定
+        self.grid_rowconfigure(5, weight=1)  # 图像区域自适应
+        self.grid_columnconfigure(0, weight=1)
+    
+    def setup_icon(self):
+        """设置窗口图标"""
         import os
         import tkinter as tk
         icon_set = False
@@ -84,15 +162,6 @@ class MainWindow(ctk.CTk):
                     self.iconbitmap(icon_path)
             except Exception:
                 pass
-        
-        # 配置网格权重
-        self.grid_rowconfigure(0, weight=0)  # 头部固定
-        self.grid_rowconfigure(1, weight=0)  # API设置固定
-        self.grid_rowconfigure(2, weight=0)  # 输入区域固定
-        self.grid_rowconfigure(3, weight=0)  # 控制区域固定
-        self.grid_rowconfigure(4, weight=0)  # 进度区域固定
-        self.grid_rowconfigure(5, weight=1)  # 图像区域自适应
-        self.grid_columnconfigure(0, weight=1)
     
     def create_widgets(self):
         """创建界面组件"""
@@ -120,9 +189,7 @@ class MainWindow(ctk.CTk):
         self.progress_frame = ProgressFrame(self)
         self.progress_frame.grid(row=4, column=0, padx=15, pady=5, sticky="ew")
         
-        # 图像显示区域
-        self.image_frame = self.create_image_section()
-        self.image_frame.grid(row=5, column=0, padx=15, pady=(5, 15), sticky="nsew")
+        # 图像显示区域在主窗口显示后延迟创建，见 create_deferred_image_section
     
     def create_api_section(self) -> ModernFrame:
         """创建API设置区域"""
@@ -320,6 +387,12 @@ class MainWindow(ctk.CTk):
             if api_url:
                 config_manager.set_api_url(api_url)
             
+            # 设置已修改，之前的熔断状态和端点评分不再适用
+            from utils.circuit_breaker import reset_circuit_breakers
+            from utils.endpoint_router import reset_routers
+            reset_circuit_breakers()
+            reset_routers()
+            
             # 显示成功消息
             from config.constants import SUCCESS_MESSAGES
             messagebox.showinfo("成功", SUCCESS_MESSAGES["api_settings_saved"])
@@ -364,7 +437,15 @@ class MainWindow(ctk.CTk):
             messagebox.showerror("输入错误", str(e))
             return
         
-        # 清除之前的图片
+        # 所有端点都在熔断期内时直接提示，不再发出注定失败的请求
+        from utils.circuit_breaker import circuit_retry_after
+        retry_after = circuit_retry_after(config_manager.get_api_urls())
+        if retry_after > 0:
+            messagebox.showerror("服务不可用", f"{ERROR_MESSAGES['circuit_open']}（{retry_after:.0f} 秒后重试）")
+            return
+        
+        # 确保图像显示区域已创建，再清除之前的图片
+        self.ensure_ready()
         self.image_display.clear_images()
         
         # 更新界面状态
@@ -378,36 +459,85 @@ class MainWindow(ctk.CTk):
             hover_color=COLORS["disabled"]
         )
         self.progress_frame.set_status(f"{STATUS_MESSAGES['generating']} ({num_images} 张)")
-        self.progress_frame.start_indeterminate()
+        self.progress_frame.set_progress(0)
         
         # 记录用户操作
         from utils.logger import get_logger, log_user_action
         logger = get_logger(__name__)
         log_user_action(logger, "开始生成图像", f"数量: {num_images}, 尺寸: {size}, 模型: {model}")
         
-        # 创建生成管理器
-        self.generation_manager = GenerationManager(
-            self,
-            progress_callback=self.on_generation_progress,
-            complete_callback=self.on_image_complete,
-            error_callback=self.on_generation_error,
-            finished_callback=self.on_generation_complete
-        )
-        
-        # 开始生成
-        self.generation_manager.start_generation(prompt, num_images, api_key, size, model)
+        # 本次生成的 trace 从这里开始，生成管理器、请求和界面显示的区间都属于同一个 trace
+        with tracer.span("ui.start_generation", model=model, size=size, count=num_images):
+            # 创建生成管理器（ui.widgets 依赖 requests 和 PIL，首次生成时才导入）
+            from ui.widgets import GenerationManager
+            self.generation_manager = GenerationManager(
+                self,
+                progress_callback=self.on_generation_progress,
+                complete_callback=self.on_image_complete,
+                error_callback=self.on_generation_error,
+                finished_callback=lambda: self.after(0, self.on_generation_complete),
+                preview_callback=self.on_image_preview,
+                failed_callback=self.on_image_failed
+            )
+            
+            # 开始生成
+            self.generation_manager.start_generation(prompt, num_images, api_key, size, model)
+        self.refresh_progress()
     
     def on_generation_progress(self, progress: float):
-        """生成进度回调"""
-        self.progress_frame.set_progress(progress)
+        """生成进度回调（在工作线程中调用，转到界面线程刷新）"""
+        self.after(0, self.update_progress_display)
     
-    def on_image_complete(self, index: int, image_data: str):
-        """图像生成完成回调"""
+    def refresh_progress(self):
+        """生成期间按界面刷新间隔更新进度和预计剩余时间"""
+        if not self.is_generating:
+            return
+        self.update_progress_display()
+        from config.constants import PERFORMANCE
+        self.after(PERFORMANCE["ui_update_interval"], self.refresh_progress)
+    
+    def update_progress_display(self):
+        """按每张图像的已用/预计耗时显示整体进度"""
+        progress = self.generation_manager.progress if self.generation_manager else None
+        if progress is None or not self.is_generating:
+            return
+        
+        from config.constants import STATUS_MESSAGES
+        from utils.eta import format_seconds
+        self.progress_frame.set_progress(progress.fraction())
+        self.progress_frame.set_status(
+            f"{STATUS_MESSAGES['generating']} ({progress.finished_count}/{progress.total} 张，"
+            f"预计剩余 {format_seconds(progress.remaining())})"
+        )
+        self.progress_frame.set_slots(progress.slots())
+    
+    def on_image_complete(self, index: int, image_data: str, thumbnail_image=None, trace_span=None):
+        """图像生成完成回调（在流水线线程中调用，转到界面线程显示）"""
+        queued_at = tracer.clock()
+        self.after(0, lambda: self.show_image(index, image_data, thumbnail_image, trace_span, queued_at))
+    
+    def show_image(self, index: int, image_data: str, thumbnail_image=None, trace_span=None, queued_at=None):
+        """显示生成的图像，trace_span 和 queued_at 用于记录等待界面线程和显示的耗时"""
+        if queued_at is not None:
+            tracer.record("ui.queued", queued_at, parent=trace_span, index=index)
         try:
-            self.image_display.add_image(image_data, index)
+            with tracer.span("ui.show_image", parent=trace_span, index=index):
+                self.image_display.add_image(image_data, index, thumbnail_image)
         except Exception as e:
             messagebox.showwarning("显示错误", f"无法显示第 {index+1} 张图片: {str(e)}")
     
+    def on_image_preview(self, index: int, image_data: str, trace_span=None):
+        """预览帧回调（在工作线程中调用，转到界面线程显示）"""
+        def show_preview():
+            with tracer.span("ui.show_preview", parent=trace_span, index=index):
+                self.image_display.show_preview(image_data, index)
+        
+        self.after(0, show_preview)
+    
+    def on_image_failed(self, index: int):
+        """单张图像生成失败回调（在工作线程中调用，转到界面线程移除该位置的预览帧）"""
+        self.after(0, lambda: self.image_display.remove_preview(index))
+    
     def on_generation_error(self, error_message: str):
         """生成错误回调"""
         messagebox.showerror("生成错误", error_message)
@@ -424,7 +554,8 @@ class MainWindow(ctk.CTk):
             fg_color=COLORS["primary"],
             hover_color=COLORS["primary_hover"]
         )
-        self.progress_frame.stop_indeterminate()
+        self.progress_frame.set_progress(1.0)
+        self.progress_frame.set_slots([])
         
         image_count = self.image_display.get_image_count()
         self.progress_frame.set_status(f"{ICONS['success']} 完成！共生成 {image_count} 张图片")
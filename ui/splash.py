@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+启动画面和延迟构建
+主窗口创建后立即显示轻量的启动画面，非关键界面部分在主循环空闲时逐步构建
+"""
+
+import time
+import tkinter as tk
+from collections import deque
+from typing import Callable, List, Optional
+
+from config.constants import APP_NAME, APP_VERSION, STARTUP_CONFIG
+
+
+class SplashWindow(tk.Toplevel):
+    """启动画面：无边框、居中，只使用 tkinter 原生组件以便立即绘制"""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.overrideredirect(True)
+
+        background = STARTUP_CONFIG["splash_background"]
+        foreground = STARTUP_CONFIG["splash_foreground"]
+        width, height = STARTUP_CONFIG["splash_size"]
+        self.configure(background=background)
+
+        x = (self.winfo_screenwidth() - width) // 2
+        y = (self.winfo_screenheight() - height) // 2
+        self.geometry(f"{width}x{height}+{x}+{y}")
+
+        tk.Label(
+            self, text=f"🎨 {APP_NAME}", font=("TkDefaultFont", 16, "bold"),
+            background=background, foreground=foreground
+        ).pack(pady=(40, 8))
+
+        self.status_label = tk.Label(
+            self, text=f"v{APP_VERSION} 正在启动...", background=background, foreground="gray60"
+        )
+        self.status_label.pack()
+
+    def set_status(self, text: str) -> None:
+        """更新启动状态并立即重绘"""
+        self.status_label.configure(text=text)
+        self.update_idletasks()
+
+
+class DeferredSteps:
+    """
+    延迟构建步骤队列
+
+    每次主循环空闲时执行一个步骤，步骤之间界面可以处理事件和重绘；
+    需要某个延迟构建的部分时可以调用 run_all() 立即完成剩余步骤
+    """
+
+    def __init__(self, schedule: Callable[[Callable[[], None]], object],
+                 clock: Callable[[], float] = time.perf_counter):
+        """
+        初始化步骤队列
+
+        Args:
+            schedule: 在下次空闲时执行回调的函数，通常为窗口的 after_idle
+            clock: 计时函数
+        """
+        self._schedule = schedule
+        self._clock = clock
+        self._steps = deque()
+        self._ready_callbacks: List[Callable[[], None]] = []
+        self._scheduled = False
+        self.timings: List[tuple] = []
+
+    def add(self, name: str, step: Callable[[], None]) -> None:
+        """
+        添加步骤
+
+        Args:
+            name: 步骤名称，用于记录耗时
+            step: 无参调用
+        """
+        self._steps.append((name, step))
+
+    def start(self) -> None:
+        """在下次空闲时开始执行步骤"""
+        if not self._scheduled:
+            self._scheduled = True
+            self._schedule(self._run_next)
+
+    @property
+    def done(self) -> bool:
+        """是否已执行完所有步骤"""
+        return not self._steps
+
+    def on_ready(self, callback: Callable[[], None]) -> None:
+        """所有步骤完成后调用回调，已完成时立即调用"""
+        if self.done:
+            callback()
+        else:
+            self._ready_callbacks.append(callback)
+
+    def run_all(self) -> None:
+        """立即执行剩余的所有步骤"""
+        while self._steps:
+            self._run_one()
+        self._notify_ready()
+
+    def _run_one(self) -> None:
+        name, step = self._steps.popleft()
+        start = self._clock()
+        step()
+        self.timings.append((name, self._clock() - start))
+
+    def _run_next(self) -> None:
+        self._scheduled = False
+        if self._steps:
+            self._run_one()
+        if self._steps:
+            self.start()
+        else:
+            self._notify_ready()
+
+    def _notify_ready(self) -> None:
+        callbacks, self._ready_callbacks = self._ready_callbacks, []
+        for callback in callbacks:
+            callback()
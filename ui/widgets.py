@@ -4,7 +4,10 @@ CustomTkinter 自定义小部件模块
 包含应用程序特定的复杂UI组件
 """
 
+import base64
+import io
 import os
+import threading
 import uuid
 import tkinter as tk
 from datetime import datetime
@@ -14,14 +17,48 @@ from typing import Optional
 import customtkinter as ctk
 from PIL import Image, ImageTk
 
+from config.constants import PIPELINE_CONFIG, UI_SIZES
 from utils.image_utils import ImageUtils
 from utils.config_manager import config_manager
+from utils.eta import EtaEstimator, GenerationProgress, save_latency_history
+from utils.exceptions import CircuitOpenException
+from utils.key_pool import get_key_pool
+from utils.logger import get_logger
+from utils.metrics import export_metrics, metrics
+from utils.pipeline import Pipeline, PipelineStage
+from utils.scheduler import PRIORITY_INTERACTIVE, get_scheduler
+from utils.tracing import tracer
+
+logger = get_logger(__name__)
+
+
+def create_image_utils(api_key: str) -> ImageUtils:
+    """
+    创建界面生成使用的 ImageUtils
+
+    使用配置的 API Key 池（输入框中的 Key 不在池中时排在最前），Key 池在进程内共享，
+    停用状态和负载统计跨批次保留。
+
+    Args:
+        api_key: 输入框中的 API Key
+
+    Returns:
+        ImageUtils 实例
+    """
+    keys = config_manager.get_api_keys()
+    configured = [item.get("key") if isinstance(item, dict) else item for item in keys]
+    if api_key and api_key not in configured:
+        keys.insert(0, api_key)
+    if not keys:
+        return ImageUtils(api_key)
+    return ImageUtils(key_pool=get_key_pool(keys))
 
 
 class ImageThumbnail(ctk.CTkFrame):
     """图像缩略图组件"""
     
-    def __init__(self, parent, image_data: str, index: int, **kwargs):
+    def __init__(self, parent, image_data: str, index: int, is_preview: bool = False,
+                 thumbnail_image: Optional[Image.Image] = None, **kwargs):
         super().__init__(
             parent,
             corner_radius=12,
@@ -32,6 +69,8 @@ class ImageThumbnail(ctk.CTkFrame):
         
         self.image_data = image_data
         self.index = index
+        self.is_preview = is_preview  # 显示的是流式返回的预览帧，最终图像到达前不可预览或保存
+        self.thumbnail_image = thumbnail_image  # 后台线程已缩放好的缩略图，没有时在这里解码缩放
         self.parent_window = parent
         
         # 创建图像标签
@@ -59,19 +98,45 @@ class ImageThumbnail(ctk.CTkFrame):
     def load_image(self):
         """加载并显示图像"""
         try:
-            # 转换为CustomTkinter兼容的图像并缩放
-            image = ImageUtils.base64_to_tk_image(self.image_data, (160, 240))
-            if image:
-                self.image_label.configure(image=image)
-                # 保存引用防止垃圾回收
-                self.image_label._image = image
-            else:
-                self.image_label.configure(text="Load Failed")
+            with tracer.span("ui.load_thumbnail", index=self.index, preview=self.is_preview,
+                             prescaled=self.thumbnail_image is not None):
+                # 转换为CustomTkinter兼容的图像并缩放
+                if self.thumbnail_image is not None:
+                    image = ctk.CTkImage(light_image=self.thumbnail_image, dark_image=self.thumbnail_image,
+                                         size=self.thumbnail_image.size)
+                else:
+                    image = ImageUtils.base64_to_tk_image(self.image_data, (160, 240))
+                if image:
+                    self.image_label.configure(image=image, text="生成中..." if self.is_preview else "",
+                                               compound="center")
+                    # 保存引用防止垃圾回收
+                    self.image_label._image = image
+                else:
+                    self.image_label.configure(text="Load Failed")
         except Exception as e:
             self.image_label.configure(text=f"Error: {str(e)}")
     
+    def update_image(self, image_data: str, is_preview: bool = False,
+                     thumbnail_image: Optional[Image.Image] = None):
+        """
+        更新显示的图像
+        
+        Args:
+            image_data: base64 图像数据
+            is_preview: 是否为预览帧；最终图像显示后忽略迟到的预览帧
+            thumbnail_image: 已缩放好的缩略图
+        """
+        if is_preview and not self.is_preview:
+            return
+        self.image_data = image_data
+        self.is_preview = is_preview
+        self.thumbnail_image = thumbnail_image
+        self.load_image()
+    
     def on_click(self, event):
         """单击事件 - 显示全屏预览"""
+        if self.is_preview:
+            return
         self.show_fullscreen_preview()
     
     def on_double_click(self, event):
@@ -80,6 +145,8 @@ class ImageThumbnail(ctk.CTkFrame):
     
     def show_context_menu(self, event):
         """显示右键菜单"""
+        if self.is_preview:
+            return
         try:
             # 创建上下文菜单
             context_menu = tk.Menu(self, tearoff=0)
@@ -91,7 +158,7 @@ class ImageThumbnail(ctk.CTkFrame):
             # 显示菜单
             context_menu.tk_popup(event.x_root, event.y_root)
         except Exception as e:
-            print(f"显示上下文菜单失败: {str(e)}")
+            logger.warning(f"显示上下文菜单失败: {e}")
     
     def show_preview(self):
         """显示图像预览窗口"""
@@ -479,15 +546,41 @@ class FullScreenPreview(ctk.CTkToplevel):
 class GenerationManager:
     """图像生成管理器"""
     
-    def __init__(self, parent_window, progress_callback=None, complete_callback=None, error_callback=None, finished_callback=None):
+    def __init__(self, parent_window, progress_callback=None, complete_callback=None, error_callback=None,
+                 finished_callback=None, preview_callback=None, failed_callback=None, scheduler=None,
+                 image_utils_factory=None, persist_latency: bool = True):
+        """
+        初始化生成管理器
+        
+        Args:
+            parent_window: 所属窗口（无界面运行时可为 None）
+            progress_callback: 进度回调，签名为 progress_callback(progress)
+            complete_callback: 单张图像完成回调，签名为 complete_callback(index, image_data, thumbnail, trace_span)
+            error_callback: 错误回调，签名为 error_callback(message)
+            finished_callback: 全部完成回调
+            preview_callback: 预览帧回调，签名为 preview_callback(index, image_data, trace_span)
+            failed_callback: 单张图像失败回调，签名为 failed_callback(index)，用于撤下该位置的预览帧
+            scheduler: 执行请求的调度器，默认使用全局共享调度器
+            image_utils_factory: 按 API Key 创建 ImageUtils 的函数，默认为 create_image_utils
+            persist_latency: 全部完成后是否保存延迟历史
+        """
         self.parent_window = parent_window
         self.progress_callback = progress_callback
         self.complete_callback = complete_callback
         self.error_callback = error_callback
         self.finished_callback = finished_callback
+        self.preview_callback = preview_callback
+        self.failed_callback = failed_callback
+        self.scheduler = scheduler or get_scheduler()
+        self.image_utils_factory = image_utils_factory or create_image_utils
+        self.persist_latency = persist_latency
         self.completed_count = 0
         self.total_count = 0
         self.is_generating = False
+        self.progress: Optional[GenerationProgress] = None  # 每张图像的进度和预计耗时
+        self.pipeline: Optional[Pipeline] = None  # 解码 → 缩略图 → 显示 → 保存
+        self.trace_span = None  # 本次生成的追踪区间，各阶段的区间以它为父区间
+        self._lock = threading.Lock()
     
     def start_generation(self, prompt: str, num_images: int, api_key: str, size: str, model: str):
         """开始图像生成"""
@@ -498,40 +591,174 @@ class GenerationManager:
         self.completed_count = 0
         self.total_count = num_images
         
+        # 按同模型、同尺寸的历史延迟预估每张图像的耗时
+        self.progress = GenerationProgress(
+            num_images,
+            EtaEstimator().expected(model, size),
+            concurrency=min(num_images, self.scheduler.max_workers)
+        )
+        
+        # 本次生成的追踪区间在最后一张图像处理完时结束；它随回调参数传递，
+        # 工作线程和流水线线程不读取 self.trace_span（其他生成可能已经开始）
+        trace_span = self.trace_span = tracer.start_span("generation", model=model, size=size, count=num_images)
+        
+        # 网络请求由调度器执行，返回的图像交给流水线在后台线程中解码和缩放
+        self.pipeline = self._create_pipeline()
+        
         # 创建图像工具实例
-        image_utils = ImageUtils(api_key)
+        image_utils = self.image_utils_factory(api_key)
+        
+        # 先检查端点熔断状态（可能发送一次探测请求），再异步生成所有图像；
+        # 界面操作优先于后台批量任务执行
+        with tracer.use(trace_span):
+            self.scheduler.submit_with_priority(PRIORITY_INTERACTIVE, self._generate_all,
+                                                image_utils, prompt, num_images, size, model, trace_span)
+    
+    def _generate_all(self, image_utils: ImageUtils, prompt: str, num_images: int, size: str, model: str,
+                      trace_span=None):
+        """检查端点可用性后提交所有生成任务（在工作线程中运行）"""
+        try:
+            with tracer.span("endpoint.check_availability"):
+                image_utils.check_availability()
+        except CircuitOpenException as e:
+            self._fail_all(f"{e.message}（{e.retry_after:.0f} 秒后重试）")
+            return
         
-        # 异步生成所有图像
         for i in range(num_images):
             image_utils.generate_image_async(
                 prompt=prompt,
                 size=size,
                 model=model,
-                callback=self._on_image_complete,
-                index=i
+                callback=lambda index, image_data: self._on_image_complete(index, image_data, trace_span),
+                index=i,
+                scheduler=self.scheduler,
+                partial_callback=((lambda index, image_data: self._on_image_preview(index, image_data, trace_span))
+                                  if self.preview_callback else None),
+                start_callback=self.progress.start,
+                priority=PRIORITY_INTERACTIVE
             )
     
-    def _on_image_complete(self, index: int, image_data: Optional[str]):
-        """图像生成完成回调"""
-        self.completed_count += 1
+    def _on_image_preview(self, index: int, image_data: str, trace_span=None):
+        """收到预览帧回调（在工作线程中运行）"""
+        if self.is_generating and self.preview_callback:
+            self.preview_callback(index, image_data, trace_span)
+    
+    def _fail_all(self, error_message: str):
+        """未发出请求就结束本次生成"""
+        self.completed_count = self.total_count
+        for index in range(self.total_count):
+            self.progress.finish(index, success=False)
+        self.pipeline.close(wait=False)
+        if self.error_callback:
+            self.error_callback(error_message)
+        if self.progress_callback:
+            self.progress_callback(1.0)
+        self.is_generating = False
+        self._finish_trace(error=error_message)
+        if self.finished_callback:
+            self.finished_callback()
+    
+    def _finish_trace(self, **attributes):
+        """结束本次生成的追踪区间，并与指标一起导出"""
+        self.trace_span.set(**attributes)
+        self.trace_span.finish()
+        if self.persist_latency:
+            export_metrics()
+            tracer.export_chrome_trace()
+    
+    def _create_pipeline(self) -> Pipeline:
+        """
+        创建结果处理流水线，配置了自动保存目录时在显示之后增加保存阶段
+
+        图像在缩略图完成后立即交给界面，写 PNG 不推迟显示
+        """
+        stages = [
+            PipelineStage("decode", self._decode_stage, PIPELINE_CONFIG["decode_workers"]),
+            PipelineStage("thumbnail", self._thumbnail_stage, PIPELINE_CONFIG["thumbnail_workers"]),
+            PipelineStage("display", self._display_stage)
+        ]
+        if config_manager.get('auto_save_dir'):
+            stages.append(PipelineStage("persist", self._persist_stage, PIPELINE_CONFIG["persist_workers"]))
+        return Pipeline(stages, on_error=self._on_stage_error, name="render")
+    
+    def _on_stage_error(self, index: int, stage: str, error: BaseException):
+        """流水线阶段失败：显示之前失败的图像计为失败，显示之后的失败只记录日志"""
+        if stage not in ("display", "persist"):
+            self._finish_image(index, None)
+    
+    @staticmethod
+    def _decode_stage(item: dict) -> dict:
+        """解码阶段：base64 → 完整加载的 PIL 图像"""
+        with tracer.span("pipeline.decode", parent=item.get("trace"), index=item["index"]), \
+                metrics.histogram("image_decode_seconds", "图像解码耗时（秒）", stage="pipeline").time():
+            image = Image.open(io.BytesIO(base64.b64decode(item["data"])))
+            image.load()
+        item["image"] = image
+        return item
+    
+    @staticmethod
+    def _thumbnail_stage(item: dict) -> dict:
+        """缩略图阶段：缩放到缩略图尺寸，之后不再持有原图"""
+        size = (UI_SIZES["thumbnail_image_width"], UI_SIZES["thumbnail_image_height"])
+        with tracer.span("pipeline.thumbnail", parent=item.get("trace"), index=item["index"]), \
+                metrics.histogram("image_thumbnail_seconds", "缩略图生成耗时（秒）", stage="pipeline").time():
+            item["thumbnail"] = item.pop("image").resize(size, Image.Resampling.LANCZOS)
+        return item
+    
+    def _display_stage(self, item: dict) -> dict:
+        """显示阶段：把缩略图交给界面，之后只保留保存需要的数据"""
+        self._finish_image(item["index"], item["data"], item.pop("thumbnail"), item["trace"])
+        return item
+    
+    @staticmethod
+    def _persist_stage(item: dict) -> dict:
+        """保存阶段：写入自动保存目录，失败只记录日志，不影响显示"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"ai_image_{item['index'] + 1}_{timestamp}_{str(uuid.uuid4())[:8]}.png"
+        with tracer.span("pipeline.persist", parent=item.get("trace"), index=item["index"]):
+            ImageUtils.save_base64_image(item["data"], os.path.join(config_manager.get('auto_save_dir'), filename))
+        return item
+    
+    def _on_image_complete(self, index: int, image_data: Optional[str], trace_span=None):
+        """网络请求完成回调（在调度器工作线程中运行）"""
+        if not image_data:
+            self._finish_image(index, None)
+            return
+        # 流水线队列满时在这里等待，工作线程暂不发起新的请求，内存中的图像数量保持有界。
+        # 流水线线程不继承提交时的上下文，追踪区间随数据传递
+        self.pipeline.submit({"index": index, "data": image_data, "trace": trace_span}, context=index)
+    
+    def _finish_image(self, index: int, image_data: Optional[str], thumbnail=None, trace_span=None):
+        """单张图像处理结束（成功或失败）"""
+        with self._lock:
+            self.completed_count += 1
+            completed = self.completed_count
+        self.progress.finish(index, success=bool(image_data))
         
         if image_data:
             # 通知图像生成成功
             if self.complete_callback:
-                self.complete_callback(index, image_data)
+                self.complete_callback(index, image_data, thumbnail, trace_span)
         else:
-            # 通知错误
+            # 撤下该位置的预览帧并通知错误
+            if self.failed_callback:
+                self.failed_callback(index)
             if self.error_callback:
                 self.error_callback(f"第 {index + 1} 张图片生成失败")
         
         # 更新进度
         if self.progress_callback:
-            progress = self.completed_count / self.total_count
+            progress = completed / self.total_count
             self.progress_callback(progress)
         
         # 检查是否全部完成
-        if self.completed_count >= self.total_count:
+        if completed >= self.total_count:
             self.is_generating = False
+            self.pipeline.close(wait=False)
+            # 保存延迟样本，下次启动时的预估仍然可用
+            if self.persist_latency:
+                save_latency_history()
+            self._finish_trace()
             # 调用完成回调
             if self.finished_callback:
                 self.finished_callback() 
\ No newline at end of file
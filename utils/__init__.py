@@ -2,11 +2,17 @@
 """
 工具模块包
 包含应用程序的辅助工具和功能
+
+ImageUtils 依赖 requests 和 PIL，导入较慢，在首次访问 utils.ImageUtils 时才加载
 """
 
+import importlib
+
 from .config_manager import ConfigManager, config_manager
-from .image_utils import ImageUtils
-from .logger import LogManager, log_manager, get_logger, log_exception, log_api_request, log_user_action, log_performance
+from .logger import (
+    LogManager, log_manager, get_logger, log_exception, log_api_request, log_user_action, log_performance,
+    log_event, request_context, get_request_id
+)
 from .exceptions import (
     ImageGeneratorException, APIException, APIKeyException, APITimeoutException,
     NetworkException, ConfigException, ValidationException, ImageProcessingException,
@@ -26,6 +32,7 @@ __all__ = [
     # 日志管理
     'LogManager', 'log_manager', 'get_logger', 'log_exception', 
     'log_api_request', 'log_user_action', 'log_performance',
+    'log_event', 'request_context', 'get_request_id',
     
     # 异常处理
     'ImageGeneratorException', 'APIException', 'APIKeyException', 'APITimeoutException',
@@ -34,4 +41,22 @@ __all__ = [
     
     # 输入验证
     'InputValidator', 'ConfigValidator', 'validate_user_input', 'validate_generation_request'
-] 
\ No newline at end of file
+]
+
+# 延迟加载的名称 -> 所在子模块
+_LAZY_EXPORTS = {
+    'ImageUtils': 'image_utils',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
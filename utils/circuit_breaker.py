@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+熔断器
+按端点统计最近请求的失败率，失败过多时熔断（快速失败），冷却后只放行一个探测请求，
+探测成功才恢复正常
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, Optional
+
+from config.constants import CIRCUIT_BREAKER_CONFIG
+from utils.logger import get_logger
+
+# 熔断器状态
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """单个端点的熔断器"""
+
+    def __init__(self, name: str, window_size: Optional[int] = None, min_requests: Optional[int] = None,
+                 failure_rate_threshold: Optional[float] = None, consecutive_failures: Optional[int] = None,
+                 open_duration: Optional[float] = None):
+        """
+        初始化熔断器
+
+        Args:
+            name: 熔断器名称（端点 URL）
+            window_size: 统计失败率的最近请求数
+            min_requests: 窗口内至少有多少请求才按失败率熔断
+            failure_rate_threshold: 触发熔断的失败率
+            consecutive_failures: 连续失败多少次直接熔断
+            open_duration: 熔断持续时间（秒），之后进入半开状态
+        """
+        self.name = name
+        self.min_requests = min_requests or CIRCUIT_BREAKER_CONFIG["min_requests"]
+        self.failure_rate_threshold = failure_rate_threshold or CIRCUIT_BREAKER_CONFIG["failure_rate_threshold"]
+        self.consecutive_failures = consecutive_failures or CIRCUIT_BREAKER_CONFIG["consecutive_failures"]
+        self.open_duration = CIRCUIT_BREAKER_CONFIG["open_duration"] if open_duration is None else open_duration
+        self.logger = get_logger(__name__)
+
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window_size or CIRCUIT_BREAKER_CONFIG["window_size"])
+        self._consecutive = 0
+        self._state = STATE_CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._trips = 0
+
+    @property
+    def state(self) -> str:
+        """当前状态（熔断冷却结束后视为半开）"""
+        with self._lock:
+            return self._current_state(time.time())
+
+    def _current_state(self, now: float) -> str:
+        """计算当前状态（需持有锁）"""
+        if self._state == STATE_OPEN and now - self._opened_at >= self.open_duration:
+            return STATE_HALF_OPEN
+        return self._state
+
+    def retry_after(self) -> float:
+        """
+        距离允许下一个请求的秒数
+
+        Returns:
+            关闭状态或可以探测时为 0
+        """
+        with self._lock:
+            now = time.time()
+            state = self._current_state(now)
+            if state == STATE_CLOSED:
+                return 0.0
+            if state == STATE_OPEN:
+                return self._opened_at + self.open_duration - now
+            # 半开：探测进行中时需要等待探测结果
+            return 1.0 if self._probing else 0.0
+
+    def allow_request(self) -> bool:
+        """
+        是否放行一个请求
+
+        关闭状态总是放行；半开状态只放行一个探测请求，探测结束前拒绝其他请求。
+
+        Returns:
+            放行返回 True，调用方之后必须调用 record_success/record_failure/release
+        """
+        with self._lock:
+            state = self._current_state(time.time())
+            if state == STATE_CLOSED:
+                return True
+            if state == STATE_HALF_OPEN and not self._probing:
+                self._state = STATE_HALF_OPEN
+                self._probing = True
+                self.logger.info(f"熔断冷却结束，发送探测请求: {self.name}")
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """记录一次成功"""
+        with self._lock:
+            self._consecutive = 0
+            if self._state != STATE_CLOSED:
+                self._state = STATE_CLOSED
+                self._probing = False
+                self._outcomes.clear()
+                self.logger.info(f"探测成功，熔断恢复: {self.name}")
+                return
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        """记录一次失败"""
+        with self._lock:
+            now = time.time()
+            self._consecutive += 1
+            if self._state != STATE_CLOSED:
+                # 探测失败时重新熔断；熔断前发出的请求随后失败则不延长熔断时间
+                if self._probing:
+                    self._open(now, "探测失败")
+                return
+
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if self._consecutive >= self.consecutive_failures:
+                self._open(now, f"连续失败 {self._consecutive} 次")
+            elif (len(self._outcomes) >= self.min_requests
+                  and failures / len(self._outcomes) >= self.failure_rate_threshold):
+                self._open(now, f"失败率 {failures}/{len(self._outcomes)}")
+
+    def _open(self, now: float, reason: str) -> None:
+        """进入熔断状态（需持有锁）"""
+        self._trips += 1
+        self._state = STATE_OPEN
+        self._opened_at = now
+        self._probing = False
+        self.logger.warning(f"端点熔断 {self.open_duration:.0f} 秒（{reason}）: {self.name}")
+
+    def release(self) -> None:
+        """请求因与端点健康无关的原因结束时调用，释放探测名额但不改变状态"""
+        with self._lock:
+            self._probing = False
+
+    def reset(self) -> None:
+        """重置为关闭状态"""
+        with self._lock:
+            self._state = STATE_CLOSED
+            self._probing = False
+            self._consecutive = 0
+            self._outcomes.clear()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为统计字典"""
+        retry_after = self.retry_after()
+        with self._lock:
+            failures = self._outcomes.count(False)
+            return {
+                "state": self._current_state(time.time()),
+                "failure_rate": round(failures / len(self._outcomes), 3) if self._outcomes else 0.0,
+                "trips": self._trips,
+                "retry_after": round(max(0.0, retry_after), 1)
+            }
+
+
+# 进程内按端点共享的熔断器，界面每次生成都会新建 ImageUtils，熔断状态需要跨实例保留
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(url: str) -> CircuitBreaker:
+    """
+    获取端点的熔断器
+
+    Args:
+        url: 端点 URL
+
+    Returns:
+        该端点共享的熔断器
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(url)
+        if breaker is None:
+            breaker = _breakers[url] = CircuitBreaker(url)
+        return breaker
+
+
+def circuit_retry_after(urls: Iterable[str]) -> float:
+    """
+    所有端点都处于熔断状态时，距离可以再次请求的秒数
+
+    Args:
+        urls: 端点 URL 列表
+
+    Returns:
+        至少有一个端点可用（或可以探测）时返回 0
+    """
+    waits = [get_circuit_breaker(url).retry_after() for url in urls]
+    return max(0.0, min(waits)) if waits else 0.0
+
+
+def reset_circuit_breakers() -> None:
+    """重置所有端点的熔断器（例如修改 API 设置后）"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    for breaker in breakers:
+        breaker.reset()
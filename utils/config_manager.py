@@ -6,10 +6,12 @@
 
 import os
 import json
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, List, Union
 
 from config.constants import PATHS, ERROR_MESSAGES, SUCCESS_MESSAGES
 from utils.logger import get_logger, log_exception
+from utils.metrics import metrics
 from utils.exceptions import ConfigException, FileOperationException, ValidationException
 
 
@@ -25,7 +27,18 @@ class ConfigManager:
         """
         self.config_file = config_file or PATHS["config_file"]
         self.logger = get_logger(__name__)
-        self.config = self.load_config()
+        self._config: Optional[Dict[str, Any]] = None
+    
+    @property
+    def config(self) -> Dict[str, Any]:
+        """配置字典，首次访问时才读取配置文件，避免导入模块时产生文件 I/O"""
+        if self._config is None:
+            self._config = self.load_config()
+        return self._config
+    
+    @config.setter
+    def config(self, value: Dict[str, Any]) -> None:
+        self._config = value
     
     def load_config(self) -> Dict[str, Any]:
         """
@@ -69,6 +82,8 @@ class ConfigManager:
         Raises:
             ConfigException: 配置保存失败时抛出
         """
+        start_time = time.perf_counter()
+        outcome = "error"
         try:
             # 确保目录存在
             config_dir = os.path.dirname(self.config_file)
@@ -78,6 +93,7 @@ class ConfigManager:
             with open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(self.config, f, indent=2, ensure_ascii=False)
             
+            outcome = "ok"
             self.logger.info(f"配置文件保存成功: {self.config_file}")
             return True
             
@@ -93,6 +109,9 @@ class ConfigManager:
             error_msg = f"保存配置文件失败: {str(e)}"
             log_exception(self.logger, e, "配置文件保存异常")
             raise ConfigException(error_msg, details={"file": self.config_file})
+        finally:
+            metrics.counter("config_writes_total", "配置文件写入次数（按结果分类）", outcome=outcome).inc()
+            metrics.histogram("config_write_seconds", "配置文件写入耗时（秒）").observe(time.perf_counter() - start_time)
     
     def get_api_key(self) -> Optional[str]:
         """
@@ -128,6 +147,50 @@ class ConfigManager:
         self.logger.info("API Key 设置成功")
         return True
     
+    def get_api_keys(self) -> List[Union[str, Dict[str, Any]]]:
+        """
+        获取 API Key 池配置
+        
+        配置项 api_keys 为列表，元素可以是 Key 字符串，也可以是
+        {"key": ..., "weight": ..., "endpoint": ...} 字典；未配置时退回单个 api_key。
+        
+        Returns:
+            API Key 列表，没有任何 Key 时返回空列表
+        """
+        api_keys = self.config.get('api_keys')
+        if isinstance(api_keys, list) and api_keys:
+            return list(api_keys)
+        
+        api_key = self.get_api_key()
+        return [api_key] if api_key else []
+    
+    def set_api_keys(self, api_keys: List[Union[str, Dict[str, Any]]]) -> bool:
+        """
+        设置 API Key 池
+        
+        Args:
+            api_keys: API Key 列表
+            
+        Returns:
+            设置成功返回 True
+            
+        Raises:
+            ValidationException: 列表为空或包含无效 Key 时抛出
+            ConfigException: 保存失败时抛出
+        """
+        if not isinstance(api_keys, list) or not api_keys:
+            raise ValidationException("API Key 池不能为空", field="api_keys", value=str(api_keys))
+        
+        for item in api_keys:
+            key = item.get("key") if isinstance(item, dict) else item
+            if not isinstance(key, str) or len(key.strip()) < 8:
+                raise ValidationException("API Key 池中包含无效的 Key", field="api_keys", value=str(key))
+        
+        self.config['api_keys'] = api_keys
+        self.save_config()
+        self.logger.info(f"API Key 池设置成功，共 {len(api_keys)} 个 Key")
+        return True
+    
     def get_api_url(self) -> str:
         """
         获取 API URL
@@ -165,6 +228,47 @@ class ConfigManager:
         self.logger.info("API URL 设置成功")
         return True
     
+    def get_api_urls(self) -> List[str]:
+        """
+        获取 API 端点列表
+        
+        配置项 api_urls 为兼容端点的列表；未配置时退回单个 api_url。
+        
+        Returns:
+            API URL 列表
+        """
+        api_urls = self.config.get('api_urls')
+        if isinstance(api_urls, list) and api_urls:
+            return [url for url in api_urls if isinstance(url, str) and url.strip()]
+        return [self.get_api_url()]
+    
+    def set_api_urls(self, api_urls: List[str]) -> bool:
+        """
+        设置 API 端点列表
+        
+        Args:
+            api_urls: API URL 列表，靠前的端点优先
+            
+        Returns:
+            设置成功返回 True
+            
+        Raises:
+            ValidationException: 列表为空或包含无效 URL 时抛出
+            ConfigException: 保存失败时抛出
+        """
+        if not isinstance(api_urls, list) or not api_urls:
+            raise ValidationException("API URL 列表不能为空", field="api_urls", value=str(api_urls))
+        
+        api_urls = [str(url).strip() for url in api_urls]
+        for url in api_urls:
+            if not (url.startswith('http://') or url.startswith('https://')):
+                raise ValidationException("API URL 必须以 http:// 或 https:// 开头", field="api_urls", value=url)
+        
+        self.config['api_urls'] = api_urls
+        self.save_config()
+        self.logger.info(f"API URL 列表设置成功，共 {len(api_urls)} 个端点")
+        return True
+    
     def get(self, key: str, default: Any = None) -> Any:
         """
         获取配置项
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+请求超时
+分别设置建立连接、等待响应开始和整个请求的超时，
+自适应模式下按同模型、同尺寸的历史延迟设置等待响应的超时
+"""
+
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from config.constants import API_CONFIG, DEADLINE_CONFIG
+from utils.latency_stats import LatencyStats
+
+
+class Deadlines:
+    """一次请求的超时设置"""
+
+    def __init__(self, connect: float, first_byte: float, total: float):
+        """
+        初始化超时设置
+
+        Args:
+            connect: 建立连接的超时（秒）
+            first_byte: 等待响应开始的超时（秒）
+            total: 整个请求的超时（秒）
+        """
+        self.connect = connect
+        self.first_byte = min(first_byte, total)
+        self.total = total
+        self.started_at = time.monotonic()
+
+    @property
+    def expires_at(self) -> float:
+        """整个请求的截止时刻（monotonic 时间）"""
+        return self.started_at + self.total
+
+    def remaining(self) -> float:
+        """距离截止时刻的剩余秒数"""
+        return self.expires_at - time.monotonic()
+
+    def requests_timeout(self) -> Tuple[float, float]:
+        """
+        转换为 requests 的 (连接超时, 读取超时) 参数
+
+        读取超时同时受剩余总时间限制。
+        """
+        return self.connect, max(0.001, min(self.first_byte, self.remaining()))
+
+    def __repr__(self) -> str:
+        return f"连接 {self.connect:g}s / 首字节 {self.first_byte:.0f}s / 总计 {self.total:g}s"
+
+
+class DeadlinePolicy:
+    """超时策略"""
+
+    _OPTIONS = ("connect", "first_byte", "total", "adaptive")
+
+    def __init__(self, latency_stats: LatencyStats, connect: Optional[float] = None,
+                 first_byte: Optional[float] = None, total: Optional[float] = None,
+                 adaptive: Optional[bool] = None):
+        """
+        初始化超时策略
+
+        Args:
+            latency_stats: 延迟统计
+            connect: 建立连接的超时（秒）
+            first_byte: 等待响应开始的超时（秒），自适应模式下作为上限
+            total: 整个请求的超时（秒）
+            adaptive: 是否按历史延迟设置等待响应的超时
+        """
+        self.latency_stats = latency_stats
+        self.connect = connect or API_CONFIG["connect_timeout"]
+        self.first_byte = first_byte or API_CONFIG["first_byte_timeout"]
+        self.total = total or API_CONFIG["total_timeout"]
+        self.adaptive = DEADLINE_CONFIG["adaptive"] if adaptive is None else adaptive
+
+    @classmethod
+    def from_config(cls, latency_stats: LatencyStats, overrides: Optional[Dict[str, Any]] = None) -> "DeadlinePolicy":
+        """
+        按配置文件中的 timeouts 项创建超时策略
+
+        Args:
+            latency_stats: 延迟统计
+            overrides: 覆盖默认值的字典，如 {"connect": 5, "adaptive": false}
+
+        Returns:
+            超时策略
+        """
+        overrides = overrides if isinstance(overrides, dict) else {}
+        return cls(latency_stats, **{k: v for k, v in overrides.items() if k in cls._OPTIONS})
+
+    def for_key(self, key: str) -> Deadlines:
+        """
+        获取一次请求的超时设置
+
+        Args:
+            key: 延迟统计分组键
+
+        Returns:
+            超时设置，计时从调用时开始
+        """
+        first_byte = self.first_byte
+        if self.adaptive and self.latency_stats.count(key) >= DEADLINE_CONFIG["min_samples"]:
+            observed = self.latency_stats.percentile(key, DEADLINE_CONFIG["percentile"])
+            first_byte = min(self.first_byte,
+                             max(DEADLINE_CONFIG["min_first_byte"], observed * DEADLINE_CONFIG["multiplier"]))
+        return Deadlines(self.connect, first_byte, self.total)
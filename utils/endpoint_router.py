@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+端点路由器
+在多个兼容的 API 端点之间按延迟和错误率持续打分，将每个请求路由到表现最好的端点，
+失败过多的端点由熔断器暂时隔离。相同端点列表的路由器在进程内共享，评分跨批次保留
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config.constants import ERROR_MESSAGES, ROUTER_CONFIG
+from utils.circuit_breaker import STATE_CLOSED, get_circuit_breaker
+from utils.exceptions import CircuitOpenException, ValidationException
+from utils.logger import get_logger
+
+
+class EndpointState:
+    """单个端点的评分状态"""
+
+    def __init__(self, url: str, order: int):
+        self.url = url
+        self.order = order
+        self.ewma_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.breaker = get_circuit_breaker(url)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为统计字典"""
+        return {
+            "url": self.url,
+            "ewma_latency": round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "circuit": self.breaker.to_dict()
+        }
+
+
+class EndpointRouter:
+    """延迟感知的端点路由器"""
+
+    def __init__(self, urls: Iterable[str]):
+        """
+        初始化路由器
+
+        Args:
+            urls: 端点 URL 列表，靠前的端点在评分相同时优先
+
+        Raises:
+            ValidationException: 没有可用端点时抛出
+        """
+        self.logger = get_logger(__name__)
+        self._lock = threading.Lock()
+        self._states: List[EndpointState] = []
+        for url in urls:
+            url = (url or "").strip()
+            if url and url not in (s.url for s in self._states):
+                self._states.append(EndpointState(url, len(self._states)))
+        if not self._states:
+            raise ValidationException("API 端点列表为空", field="api_urls", value="")
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    @property
+    def urls(self) -> List[str]:
+        """所有端点 URL（按配置顺序）"""
+        return [s.url for s in self._states]
+
+    @property
+    def primary_url(self) -> str:
+        """首选端点 URL"""
+        return self._states[0].url
+
+    def _score(self, state: EndpointState, prior: float) -> float:
+        """端点评分，越低越好（需持有锁）"""
+        latency = state.ewma_latency if state.ewma_latency is not None else prior
+        return latency * (1 + ROUTER_CONFIG["error_penalty"] * state.error_rate) * (1 + state.in_flight)
+
+    def choose(self, exclude: Iterable[str] = ()) -> Optional[str]:
+        """
+        选择当前评分最好的端点并计入在途请求
+
+        冷却结束的熔断端点优先用于探测（每次只放行一个请求），其余请求在未熔断的端点中按评分选择。
+
+        Args:
+            exclude: 本次请求已经尝试过的端点
+
+        Returns:
+            端点 URL，所有端点都已尝试过时返回 None
+
+        Raises:
+            CircuitOpenException: 剩余端点全部处于熔断状态时抛出
+        """
+        excluded = set(exclude)
+        with self._lock:
+            candidates = [s for s in self._states if s.url not in excluded]
+            if not candidates:
+                return None
+
+            state = next((s for s in candidates
+                          if s.breaker.state != STATE_CLOSED and s.breaker.allow_request()), None)
+            if state is None:
+                closed = [s for s in candidates if s.breaker.allow_request()]
+                if not closed:
+                    retry_after = min(s.breaker.retry_after() for s in candidates)
+                    raise CircuitOpenException(ERROR_MESSAGES["circuit_open"], retry_after=retry_after,
+                                               details={"retry_after": round(retry_after, 1)})
+                observed = [s.ewma_latency for s in self._states if s.ewma_latency is not None]
+                # 未观测过的端点使用已知最低延迟作为先验，保证它们能被尝试
+                prior = min(observed) if observed else 1.0
+                state = min(closed, key=lambda s: (self._score(s, prior), s.order))
+
+            state.in_flight += 1
+            state.requests += 1
+            return state.url
+
+    def acquire_probe(self) -> Optional[str]:
+        """
+        所有端点都熔断时，占用一个探测名额
+
+        Returns:
+            可以探测的端点 URL（调用方之后必须调用 record）；有未熔断的端点时返回 None
+
+        Raises:
+            CircuitOpenException: 所有端点都熔断且都不能探测时抛出
+        """
+        with self._lock:
+            if any(s.breaker.state == STATE_CLOSED for s in self._states):
+                return None
+        return self.choose()
+
+    def record(self, url: str, success: bool, latency: Optional[float] = None) -> None:
+        """
+        记录一次请求结果并更新评分
+
+        Args:
+            url: 端点 URL
+            success: 请求是否成功（端点可用，且没有返回 5xx）
+            latency: 成功请求的耗时（秒）
+        """
+        alpha = ROUTER_CONFIG["ewma_alpha"]
+        with self._lock:
+            state = next((s for s in self._states if s.url == url), None)
+            if state is None:
+                return
+
+            state.in_flight = max(0, state.in_flight - 1)
+            state.error_rate = (1 - alpha) * state.error_rate + alpha * (0.0 if success else 1.0)
+            if success:
+                state.breaker.record_success()
+                if latency is not None:
+                    state.ewma_latency = (latency if state.ewma_latency is None
+                                          else (1 - alpha) * state.ewma_latency + alpha * latency)
+                return
+
+            state.failures += 1
+            state.breaker.record_failure()
+
+    def release(self, url: str) -> None:
+        """
+        释放在途计数但不影响评分（请求因与端点无关的原因结束时使用）
+
+        Args:
+            url: 端点 URL
+        """
+        with self._lock:
+            state = next((s for s in self._states if s.url == url), None)
+            if state is not None:
+                state.in_flight = max(0, state.in_flight - 1)
+                state.breaker.release()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        获取每个端点的评分统计
+
+        Returns:
+            统计字典列表
+        """
+        with self._lock:
+            return [state.to_dict() for state in self._states]
+
+
+# 进程内按端点列表共享的路由器，界面每次生成都会新建 ImageUtils，评分不应从零开始
+_routers: Dict[Tuple[str, ...], EndpointRouter] = {}
+_routers_lock = threading.Lock()
+
+
+def get_router(urls: Iterable[str]) -> EndpointRouter:
+    """
+    获取端点列表对应的共享路由器
+
+    Args:
+        urls: 端点 URL 列表，顺序不同视为不同的路由器（靠前的端点在评分相同时优先）
+
+    Returns:
+        路由器
+
+    Raises:
+        ValidationException: 没有可用端点时抛出
+    """
+    key = tuple(url.strip() for url in urls if url and url.strip())
+    with _routers_lock:
+        router = _routers.get(key)
+        if router is None:
+            router = _routers[key] = EndpointRouter(key)
+        return router
+
+
+def reset_routers() -> None:
+    """丢弃所有共享路由器的评分（例如修改 API 设置后）"""
+    with _routers_lock:
+        _routers.clear()
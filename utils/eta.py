@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+生成进度预估
+根据同模型、同尺寸的历史延迟估计单张图像的耗时，并跟踪一次批量生成中每张图像的进度。
+历史延迟保存在本地文件中，重启后预估仍然可用，也可用于容量规划
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from config.constants import ETA_CONFIG
+from utils.latency_stats import LatencyStats, latency_key, latency_stats
+from utils.logger import get_logger
+
+# 单张图像的状态
+SLOT_QUEUED = "queued"
+SLOT_RUNNING = "running"
+SLOT_DONE = "done"
+SLOT_FAILED = "failed"
+
+
+class EtaEstimator:
+    """单张图像耗时预估器"""
+
+    def __init__(self, stats: Optional[LatencyStats] = None, percentile: Optional[float] = None,
+                 min_samples: Optional[int] = None, default_seconds: Optional[float] = None):
+        """
+        初始化预估器
+
+        Args:
+            stats: 延迟统计，默认使用全局实例
+            percentile: 用作预计耗时的历史延迟分位数
+            min_samples: 样本数达到该值才使用历史延迟
+            default_seconds: 样本不足时的预计耗时（秒）
+        """
+        self.stats = stats or latency_stats
+        self.percentile = percentile or ETA_CONFIG["percentile"]
+        self.min_samples = ETA_CONFIG["min_samples"] if min_samples is None else min_samples
+        self.default_seconds = default_seconds or ETA_CONFIG["default_seconds"]
+
+    def expected(self, model: str, size: str) -> float:
+        """
+        预计单张图像的耗时
+
+        Args:
+            model: 模型名称
+            size: 图像尺寸
+
+        Returns:
+            预计耗时（秒）
+        """
+        key = latency_key(model, size)
+        if self.stats.count(key) < self.min_samples:
+            return self.default_seconds
+        return self.stats.percentile(key, self.percentile) or self.default_seconds
+
+
+class GenerationProgress:
+    """一次批量生成中每张图像的进度（线程安全）"""
+
+    def __init__(self, total: int, expected_seconds: float, concurrency: int = 1,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        初始化进度
+
+        Args:
+            total: 图像总数
+            expected_seconds: 单张图像的预计耗时（秒）
+            concurrency: 同时生成的图像数，用于估计排队图像的剩余时间
+            clock: 时钟函数（测试时可替换）
+        """
+        self.total = max(1, total)
+        self.expected_seconds = max(0.1, expected_seconds)
+        self.concurrency = max(1, concurrency)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._states = [SLOT_QUEUED] * self.total
+        self._started: Dict[int, float] = {}
+        self._elapsed: Dict[int, float] = {}
+
+    def start(self, index: int) -> None:
+        """标记图像开始生成（在工作线程中调用）"""
+        with self._lock:
+            if 0 <= index < self.total and self._states[index] == SLOT_QUEUED:
+                self._states[index] = SLOT_RUNNING
+                self._started[index] = self._clock()
+
+    def finish(self, index: int, success: bool = True) -> None:
+        """标记图像完成或失败"""
+        with self._lock:
+            if not 0 <= index < self.total or self._states[index] in (SLOT_DONE, SLOT_FAILED):
+                return
+            started = self._started.get(index)
+            self._elapsed[index] = self._clock() - started if started is not None else 0.0
+            self._states[index] = SLOT_DONE if success else SLOT_FAILED
+
+    def slots(self) -> List[Dict[str, Any]]:
+        """
+        获取每张图像的进度
+
+        Returns:
+            列表，每项包含 index、state、elapsed（秒）和 expected（秒）
+        """
+        now = self._clock()
+        with self._lock:
+            result = []
+            for index, state in enumerate(self._states):
+                if state == SLOT_RUNNING:
+                    elapsed = now - self._started[index]
+                else:
+                    elapsed = self._elapsed.get(index, 0.0)
+                result.append({
+                    "index": index,
+                    "state": state,
+                    "elapsed": elapsed,
+                    "expected": self.expected_seconds
+                })
+            return result
+
+    def fraction(self) -> float:
+        """
+        整体进度（0.0 - 1.0），进行中的图像按已用时间占预计耗时的比例计入
+
+        Returns:
+            进度值
+        """
+        cap = ETA_CONFIG["max_running_fraction"]
+        done = 0.0
+        for slot in self.slots():
+            if slot["state"] in (SLOT_DONE, SLOT_FAILED):
+                done += 1
+            elif slot["state"] == SLOT_RUNNING:
+                done += min(cap, slot["elapsed"] / slot["expected"])
+        return done / self.total
+
+    def remaining(self) -> float:
+        """
+        预计剩余时间（秒）
+
+        剩余工作量（进行中图像的剩余预计耗时 + 排队图像的预计耗时）按并发数分摊，
+        且不少于进行中图像的最长剩余时间
+
+        Returns:
+            剩余秒数
+        """
+        slots = self.slots()
+        running = [max(0.0, s["expected"] - s["elapsed"]) for s in slots if s["state"] == SLOT_RUNNING]
+        queued = sum(1 for s in slots if s["state"] == SLOT_QUEUED)
+        work = sum(running) + queued * self.expected_seconds
+        longest = max(running, default=0.0)
+        if queued:
+            longest = max(longest, self.expected_seconds)
+        return max(longest, work / self.concurrency)
+
+    @property
+    def finished_count(self) -> int:
+        """已完成（含失败）的图像数"""
+        with self._lock:
+            return sum(1 for state in self._states if state in (SLOT_DONE, SLOT_FAILED))
+
+
+def load_latency_history(path: Optional[str] = None, stats: Optional[LatencyStats] = None) -> int:
+    """
+    从文件加载历史延迟样本
+
+    Args:
+        path: 历史文件路径，默认为配置中的文件
+        stats: 延迟统计，默认使用全局实例
+
+    Returns:
+        加载的样本数，文件不存在或损坏时返回 0
+    """
+    path = path or ETA_CONFIG["history_file"]
+    stats = stats or latency_stats
+    if not os.path.exists(path):
+        return 0
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        samples = {str(key): [float(v) for v in values] for key, values in data.get("samples", {}).items()}
+    except (OSError, ValueError, TypeError, AttributeError) as e:
+        get_logger(__name__).warning(f"读取延迟历史失败，忽略: {e}")
+        return 0
+    stats.restore(samples)
+    return sum(len(values) for values in samples.values())
+
+
+def save_latency_history(path: Optional[str] = None, stats: Optional[LatencyStats] = None) -> bool:
+    """
+    保存延迟样本到文件（先写临时文件再替换）
+
+    Args:
+        path: 历史文件路径，默认为配置中的文件
+        stats: 延迟统计，默认使用全局实例
+
+    Returns:
+        是否保存成功
+    """
+    path = path or ETA_CONFIG["history_file"]
+    stats = stats or latency_stats
+    temp_path = f"{path}.tmp"
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"saved_at": time.time(), "samples": stats.snapshot()}, f)
+        os.replace(temp_path, path)
+        return True
+    except OSError as e:
+        get_logger(__name__).warning(f"保存延迟历史失败: {e}")
+        return False
+
+
+def format_seconds(seconds: float) -> str:
+    """
+    格式化时长
+
+    Args:
+        seconds: 秒数
+
+    Returns:
+        如 "45秒"、"2分05秒"
+    """
+    seconds = max(0, int(round(seconds)))
+    if seconds < 60:
+        return f"{seconds}秒"
+    return f"{seconds // 60}分{seconds % 60:02d}秒"
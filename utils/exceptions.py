@@ -55,6 +55,19 @@ class NetworkException(ImageGeneratorException):
     pass
 
 
+class CircuitOpenException(NetworkException):
+    """端点熔断异常（快速失败，未发出请求）"""
+    
+    def __init__(self, message: str, retry_after: float = 0.0, **kwargs):
+        super().__init__(message, **kwargs)
+        self.retry_after = retry_after
+
+
+class RequestCancelledException(ImageGeneratorException):
+    """请求已取消异常（如对冲请求中落后的一方）"""
+    pass
+
+
 class ConfigException(ImageGeneratorException):
     """配置相关异常"""
     pass
@@ -92,6 +105,7 @@ EXCEPTION_MAPPING = {
     "api_key_invalid": APIKeyException,
     "api_timeout": APITimeoutException,
     "network_error": NetworkException,
+    "circuit_open": CircuitOpenException,
     "config_error": ConfigException,
     "validation_error": ValidationException,
     "image_processing_error": ImageProcessingException,
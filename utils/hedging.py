@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+对冲请求
+请求耗时超过最近延迟的分位数时发出一个重复请求，采用先完成的结果，
+对冲数量受额度限制，保证配额消耗可预期；落后的请求被取消，立即归还占用的 Key 和端点名额
+"""
+
+import contextvars
+import queue
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from config.constants import HEDGE_CONFIG
+from utils.latency_stats import LatencyStats
+from utils.logger import get_logger
+
+# 尝试名称
+ATTEMPT_PRIMARY = "primary"
+ATTEMPT_HEDGE = "hedge"
+
+
+class Cancellation:
+    """一次尝试的取消标记：取消时执行尝试登记的清理（如归还 Key 和端点在途计数）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._cleanups: Dict[int, Callable[[], None]] = {}
+        self._next_id = 0
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已取消"""
+        return self._cancelled
+
+    def cancel(self) -> None:
+        """取消尝试并执行尚未认领的清理，重复调用时忽略"""
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            cleanups = list(self._cleanups.values())
+            self._cleanups.clear()
+        for cleanup in cleanups:
+            try:
+                cleanup()
+            except Exception as e:
+                get_logger(__name__).warning(f"取消请求时清理失败: {e}")
+
+    def defer(self, cleanup: Callable[[], None]) -> Callable[[], bool]:
+        """
+        登记取消时执行的清理
+
+        Args:
+            cleanup: 清理函数
+
+        Returns:
+            认领函数：尝试结束时调用，返回 True 表示清理仍由调用方执行，
+            返回 False 表示已被取消且清理已经执行；只有第一次调用可能返回 True
+        """
+        with self._lock:
+            if not self._cancelled:
+                cleanup_id = self._next_id
+                self._next_id += 1
+                self._cleanups[cleanup_id] = cleanup
+            else:
+                cleanup_id = None
+        if cleanup_id is None:
+            cleanup()
+            return lambda: False
+
+        def claim() -> bool:
+            with self._lock:
+                return self._cleanups.pop(cleanup_id, None) is not None
+
+        return claim
+
+
+# 当前对冲尝试的取消标记，不在对冲尝试中时为 None
+_current_cancellation: contextvars.ContextVar[Optional[Cancellation]] = contextvars.ContextVar(
+    "current_cancellation", default=None)
+
+
+def is_cancelled() -> bool:
+    """当前尝试是否已被取消（不在对冲尝试中时总是 False）"""
+    cancellation = _current_cancellation.get()
+    return cancellation is not None and cancellation.cancelled
+
+
+def defer_cancel(cleanup: Callable[[], None]) -> Callable[[], bool]:
+    """
+    为当前尝试登记取消时执行的清理，见 Cancellation.defer
+
+    Args:
+        cleanup: 清理函数
+
+    Returns:
+        认领函数；不在对冲尝试中时不会被取消，总是返回 True
+    """
+    cancellation = _current_cancellation.get()
+    if cancellation is None:
+        return lambda: True
+    return cancellation.defer(cleanup)
+
+
+class HedgePolicy:
+    """对冲策略：决定何时发出对冲请求，并管理对冲额度"""
+
+    def __init__(self, latency_stats: LatencyStats, percentile: Optional[float] = None,
+                 min_samples: Optional[int] = None, min_delay: Optional[float] = None,
+                 budget_ratio: Optional[float] = None, max_budget: Optional[float] = None):
+        """
+        初始化对冲策略
+
+        Args:
+            latency_stats: 延迟统计，用于计算对冲等待时间
+            percentile: 触发对冲的延迟分位数
+            min_samples: 开始对冲所需的最少样本数
+            min_delay: 对冲等待时间下限（秒）
+            budget_ratio: 每个请求积累的对冲额度
+            max_budget: 对冲额度上限
+        """
+        self.latency_stats = latency_stats
+        self.percentile = percentile or HEDGE_CONFIG["percentile"]
+        self.min_samples = HEDGE_CONFIG["min_samples"] if min_samples is None else min_samples
+        self.min_delay = HEDGE_CONFIG["min_delay"] if min_delay is None else min_delay
+        self.budget_ratio = HEDGE_CONFIG["budget_ratio"] if budget_ratio is None else budget_ratio
+        self.max_budget = HEDGE_CONFIG["max_budget"] if max_budget is None else max_budget
+        self.logger = get_logger(__name__)
+
+        self._lock = threading.Lock()
+        self._budget = 0.0
+        self._requests = 0
+        self._hedged = 0
+        self._hedge_wins = 0
+        self._abandoned = 0
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        """
+        计算分组的对冲等待时间
+
+        Args:
+            key: 延迟统计分组键
+
+        Returns:
+            等待时间（秒），样本不足时返回 None（不对冲）
+        """
+        if self.latency_stats.count(key) < self.min_samples:
+            return None
+        delay = self.latency_stats.percentile(key, self.percentile)
+        return max(self.min_delay, delay) if delay is not None else None
+
+    def _take_budget(self) -> bool:
+        """消耗一个对冲额度"""
+        with self._lock:
+            if self._budget < 1.0:
+                return False
+            self._budget -= 1.0
+            self._hedged += 1
+            return True
+
+    def execute(self, key: str, primary: Callable[[], Any], hedge: Callable[[], Any]) -> Any:
+        """
+        执行请求，必要时发出对冲请求并采用先成功的结果
+
+        两个尝试都失败时抛出最后一个异常。有结果后取消落后的尝试：它登记的清理立即执行
+        （归还 Key 和端点在途计数），后台线程在 HTTP 调用返回或读到下一块数据时关闭响应并结束。
+
+        Args:
+            key: 延迟统计分组键
+            primary: 主请求
+            hedge: 对冲请求（应尽量使用其他端点或 Key）
+
+        Returns:
+            先成功的请求结果
+        """
+        with self._lock:
+            self._requests += 1
+            self._budget = min(self.max_budget, self._budget + self.budget_ratio)
+
+        delay = self.hedge_delay(key)
+        if delay is None:
+            return primary()
+
+        results: "queue.Queue[tuple]" = queue.Queue()
+        attempts = {ATTEMPT_PRIMARY: self._start_attempt(ATTEMPT_PRIMARY, primary, results)}
+        try:
+            name, result, error = results.get(timeout=delay)
+        except queue.Empty:
+            pass
+        else:
+            if error is not None:
+                raise error
+            return result
+
+        if not self._take_budget():
+            name, result, error = results.get()
+            if error is not None:
+                raise error
+            return result
+
+        self.logger.info(f"请求超过 {delay:.1f} 秒（P{self.percentile:g}），发出对冲请求: {key}")
+        attempts[ATTEMPT_HEDGE] = self._start_attempt(ATTEMPT_HEDGE, hedge, results)
+
+        last_error = None
+        for outstanding in (2, 1):
+            name, result, error = results.get()
+            if error is None:
+                for other, cancellation in attempts.items():
+                    if other != name:
+                        cancellation.cancel()
+                with self._lock:
+                    if name == ATTEMPT_HEDGE:
+                        self._hedge_wins += 1
+                    if outstanding == 2:
+                        self._abandoned += 1
+                return result
+            last_error = error
+        raise last_error
+
+    @staticmethod
+    def _start_attempt(name: str, fn: Callable[[], Any], results: "queue.Queue[tuple]") -> Cancellation:
+        """
+        在后台线程中运行一次尝试，结果放入队列（沿用调用方的上下文，如请求 ID）
+
+        Returns:
+            尝试的取消标记，尝试内可通过 is_cancelled()/defer_cancel() 访问
+        """
+        cancellation = Cancellation()
+
+        def run():
+            _current_cancellation.set(cancellation)
+            try:
+                results.put((name, fn(), None))
+            except Exception as e:
+                results.put((name, None, e))
+
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(run,), name=f"Hedge-{name}", daemon=True).start()
+        return cancellation
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取对冲统计
+
+        Returns:
+            统计字典
+        """
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "hedged": self._hedged,
+                "hedge_wins": self._hedge_wins,
+                "abandoned": self._abandoned,
+                "budget": round(self._budget, 2)
+            }
@@ -5,51 +5,167 @@
 """
 
 import base64
+import hashlib
 import io
+import json
+import logging
 import os
 import requests
 import threading
-from typing import Optional, Union, Callable
-from PIL import Image, ImageTk
-import tkinter as tk
+import time
+from typing import Iterator, Optional, Union, Callable
+from PIL import Image
 
+from config.constants import (API_CONFIG, DEADLINE_CONFIG, ERROR_MESSAGES, HEDGE_CONFIG, PERFORMANCE,
+                              RESPONSE_CACHE_CONFIG, ROUTER_CONFIG, STREAMING_CONFIG)
 from utils.config_manager import config_manager
+from utils.exceptions import (APIException, APITimeoutException, CircuitOpenException, ExceptionHandler,
+                              NetworkException, RequestCancelledException)
+from utils.circuit_breaker import get_circuit_breaker
+from utils.deadlines import DeadlinePolicy, Deadlines
+from utils.endpoint_router import get_router
+from utils.hedging import HedgePolicy, defer_cancel, is_cancelled
+from utils.key_pool import APIKeyPool
+from utils.latency_stats import latency_key, latency_stats
+from utils.logger import get_logger, log_event, request_context
+from utils.metrics import metrics
+from utils.response_cache import ResponseCache, get_response_cache
+from utils.single_flight import SingleFlight
+from utils.tracing import tracer
+
+logger = get_logger(__name__)
 
 
 class ImageUtils:
     """图像处理工具类"""
     
-    def __init__(self, api_key: str = None):
+    # 进程内共享的 HTTP 会话（连接池），所有实例复用
+    _session: Optional[requests.Session] = None
+    _session_lock = threading.Lock()
+    
+    # 进程内共享的请求合并器（界面每次生成都会新建实例）
+    _single_flight = SingleFlight()
+    
+    @classmethod
+    def get_session(cls) -> requests.Session:
+        """
+        获取共享的 HTTP 会话
+        
+        Returns:
+            复用连接的 requests.Session 对象
+        """
+        with cls._session_lock:
+            if cls._session is None:
+                pool_size = PERFORMANCE["max_concurrent_generations"] * 2
+                adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                cls._session = session
+            return cls._session
+    
+    def __init__(self, api_key: str = None, key_pool=None):
         """
         初始化图像工具
         
         Args:
             api_key: API Key（可选，如果不提供则从配置管理器获取）
+            key_pool: API Key 池（可选，提供时按池分配每次请求使用的 Key）
         """
-        # 优先使用传入的 api_key，然后从配置管理器获取
-        if api_key and api_key != 'your-api-key-here':
-            self.api_key = api_key
+        # 优先使用传入的 Key 池或 api_key，然后从配置管理器获取
+        if key_pool is not None:
+            self.key_pool = key_pool
+        elif api_key and api_key != 'your-api-key-here':
+            self.key_pool = APIKeyPool([api_key])
         else:
-            self.api_key = config_manager.get_api_key() or os.getenv('OPENAI_API_KEY', 'your-api-key-here')
+            configured_keys = config_manager.get_api_keys()
+            self.key_pool = APIKeyPool(configured_keys or [os.getenv('OPENAI_API_KEY', 'your-api-key-here')])
+        self.api_key = self.key_pool.primary_key
         
-        # 从配置管理器获取 API URL
-        self.api_url = config_manager.get_api_url()
+        # 从配置管理器获取 API 端点（可配置多个兼容端点），评分在进程内共享
+        self.router = get_router(config_manager.get_api_urls())
         
-        # 打印 API Key 信息（隐藏敏感部分）
+        # 记录 API Key 信息（隐藏敏感部分）
         if self.api_key and self.api_key != 'your-api-key-here':
-            masked_key = self.api_key[:8] + "..." + self.api_key[-4:] if len(self.api_key) > 12 else "***"
-            print(f"使用 API Key: {masked_key}")
+            if logger.isEnabledFor(logging.DEBUG):
+                masked_key = self.api_key[:8] + "..." + self.api_key[-4:] if len(self.api_key) > 12 else "***"
+                log_event(logger, logging.DEBUG, "api_key_configured", keys=len(self.key_pool), first=masked_key)
         else:
-            print("警告: 未设置有效的 API Key")
+            logger.warning("未设置有效的 API Key")
         
         # 请求头
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
+        self.headers = self._build_headers(self.api_key)
+        
+        # 延迟统计（进程内共享）、超时策略和可选的对冲策略
+        self.latency_stats = latency_stats
+        self.deadline_policy = DeadlinePolicy.from_config(self.latency_stats, config_manager.get('timeouts'))
+        self.hedge_policy: Optional[HedgePolicy] = None
+        if config_manager.get('hedge_requests', HEDGE_CONFIG["enabled"]):
+            self.enable_hedging()
+        
+        # 可选的响应缓存
+        self.response_cache: Optional[ResponseCache] = None
+        if config_manager.get('response_cache', RESPONSE_CACHE_CONFIG["enabled"]):
+            self.enable_response_cache(config_manager.get('response_cache_dir'))
+    
+    def enable_hedging(self, **options) -> HedgePolicy:
+        """
+        启用对冲请求
+        
+        Args:
+            **options: 传给 HedgePolicy 的参数（分位数、额度等）
+            
+        Returns:
+            对冲策略
+        """
+        self.hedge_policy = HedgePolicy(self.latency_stats, **options)
+        return self.hedge_policy
+    
+    def enable_response_cache(self, directory: Optional[str] = None) -> ResponseCache:
+        """
+        启用响应缓存：完整请求数据相同时直接返回磁盘上的结果，不调用 API
+        
+        Args:
+            directory: 缓存目录，默认为 RESPONSE_CACHE_CONFIG 中的目录
+            
+        Returns:
+            响应缓存
+        """
+        self.response_cache = get_response_cache(directory)
+        return self.response_cache
+    
+    @property
+    def api_url(self) -> str:
+        """首选 API 端点"""
+        return self.router.primary_url
+    
+    @api_url.setter
+    def api_url(self, api_url: str) -> None:
+        """设置单个 API 端点"""
+        self.router = get_router([api_url])
+    
+    @property
+    def api_urls(self) -> list:
+        """所有 API 端点"""
+        return self.router.urls
+    
+    @api_urls.setter
+    def api_urls(self, api_urls: list) -> None:
+        """设置多个兼容的 API 端点，靠前的优先"""
+        self.router = get_router(api_urls)
+    
+    @staticmethod
+    def _build_headers(api_key: str) -> dict:
+        """构建请求头"""
+        return {
+            "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
 
     def generate_image_async(self, prompt: str, size: str = "1024x1536", model: str = "sora_image", 
-                           callback: Callable = None, index: int = 0) -> None:
+                           callback: Callable = None, index: int = 0, scheduler=None, coalesce: bool = False,
+                           partial_callback: Callable = None, start_callback: Callable = None,
+                           priority: str = None):
         """
         异步调用 API 生成图像
         
@@ -59,84 +175,480 @@ class ImageUtils:
             model: 使用的模型，如 "sora_image" 或 "gpt-image-1"
             callback: 完成时的回调函数
             index: 图像索引
+            scheduler: 执行任务的调度器，默认使用全局共享调度器
+            coalesce: 是否与进行中的相同请求合并（见 request_image）
+            partial_callback: 收到预览帧时的回调，签名为 partial_callback(index, image_data)
+            start_callback: 任务开始执行（不再排队）时的回调，签名为 start_callback(index)
+            priority: 任务优先级（见 utils.scheduler.PRIORITIES），默认为普通优先级
+            
+        Returns:
+            任务对应的 Future 对象
         """
-        def generate():
-            result = self.generate_image(prompt, size, model)
-            if callback:
-                callback(index, result)
+        from utils.scheduler import PRIORITY_NORMAL, get_scheduler
         
-        thread = threading.Thread(target=generate, daemon=True)
-        thread.start()
+        scheduler = scheduler or get_scheduler()
+        return scheduler.submit_generation(self, prompt, size, model, callback=callback, index=index,
+                                           coalesce=coalesce, partial_callback=partial_callback,
+                                           start_callback=start_callback,
+                                           priority=priority or PRIORITY_NORMAL)
 
-    def generate_image(self, prompt: str, size: str = "1024x1536", model: str = "sora_image") -> Optional[str]:
+    @staticmethod
+    def build_payload(prompt: str, size: str, model: str) -> dict:
         """
-        调用 API 生成图像
+        构建图像生成请求数据
+        
+        Args:
+            prompt: 图像描述文本
+            size: 图像尺寸
+            model: 使用的模型
+            
+        Returns:
+            请求数据字典
+        """
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "n": 1,
+            "size": size
+        }
+        payload.update(API_CONFIG["generation_params"])
+        return payload
+
+    @staticmethod
+    def payload_hash(payload: dict) -> str:
+        """
+        计算请求数据的哈希（键排序后的 JSON）
+        
+        Args:
+            payload: 请求数据
+            
+        Returns:
+            十六进制 SHA-256 哈希
+        """
+        canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def request_image(self, prompt: str, size: str = "1024x1536", model: str = "sora_image",
+                      coalesce: bool = False, on_partial: Optional[Callable[[str, int], None]] = None,
+                      cache_slot: int = 0) -> str:
+        """
+        调用 API 生成图像，失败时抛出异常
         
         Args:
             prompt: 图像描述文本
             size: 图像尺寸，如 "1024x1536" 或 "1536x1024"
             model: 使用的模型，如 "sora_image" 或 "gpt-image-1"
+            coalesce: 是否与进行中的相同请求合并，共享同一次 API 调用的结果
+                （适用于重新渲染预览、重新请求失败槽位等确定性场景）
+            on_partial: 收到预览帧时的回调，签名为 on_partial(image_data, partial_index)；
+                仅对支持流式返回的模型（STREAMING_CONFIG["models"]）生效
+            cache_slot: 一次生成多张时的图像序号，启用响应缓存时每个序号单独缓存，
+                避免同一批的各张图像从缓存得到同一张图像
             
         Returns:
-            base64 编码的图像数据，失败时返回 None
+            base64 编码的图像数据
+            
+        Raises:
+            APITimeoutException: 请求超时时抛出
+            NetworkException: 网络连接失败或端点熔断时抛出
+            APIException: API 返回错误或响应格式无效时抛出
+        """
+        payload = self.build_payload(prompt, size, model)
+        key = latency_key(model, size)
+        
+        cache_key = None
+        if self.response_cache is not None:
+            cache_key = self.payload_hash({"payload": payload, "slot": cache_slot} if cache_slot else payload)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        # 需要预览时请求流式返回，缓存和合并仍按原始请求数据计算
+        request_payload = payload
+        if on_partial is not None and model in STREAMING_CONFIG["models"]:
+            request_payload = dict(payload, stream=True, partial_images=STREAMING_CONFIG["partial_images"])
+        
+        if coalesce:
+            # 请求数据和端点都相同才合并
+            flight_key = self.payload_hash({"payload": payload, "endpoints": self.router.urls})
+            b64_data = self._single_flight.do(flight_key, lambda: self._dispatch(request_payload, key, on_partial))
+        else:
+            b64_data = self._dispatch(request_payload, key, on_partial)
+        
+        if cache_key is not None:
+            self.response_cache.put(cache_key, b64_data)
+        return b64_data
+
+    def _dispatch(self, payload: dict, key: str, on_partial: Optional[Callable] = None) -> str:
+        """发送请求（启用时使用对冲策略）"""
+        if self.hedge_policy is None:
+            return self._request_with_failover(payload, key, on_partial=on_partial)
+        
+        # 对冲请求避开主请求已使用的端点（只有一个端点时仍发往同一端点，由 Key 池分配其他 Key）
+        primary_tried = []
+        
+        def hedge():
+            avoid = list(primary_tried) if len(self.router) > 1 else []
+            return self._request_with_failover(payload, key, avoid=avoid, on_partial=on_partial)
+        
+        return self.hedge_policy.execute(
+            key,
+            lambda: self._request_with_failover(payload, key, tried=primary_tried, on_partial=on_partial),
+            hedge
+        )
+
+    def _request_with_failover(self, payload: dict, key: str, tried: Optional[list] = None,
+                               avoid: Optional[list] = None, on_partial: Optional[Callable] = None) -> str:
         """
+        按端点评分依次尝试，连接失败或 5xx 时切换到下一个端点
+        
+        Args:
+            payload: 请求数据
+            key: 延迟统计分组键（同时用于计算自适应超时）
+            tried: 记录已尝试端点的列表（可由调用方传入以便观察）
+            avoid: 尽量避开的端点，没有其他端点可选时忽略
+            on_partial: 收到预览帧时的回调
+            
+        Returns:
+            base64 编码的图像数据
+            
+        Raises:
+            CircuitOpenException: 所有端点都处于熔断状态时抛出（未发出请求）
+            RequestCancelledException: 对冲请求中本次尝试落后、已被取消时抛出
+        """
+        tried = [] if tried is None else tried
+        avoid = avoid or []
+        max_attempts = min(len(self.router), ROUTER_CONFIG["max_failover_attempts"])
+        last_error = None
+        while True:
+            if is_cancelled():
+                raise RequestCancelledException(ERROR_MESSAGES["request_cancelled"])
+            try:
+                api_url = self.router.choose(exclude=tried + avoid) if avoid else None
+                api_url = api_url or self.router.choose(exclude=tried)
+            except CircuitOpenException:
+                # 剩余端点都已熔断：首次选择时快速失败，故障切换途中则报告上一个端点的错误
+                if last_error is None:
+                    raise
+                raise last_error
+            tried.append(api_url)
+            # 被取消时立即释放端点的在途计数，之后不再记录本次结果
+            owns_endpoint = defer_cancel(lambda url=api_url: self.router.release(url))
+            start_time = time.time()
+            try:
+                b64_data = self._post_once(api_url, payload, self.deadline_policy.for_key(key), on_partial)
+            except (NetworkException, APIException) as e:
+                if not owns_endpoint():
+                    raise
+                status_code = getattr(e, "status_code", None)
+                endpoint_failed = (isinstance(e, (NetworkException, APITimeoutException))
+                                   or (status_code is not None and status_code >= 500))
+                if not endpoint_failed:
+                    # 4xx 等与端点健康无关的错误，不影响评分，也不切换端点
+                    self.router.release(api_url)
+                    raise
+                self.router.record(api_url, success=False)
+                last_error = e
+                can_failover = not isinstance(e, APITimeoutException) and len(tried) < max_attempts
+                if not can_failover:
+                    raise
+                log_event(logger, logging.WARNING, "endpoint_failover", url=api_url, error=e)
+                continue
+            except Exception:
+                if owns_endpoint():
+                    self.router.release(api_url)
+                raise
+            if not owns_endpoint():
+                raise RequestCancelledException(ERROR_MESSAGES["request_cancelled"], details={"url": api_url})
+            
+            elapsed = time.time() - start_time
+            self.router.record(api_url, success=True, latency=elapsed)
+            self.latency_stats.record(key, elapsed)
+            return b64_data
+
+    def _post_once(self, api_url: str, payload: dict, deadlines: Deadlines,
+                   on_partial: Optional[Callable] = None) -> str:
+        """
+        向单个端点发送一次生成请求
+        
+        Args:
+            api_url: 端点 URL
+            payload: 请求数据
+            deadlines: 本次请求的连接、首字节和总超时
+            on_partial: 收到预览帧时的回调（响应为事件流时使用）
+            
+        Returns:
+            base64 编码的图像数据
+            
+        Raises:
+            APITimeoutException: 读取响应超时时抛出
+            NetworkException: 无法连接端点时抛出
+            APIException: API 返回错误或响应格式无效时抛出
+            RequestCancelledException: 对冲请求中本次尝试已被取消时抛出
+        """
+        lease = self.key_pool.acquire(api_url)
+        # 被取消时立即归还 Key，不等待 HTTP 调用结束
+        owns_lease = defer_cancel(lambda: self.key_pool.abandon(lease))
+        
+        def release_lease(status_code: Optional[int] = None, retry_after: Optional[str] = None) -> None:
+            if owns_lease():
+                self.key_pool.release(lease, status_code, retry_after)
+        
+        log_event(logger, logging.DEBUG, "request_sent", url=api_url, model=payload.get("model"),
+                  size=payload.get("size"), timeouts=deadlines)
+        
         try:
-            # 使用固定参数
-            timeout = 300  # 5分钟超时
-            
-            # 构建请求数据
-            payload = {
-                "model": model,
-                "prompt": prompt,
-                "n": 1,
-                "size": size,
-                "background": "opaque",
-                "moderation": "auto",
-                "output_format": "png",
-                "quality": "high",
-                "style": "natural",
-                "output_compression": 100,
-                "response_format": "b64_json"  # 添加这个字段来获取 base64 响应
-            }
+            # 发送请求（复用共享连接池）；流式接收，以便在总截止时间内读取响应体。
+            # 返回时已收到响应头，耗时包含连接、TLS 握手、上传和服务端处理
+            with tracer.span("http.wait_response", url=api_url) as span:
+                response = self.get_session().post(
+                    api_url,
+                    headers=self._build_headers(lease.key),
+                    json=payload,
+                    timeout=deadlines.requests_timeout(),
+                    stream=True
+                )
+                span.set(status=response.status_code)
+        except (requests.exceptions.ConnectTimeout, requests.exceptions.ConnectionError) as e:
+            # 连接超时也视为无法连接（请求未到达服务器，可以安全地切换端点）
+            release_lease()
+            raise NetworkException(ERROR_MESSAGES["network_error"], details={"url": api_url}) from e
+        except requests.exceptions.Timeout as e:
+            release_lease()
+            raise APITimeoutException(ERROR_MESSAGES["api_timeout"], details={"url": api_url}) from e
+        except Exception:
+            release_lease()
+            raise
+        
+        release_lease(response.status_code, response.headers.get("Retry-After"))
+        if is_cancelled():
+            response.close()
+            raise RequestCancelledException(ERROR_MESSAGES["request_cancelled"], details={"url": api_url})
+        if response.status_code == 200 and "text/event-stream" in response.headers.get("Content-Type", ""):
+            log_event(logger, logging.DEBUG, "response_started", url=api_url, status=200, stream=True)
+            with tracer.span("http.download", stream=True):
+                return self._read_event_stream(response, deadlines, api_url, on_partial)
+        with tracer.span("http.download", stream=False) as span:
+            self._read_body(response, deadlines, api_url)
+            span.set(bytes=len(response.content))
+        
+        log_event(logger, logging.DEBUG, "response_received", url=api_url, status=response.status_code,
+                  bytes=len(response.content))
+        
+        if response.status_code != 200:
+            raise ExceptionHandler.handle_api_error(response.status_code, response.text)
+        
+        try:
+            with tracer.span("http.parse_json"):
+                b64_data = response.json()["data"][0]["b64_json"]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise APIException(ERROR_MESSAGES["invalid_response"], status_code=response.status_code,
+                               response_text=response.text[:500]) from e
+        if not b64_data:
+            raise APIException(ERROR_MESSAGES["invalid_response"], status_code=response.status_code)
+        
+        return b64_data
+
+    @staticmethod
+    def _iter_body(response: requests.Response, deadlines: Deadlines, api_url: str,
+                   chunk_size: Optional[int] = DEADLINE_CONFIG["read_chunk_size"]) -> Iterator[bytes]:
+        """
+        在总截止时间内分块读取响应体，所在的对冲尝试被取消时关闭响应
+        
+        Args:
+            response: 流式响应
+            deadlines: 本次请求的超时设置
+            api_url: 端点 URL（用于错误详情）
+            chunk_size: 每次读取的字节数；为 None 时按到达的数据块返回（分块传输时每块立即返回），
+                用于事件流，避免事件在缓冲区中等到凑满一块才处理
+            
+        Yields:
+            响应体数据块
+            
+        Raises:
+            APITimeoutException: 读取停滞或超过总截止时间时抛出
+            RequestCancelledException: 所在的对冲尝试已被取消时抛出
+        """
+        try:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if is_cancelled():
+                    response.close()
+                    raise RequestCancelledException(ERROR_MESSAGES["request_cancelled"],
+                                                    details={"url": api_url})
+                yield chunk
+                if deadlines.remaining() <= 0:
+                    raise APITimeoutException(ERROR_MESSAGES["api_timeout"],
+                                              details={"url": api_url, "total_timeout": deadlines.total})
+        except requests.exceptions.RequestException as e:
+            # 流式读取超时由 requests 包装为 ConnectionError，此时请求已到达服务器，按超时处理
+            response.close()
+            raise APITimeoutException(ERROR_MESSAGES["api_timeout"], details={"url": api_url}) from e
+        except APITimeoutException:
+            response.close()
+            raise
+
+    @classmethod
+    def _read_body(cls, response: requests.Response, deadlines: Deadlines, api_url: str) -> None:
+        """
+        在总截止时间内读取完整响应体，读取完成后可照常使用 response.json()/text
+        
+        Args:
+            response: 流式响应
+            deadlines: 本次请求的超时设置
+            api_url: 端点 URL（用于错误详情）
             
-            # 打印调试信息
-            print(f"发送请求到: {self.api_url}")
-            print(f"⏳ 开始生成图像，超时时间设置为 {timeout} 秒...")
+        Raises:
+            APITimeoutException: 读取停滞或超过总截止时间时抛出
+        """
+        response._content = b"".join(cls._iter_body(response, deadlines, api_url))
+
+    @classmethod
+    def _read_event_stream(cls, response: requests.Response, deadlines: Deadlines, api_url: str,
+                           on_partial: Optional[Callable] = None) -> str:
+        """
+        读取流式图像事件（server-sent events），预览帧交给 on_partial，返回最终图像
+        
+        Args:
+            response: 流式响应
+            deadlines: 本次请求的超时设置
+            api_url: 端点 URL（用于错误详情）
+            on_partial: 收到预览帧时的回调
             
-            # 发送请求
-            response = requests.post(
-                self.api_url,
-                headers=self.headers,
-                json=payload,
-                timeout=timeout  # 使用配置的超时时间
-            )
+        Returns:
+            base64 编码的最终图像数据
             
-            # 打印响应信息
-            print(f"响应状态码: {response.status_code}")
+        Raises:
+            APITimeoutException: 读取停滞或超过总截止时间时抛出
+            APIException: 事件流返回错误或没有最终图像时抛出
+        """
+        buffer = b""
+        data_lines = []
+        for chunk in cls._iter_body(response, deadlines, api_url, chunk_size=None):
+            buffer += chunk
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                line = line.rstrip(b"\r")
+                if line.startswith(b"data:"):
+                    data_lines.append(line[5:].strip())
+                elif not line and data_lines:
+                    b64_data = cls._handle_stream_event(b"\n".join(data_lines), on_partial)
+                    data_lines = []
+                    if b64_data:
+                        response.close()
+                        return b64_data
+        
+        raise APIException(ERROR_MESSAGES["invalid_response"], status_code=response.status_code,
+                           response_text="事件流在返回最终图像前结束")
+
+    @staticmethod
+    def _handle_stream_event(data: bytes, on_partial: Optional[Callable] = None) -> Optional[str]:
+        """
+        处理一个流式事件
+        
+        Args:
+            data: 事件的 data 字段
+            on_partial: 收到预览帧时的回调
             
-            # 检查响应
-            if response.status_code == 200:
-                result = response.json()
-                if "data" in result and len(result["data"]) > 0:
-                    b64_data = result["data"][0]["b64_json"]
-                    print(f"图像数据长度: {len(b64_data)} 字符")
-                    return b64_data
-                else:
-                    print(f"API 响应中没有图像数据")
-                    return None
-            else:
-                print(f"API 请求失败: {response.status_code} - {response.text}")
-                return None
-                
-        except requests.exceptions.Timeout:
-            print("API 请求超时")
-            return None
-        except requests.exceptions.ConnectionError:
-            print("网络连接错误")
+        Returns:
+            最终图像事件返回 base64 图像数据，其他事件返回 None
+            
+        Raises:
+            APIException: 事件无法解析或为错误事件时抛出
+        """
+        if data == b"[DONE]":
             return None
-        except Exception as e:
-            print(f"生成图像时发生错误: {str(e)}")
+        try:
+            event = json.loads(data)
+        except ValueError as e:
+            raise APIException(ERROR_MESSAGES["invalid_response"], status_code=200,
+                               response_text=data[:500].decode("utf-8", "replace")) from e
+        if not isinstance(event, dict):
+            raise APIException(ERROR_MESSAGES["invalid_response"], status_code=200)
+        
+        event_type = event.get("type", "")
+        if event_type.endswith("partial_image"):
+            if on_partial is not None and event.get("b64_json"):
+                try:
+                    on_partial(event["b64_json"], event.get("partial_image_index", 0))
+                except Exception as e:
+                    log_event(logger, logging.WARNING, "partial_callback_failed", error=e)
             return None
+        if event_type.endswith("completed"):
+            if not event.get("b64_json"):
+                raise APIException(ERROR_MESSAGES["invalid_response"], status_code=200)
+            return event["b64_json"]
+        if event_type == "error" or "error" in event:
+            error = event.get("error") if isinstance(event.get("error"), dict) else {}
+            raise APIException(f"API 请求失败: {error.get('message', '流式响应返回错误')}", status_code=200,
+                               response_text=json.dumps(event, ensure_ascii=False)[:500])
+        return None
+
+    def generate_image(self, prompt: str, size: str = "1024x1536", model: str = "sora_image",
+                       coalesce: bool = False, on_partial: Optional[Callable] = None,
+                       cache_slot: int = 0) -> Optional[str]:
+        """
+        调用 API 生成图像
+        
+        Args:
+            prompt: 图像描述文本
+            size: 图像尺寸，如 "1024x1536" 或 "1536x1024"
+            model: 使用的模型，如 "sora_image" 或 "gpt-image-1"
+            coalesce: 是否与进行中的相同请求合并（见 request_image）
+            on_partial: 收到预览帧时的回调（见 request_image）
+            cache_slot: 一次生成多张时的图像序号（见 request_image）
+            
+        Returns:
+            base64 编码的图像数据，失败时返回 None
+        """
+        with request_context() as request_id, \
+                tracer.span("image.generate", model=model, size=size, request_id=request_id) as span:
+            start_time = time.perf_counter()
+            in_flight = metrics.gauge("image_generation_in_flight", "进行中的生成请求数", model=model)
+            
+            def count(outcome: str) -> None:
+                metrics.counter("image_generation_total", "生成请求数（按结果分类）",
+                                model=model, size=size, outcome=outcome).inc()
+            
+            def failed(reason: str, level: int = logging.WARNING, **extra) -> None:
+                count(reason)
+                span.set(outcome=reason)
+                log_event(logger, level, "image_failed", reason=reason, model=model, size=size,
+                          duration=time.perf_counter() - start_time, **extra)
+            
+            in_flight.inc()
+            try:
+                b64_data = self.request_image(prompt, size, model, coalesce=coalesce, on_partial=on_partial,
+                                              cache_slot=cache_slot)
+            except APITimeoutException:
+                failed("timeout")
+                return None
+            except CircuitOpenException as e:
+                failed("circuit_open", retry_after=round(e.retry_after))
+                return None
+            except NetworkException:
+                failed("network")
+                return None
+            except APIException as e:
+                if e.status_code and e.status_code != 200:
+                    failed("api_error", status=e.status_code, response=repr((e.response_text or "")[:200]))
+                else:
+                    failed("no_image_data")
+                return None
+            except Exception as e:
+                failed("unexpected", logging.ERROR, error=repr(e))
+                logger.debug("生成图像时发生未预期的错误", exc_info=True)
+                return None
+            finally:
+                in_flight.dec()
+            
+            duration = time.perf_counter() - start_time
+            count("ok")
+            span.set(outcome="ok", bytes=len(b64_data) * 3 // 4)
+            metrics.histogram("image_generation_seconds", "成功生成的请求耗时（秒）",
+                              model=model, size=size).observe(duration)
+            log_event(logger, logging.INFO, "image_generated", model=model, size=size,
+                      duration=duration, bytes=len(b64_data) * 3 // 4)
+            return b64_data
 
     @staticmethod
     def base64_to_tk_image(base64_data: str, size: tuple = None, use_ctk_image: bool = True) -> Optional:
@@ -151,35 +663,42 @@ class ImageUtils:
         Returns:
             CTkImage 对象或 ImageTk.PhotoImage 对象，失败时返回 None
         """
+        start_time = time.perf_counter()
         try:
-            # 解码 base64 数据
-            image_bytes = base64.b64decode(base64_data)
+            # 延迟导入 ImageTk，避免无界面环境加载 tkinter
+            from PIL import ImageTk
             
-            # 创建 PIL Image
-            image = Image.open(io.BytesIO(image_bytes))
+            # 解码 base64 数据并完整加载，缩放耗时单独记录
+            with tracer.span("image.decode", stage="display"):
+                image_bytes = base64.b64decode(base64_data)
+                image = Image.open(io.BytesIO(image_bytes))
+                image.load()
             
             # 如果指定了大小，调整图像大小
             if size:
-                image = image.resize(size, Image.Resampling.LANCZOS)
+                with tracer.span("image.resize", size=size):
+                    image = image.resize(size, Image.Resampling.LANCZOS)
             
             if use_ctk_image:
                 # 使用CTkImage，适用于CustomTkinter控件
                 try:
                     import customtkinter as ctk
-                    ctk_image = ctk.CTkImage(light_image=image, dark_image=image, size=size or image.size)
-                    return ctk_image
+                    result = ctk.CTkImage(light_image=image, dark_image=image, size=size or image.size)
                 except Exception as e:
-                    print(f"创建CTkImage失败，回退到PhotoImage: {str(e)}")
+                    log_event(logger, logging.WARNING, "ctk_image_fallback", error=e)
                     # 回退到PhotoImage
-                    photo = ImageTk.PhotoImage(image)
-                    return photo
+                    result = ImageTk.PhotoImage(image)
             else:
                 # 直接使用PhotoImage，适用于标准tkinter控件
-                photo = ImageTk.PhotoImage(image)
-                return photo
+                result = ImageTk.PhotoImage(image)
+            
+            duration = time.perf_counter() - start_time
+            metrics.histogram("image_decode_seconds", "图像解码耗时（秒）", stage="display").observe(duration)
+            log_event(logger, logging.DEBUG, "image_decoded", bytes=len(image_bytes), size=size, duration=duration)
+            return result
                 
         except Exception as e:
-            print(f"转换 base64 到图像时发生错误: {str(e)}")
+            log_event(logger, logging.ERROR, "image_decode_failed", chars=len(base64_data or ""), error=e)
             return None
 
     @staticmethod
@@ -202,7 +721,7 @@ class ImageUtils:
             return image
             
         except Exception as e:
-            print(f"转换 base64 到 PIL Image 时发生错误: {str(e)}")
+            log_event(logger, logging.ERROR, "image_decode_failed", chars=len(base64_data or ""), error=e)
             return None
 
     @staticmethod
@@ -217,6 +736,7 @@ class ImageUtils:
         Returns:
             成功返回 True，失败返回 False
         """
+        start_time = time.perf_counter()
         try:
             # 确保目录存在
             directory = os.path.dirname(file_path)
@@ -224,16 +744,22 @@ class ImageUtils:
                 os.makedirs(directory)
             
             # 解码并保存图像
-            image_bytes = base64.b64decode(base64_data)
-            
-            with open(file_path, 'wb') as f:
-                f.write(image_bytes)
-            
-            print(f"图像已保存到: {file_path}")
+            with tracer.span("image.save", path=file_path):
+                image_bytes = base64.b64decode(base64_data)
+                
+                with open(file_path, 'wb') as f:
+                    f.write(image_bytes)
+            
+            duration = time.perf_counter() - start_time
+            metrics.histogram("image_save_seconds", "图像保存耗时（秒）").observe(duration)
+            metrics.counter("image_saved_bytes_total", "已保存的图像字节数").inc(len(image_bytes))
+            log_event(logger, logging.INFO, "image_saved", path=file_path, bytes=len(image_bytes),
+                      duration=duration)
             return True
             
         except Exception as e:
-            print(f"保存图像时发生错误: {str(e)}")
+            metrics.counter("image_save_failures_total", "图像保存失败次数").inc()
+            log_event(logger, logging.ERROR, "image_save_failed", path=file_path, error=e)
             return False
 
     @staticmethod
@@ -262,7 +788,7 @@ class ImageUtils:
             return base64_string
             
         except Exception as e:
-            print(f"转换 PIL Image 到 base64 时发生错误: {str(e)}")
+            log_event(logger, logging.ERROR, "image_encode_failed", format=format, error=e)
             return None
 
     @staticmethod
@@ -302,7 +828,7 @@ class ImageUtils:
                 return base64_data
                 
         except Exception as e:
-            print(f"调整图像大小时发生错误: {str(e)}")
+            log_event(logger, logging.ERROR, "image_resize_failed", error=e)
             return None
 
     @staticmethod
@@ -317,6 +843,7 @@ class ImageUtils:
         Returns:
             缩略图的 base64 数据，失败时返回 None
         """
+        start_time = time.perf_counter()
         try:
             # 转换为 PIL Image
             image = ImageUtils.base64_to_pil_image(base64_data)
@@ -327,41 +854,82 @@ class ImageUtils:
             image.thumbnail(size, Image.Resampling.LANCZOS)
             
             # 转换回 base64
-            return ImageUtils.pil_to_base64(image)
+            result = ImageUtils.pil_to_base64(image)
+            metrics.histogram("image_thumbnail_seconds", "缩略图生成耗时（秒）",
+                              stage="export").observe(time.perf_counter() - start_time)
+            return result
             
         except Exception as e:
-            print(f"创建缩略图时发生错误: {str(e)}")
+            log_event(logger, logging.ERROR, "thumbnail_failed", error=e)
             return None
 
-    def test_api_connection(self) -> bool:
+    def check_availability(self) -> None:
+        """
+        生成前检查端点熔断状态
+        
+        有未熔断的端点时直接返回；所有端点都熔断时快速失败，冷却结束后先用 test_api_connection
+        发送一次探测（读取模型列表，不产生生成费用），探测成功才继续，避免故障期间一次发出多个注定失败的请求。
+        
+        Raises:
+            CircuitOpenException: 端点熔断中或探测失败时抛出
         """
-        测试 API 连接
+        probe_url = self.router.acquire_probe()
+        if probe_url is None:
+            return
+        
+        available = self.test_api_connection(probe_url)
+        self.router.record(probe_url, success=available)
+        if not available:
+            retry_after = get_circuit_breaker(probe_url).retry_after()
+            raise CircuitOpenException(ERROR_MESSAGES["circuit_open"], retry_after=retry_after,
+                                       details={"url": probe_url})
+
+    @staticmethod
+    def models_url(api_url: str) -> str:
+        """
+        由生成端点推出同一服务的模型列表端点
+
+        Args:
+            api_url: 生成端点，如 https://api.example.com/v1/images/generations
+
+        Returns:
+            模型列表端点，如 https://api.example.com/v1/models
+        """
+        base = api_url.split("?", 1)[0]
+        if "/images/" in base:
+            base = base.rsplit("/images/", 1)[0]
+        return base.rstrip("/") + "/models"
+
+    def test_api_connection(self, api_url: Optional[str] = None) -> bool:
+        """
+        测试 API 连接：用 Key 池分配的 Key 读取模型列表，不发出生成请求
+        
+        Args:
+            api_url: 要测试的端点，默认为首选端点
         
         Returns:
-            连接成功返回 True，失败返回 False
+            服务正常响应返回 True；连接失败、限流（429）或服务端错误（5xx）时返回 False
         """
+        api_url = api_url or self.api_url
+        lease = self.key_pool.acquire(api_url)
+        status_code = retry_after = None
         try:
-            # 发送一个简单的测试请求
-            test_payload = {
-                "model": "dall-e-3",
-                "prompt": "test",
-                "n": 1,
-                "size": "1024x1024"
-            }
-            
-            response = requests.post(
-                self.api_url,
-                headers=self.headers,
-                json=test_payload,
-                timeout=30  # 测试连接也增加超时时间
+            response = self.get_session().get(
+                self.models_url(api_url),
+                headers=self._build_headers(lease.key),
+                timeout=(self.deadline_policy.connect, 30)
             )
+            status_code, retry_after = response.status_code, response.headers.get("Retry-After")
+            response.close()
             
-            # 检查是否有有效响应（即使是错误响应也说明连接正常）
-            return response.status_code in [200, 400, 401, 429]
+            # 认证失败等错误响应也说明服务可用；限流时服务尚未恢复到可以接受请求
+            return status_code < 500 and status_code != 429
             
         except Exception as e:
-            print(f"API 连接测试失败: {str(e)}")
+            log_event(logger, logging.WARNING, "connection_test_failed", url=api_url, error=e)
             return False
+        finally:
+            self.key_pool.release(lease, status_code, retry_after)
 
     @staticmethod
     def get_image_info(base64_data: str) -> dict:
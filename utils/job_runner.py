@@ -0,0 +1,434 @@
+# -*- coding: utf-8 -*-
+"""
+批量任务运行器
+从 JSONL/JSON/CSV 提示词文件读取任务，使用只追加的日志记录每个任务的状态，
+进程崩溃后重新运行会跳过已完成的任务并重试失败的任务
+"""
+
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Iterable, List, Optional
+
+from config.constants import API_CONFIG, GENERATION_CONFIG, JOB_CONFIG
+from utils.exceptions import FileOperationException, ValidationException
+from utils.logger import get_logger, log_exception
+from utils.scheduler import PRIORITY_BULK
+from utils.validators import InputValidator
+
+# 任务状态
+STATE_PENDING = "pending"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+
+def make_task_key(prompt: str, model: str, size: str) -> str:
+    """
+    根据请求内容生成稳定的任务键
+
+    Args:
+        prompt: 图像描述文本
+        model: 模型名称
+        size: 图像尺寸
+
+    Returns:
+        12 位十六进制任务键
+    """
+    digest = hashlib.sha1(f"{model}\n{size}\n{prompt}".encode("utf-8")).hexdigest()
+    return digest[:12]
+
+
+class JobTask:
+    """单张图像的生成任务"""
+
+    def __init__(self, task_id: str, prompt: str, model: str, size: str):
+        self.task_id = task_id
+        self.prompt = prompt
+        self.model = model
+        self.size = size
+
+    @property
+    def repeat(self) -> int:
+        """相同请求内容的重复序号（任务 ID 的后缀）"""
+        return int(self.task_id.rsplit("-", 1)[-1])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            "task_id": self.task_id,
+            "prompt": self.prompt,
+            "model": self.model,
+            "size": self.size
+        }
+
+    def __repr__(self) -> str:
+        return f"JobTask({self.task_id}, model={self.model}, size={self.size})"
+
+
+def expand_rows(rows: Iterable[Dict[str, Any]], default_model: Optional[str] = None,
+                default_size: Optional[str] = None, default_count: int = 1) -> List[JobTask]:
+    """
+    将任务行展开为单张图像任务
+
+    任务 ID 由请求内容和重复序号决定，与行号无关，因此在文件中插入或调整行顺序后
+    已完成的任务仍能被识别。
+
+    Args:
+        rows: 任务行，每行包含 prompt，可选 model、size、count
+        default_model: 缺省模型
+        default_size: 缺省尺寸
+        default_count: 缺省每行生成数量
+
+    Returns:
+        任务列表
+
+    Raises:
+        ValidationException: 任务行内容无效时抛出
+    """
+    default_model = default_model or GENERATION_CONFIG["default_model"]
+    default_size = default_size or GENERATION_CONFIG["default_size"]
+
+    tasks: List[JobTask] = []
+    repeats: Dict[str, int] = {}
+    for row_number, row in enumerate(rows, start=1):
+        prompt = str(row.get("prompt") or "").strip()
+        model = str(row.get("model") or default_model).strip()
+        size = str(row.get("size") or default_size).strip()
+        count = row.get("count") or default_count
+
+        try:
+            InputValidator.validate_prompt(prompt)
+            count = int(count)
+        except (ValidationException, ValueError) as e:
+            raise ValidationException(f"第 {row_number} 行无效: {e}", field="row", value=str(row_number))
+        if model not in API_CONFIG["models"]:
+            raise ValidationException(f"第 {row_number} 行模型无效: {model}", field="model", value=model)
+        if size not in API_CONFIG["sizes"]:
+            raise ValidationException(f"第 {row_number} 行尺寸无效: {size}", field="size", value=size)
+        if count < 1:
+            raise ValidationException(f"第 {row_number} 行数量无效: {count}", field="count", value=str(count))
+
+        key = make_task_key(prompt, model, size)
+        for _ in range(count):
+            repeat = repeats.get(key, 0)
+            repeats[key] = repeat + 1
+            tasks.append(JobTask(f"{key}-{repeat}", prompt, model, size))
+
+    return tasks
+
+
+def load_job_file(file_path: str, **defaults) -> List[JobTask]:
+    """
+    读取提示词任务文件
+
+    支持 .jsonl（每行一个 JSON 对象）、.json（JSON 对象数组）和 .csv（带表头，列为 prompt/model/size/count）。
+
+    Args:
+        file_path: 任务文件路径
+        **defaults: 传给 expand_rows 的缺省值
+
+    Returns:
+        任务列表
+
+    Raises:
+        FileOperationException: 文件无法读取时抛出
+        ValidationException: 文件内容无效时抛出
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    try:
+        with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
+            if ext == ".csv":
+                rows = list(csv.DictReader(f))
+            elif ext == ".json":
+                try:
+                    rows = json.load(f)
+                except json.JSONDecodeError as e:
+                    raise ValidationException(f"任务文件不是有效的 JSON: {e}", field="file", value=file_path)
+                if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                    raise ValidationException("JSON 任务文件应为对象数组", field="file", value=file_path)
+            elif ext in (".jsonl", ".ndjson"):
+                rows = []
+                for line_number, line in enumerate(f, start=1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        rows.append(json.loads(line))
+                    except json.JSONDecodeError as e:
+                        raise ValidationException(f"第 {line_number} 行不是有效的 JSON: {e}",
+                                                  field="row", value=str(line_number))
+            else:
+                raise ValidationException(f"不支持的任务文件格式: {ext}", field="file_format", value=ext)
+    except OSError as e:
+        raise FileOperationException(f"读取任务文件失败: {e}", file_path=file_path)
+
+    return expand_rows(rows, **defaults)
+
+
+class JobJournal:
+    """只追加的任务状态日志"""
+
+    def __init__(self, journal_path: str, fsync: Optional[bool] = None):
+        """
+        初始化任务日志
+
+        Args:
+            journal_path: 日志文件路径
+            fsync: 每条记录是否强制落盘，默认使用任务配置
+        """
+        self.journal_path = journal_path
+        self.fsync = JOB_CONFIG["fsync"] if fsync is None else fsync
+        self.logger = get_logger(__name__)
+        self._lock = threading.Lock()
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._file = None
+        self._needs_newline = False
+        self._replay()
+
+    def _replay(self) -> None:
+        """重放已有日志，恢复每个任务的最新状态"""
+        if not os.path.exists(self.journal_path):
+            return
+
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                # 最后一行没有换行符时，追加前需先补齐，避免与新记录粘连
+                self._needs_newline = not line.endswith("\n")
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 崩溃时可能留下写了一半的最后一行，忽略即可
+                    self.logger.warning("忽略任务日志中损坏的记录")
+                    continue
+                task_id = record.get("task_id")
+                if task_id:
+                    self._states[task_id] = record
+        self.logger.info(f"任务日志已恢复: {len(self._states)} 个任务, 文件: {self.journal_path}")
+
+    def record(self, task_id: str, state: str, **fields) -> None:
+        """
+        追加一条任务状态记录
+
+        Args:
+            task_id: 任务 ID
+            state: 任务状态
+            **fields: 附加字段（尝试次数、输出路径、错误信息等）
+        """
+        record = {"task_id": task_id, "state": state, "ts": round(time.time(), 3)}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.journal_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.journal_path, "a", encoding="utf-8")
+                if self._needs_newline:
+                    self._file.write("\n")
+                    self._needs_newline = False
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._states[task_id] = record
+
+    def get_state(self, task_id: str) -> str:
+        """获取任务的最新状态"""
+        record = self._states.get(task_id)
+        return record["state"] if record else STATE_PENDING
+
+    def get_record(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务的最新记录"""
+        return self._states.get(task_id)
+
+    def close(self) -> None:
+        """关闭日志文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class JobRunner:
+    """批量任务运行器"""
+
+    def __init__(self, tasks: List[JobTask], journal: JobJournal, output_dir: str,
+                 image_utils, scheduler, max_attempts: Optional[int] = None,
+                 retry_backoff: Optional[float] = None, progress_callback=None):
+        """
+        初始化运行器
+
+        Args:
+            tasks: 任务列表
+            journal: 任务日志
+            output_dir: 图像输出目录
+            image_utils: ImageUtils 实例
+            scheduler: GenerationScheduler 实例
+            max_attempts: 每个任务本次运行的最大尝试次数
+            retry_backoff: 重试退避基数（秒）
+            progress_callback: 任务结束时的回调，签名为 callback(task, state, done, total)
+        """
+        self.tasks = tasks
+        self.journal = journal
+        self.output_dir = output_dir
+        self.image_utils = image_utils
+        self.scheduler = scheduler
+        self.max_attempts = max(1, max_attempts or JOB_CONFIG["max_attempts"])
+        self.retry_backoff = JOB_CONFIG["retry_backoff"] if retry_backoff is None else retry_backoff
+        self.progress_callback = progress_callback
+        self.logger = get_logger(__name__)
+
+        self._lock = threading.Lock()
+        self._finished = 0
+        self._stopping = threading.Event()
+        # 每个任务当前提交到调度器的尝试，停止时取消尚未开始的重试
+        self._scheduled: Dict[str, Future] = {}
+
+    def output_path(self, task: JobTask) -> str:
+        """获取任务的输出文件路径"""
+        return os.path.join(self.output_dir, f"{task.task_id}.png")
+
+    def is_completed(self, task: JobTask) -> bool:
+        """任务已在日志中标记完成且输出文件仍然存在"""
+        return (self.journal.get_state(task.task_id) == STATE_DONE
+                and os.path.exists(self.output_path(task)))
+
+    def run(self) -> Dict[str, int]:
+        """
+        运行所有未完成的任务并等待结束
+
+        Returns:
+            统计结果，包含 total、skipped、succeeded、failed
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        pending = [task for task in self.tasks if not self.is_completed(task)]
+        skipped = len(self.tasks) - len(pending)
+        self.logger.info(f"批量任务开始: 共 {len(self.tasks)} 个任务, 跳过已完成 {skipped} 个, "
+                         f"待执行 {len(pending)} 个")
+
+        # 每个任务一个结果，成功或用完尝试次数后完成，值为是否成功
+        results = [(task, Future()) for task in pending]
+        for task, result in results:
+            record = self.journal.get_record(task.task_id) or {}
+            self._schedule(task, 1, int(record.get("attempt", 0)), len(pending), result)
+
+        succeeded = failed = 0
+        try:
+            for task, result in results:
+                if result.result():
+                    succeeded += 1
+                else:
+                    failed += 1
+        except KeyboardInterrupt:
+            self.stop()
+            raise
+
+        summary = {
+            "total": len(self.tasks),
+            "skipped": skipped,
+            "succeeded": succeeded,
+            "failed": failed
+        }
+        self.logger.info(f"批量任务结束: {summary}")
+        return summary
+
+    def _schedule(self, task: JobTask, attempt: int, previous_attempts: int, total: int, result: Future,
+                  delay: float = 0.0) -> None:
+        """
+        提交任务的一次尝试；重试在退避时间到期后才进入调度队列，等待期间不占用工作线程
+
+        Args:
+            task: 任务
+            attempt: 本次运行中的尝试序号，从 1 开始
+            previous_attempts: 之前运行中已进行的尝试次数
+            total: 本次运行的任务总数
+            result: 任务结果
+            delay: 延后时间（秒）
+        """
+        with self._lock:
+            if not self._stopping.is_set():
+                # 批量任务使用最低优先级，不影响同一调度器上的界面操作
+                future = self.scheduler.submit_later(delay, PRIORITY_BULK, self._run_attempt, task, attempt,
+                                                     previous_attempts, total, result)
+                self._scheduled[task.task_id] = future
+            else:
+                future = None
+        if future is None:
+            self._finish(task, STATE_FAILED, total, result)
+            return
+        future.add_done_callback(lambda f: self._on_attempt_done(f, task, total, result))
+
+    def _on_attempt_done(self, future: Future, task: JobTask, total: int, result: Future) -> None:
+        """尝试被取消或意外失败时结束任务"""
+        if future.cancelled():
+            self._finish(task, STATE_FAILED, total, result)
+        elif future.exception() is not None:
+            log_exception(self.logger, future.exception(), f"任务执行异常: {task.task_id}")
+            self._finish(task, STATE_FAILED, total, result)
+
+    def _run_attempt(self, task: JobTask, attempt: int, previous_attempts: int, total: int,
+                     result: Future) -> None:
+        """执行任务的一次尝试（在工作线程中运行），失败且还有尝试次数时按退避时间重新提交"""
+        if self._stopping.is_set():
+            self._finish(task, STATE_FAILED, total, result)
+            return
+
+        total_attempt = previous_attempts + attempt
+        self.journal.record(task.task_id, STATE_RUNNING, attempt=total_attempt,
+                            prompt=task.prompt, model=task.model, size=task.size)
+        start_time = time.time()
+        error = None
+        try:
+            options = {}
+            if task.repeat and getattr(self.image_utils, "response_cache", None) is not None:
+                # 相同请求内容的各次重复分别缓存
+                options["cache_slot"] = task.repeat
+            generated = self.image_utils.generate_image(task.prompt, task.size, task.model, **options)
+            if generated and self.image_utils.save_base64_image(generated, self.output_path(task)):
+                self.journal.record(task.task_id, STATE_DONE, attempt=total_attempt,
+                                    output=self.output_path(task),
+                                    duration=round(time.time() - start_time, 3))
+                self._finish(task, STATE_DONE, total, result)
+                return
+            error = "生成或保存失败"
+        except Exception as e:
+            log_exception(self.logger, e, f"任务执行异常: {task.task_id}")
+            error = f"{type(e).__name__}: {e}"
+
+        self.journal.record(task.task_id, STATE_FAILED, attempt=total_attempt, error=error)
+        if attempt < self.max_attempts:
+            delay = min(self.retry_backoff * (2 ** (attempt - 1)), JOB_CONFIG["retry_backoff_max"])
+            self._schedule(task, attempt + 1, previous_attempts, total, result, delay)
+        else:
+            self._finish(task, STATE_FAILED, total, result)
+
+    def _finish(self, task: JobTask, state: str, total: int, result: Future) -> None:
+        """记录任务结束并通知进度，重复调用时忽略"""
+        with self._lock:
+            if result.done():
+                return
+            result.set_result(state == STATE_DONE)
+            self._scheduled.pop(task.task_id, None)
+            self._finished += 1
+            finished = self._finished
+        if self.progress_callback:
+            self.progress_callback(task, state, finished, total)
+
+    def stop(self) -> None:
+        """请求停止：正在执行的任务完成当前尝试后不再重试，等待中的重试被取消"""
+        with self._lock:
+            self._stopping.set()
+            scheduled = list(self._scheduled.values())
+        # 在锁外取消，取消回调会结束对应的任务
+        for future in scheduled:
+            future.cancel()
@@ -0,0 +1,417 @@
+# -*- coding: utf-8 -*-
+"""
+本地 HTTP 任务服务
+将图像生成流程封装为本地 HTTP 接口，多个内部工具共享同一进程的连接池和并发限制
+
+接口:
+    POST /jobs                         提交任务 {"prompt", "model", "size", "count", "coalesce", "priority"}
+    GET  /jobs/<job_id>                查询任务状态
+    GET  /jobs/<job_id>/images/<index> 获取图像 (image/png)
+    GET  /jobs/<job_id>/events         任务进度事件 (text/event-stream)
+    GET  /health                       服务状态
+    GET  /metrics                      进程内指标 (Prometheus 文本格式)
+    GET  /trace                        最近的追踪区间 (Chrome trace-event JSON)
+"""
+
+import base64
+import binascii
+import json
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from config.constants import GENERATION_CONFIG, SERVICE_CONFIG
+from utils.exceptions import ValidationException
+from utils.logger import get_logger, log_exception
+from utils.metrics import metrics
+from utils.tracing import tracer
+from utils.scheduler import PRIORITIES, PRIORITY_NORMAL
+from utils.validators import validate_generation_request
+
+# 图像槽位状态
+SLOT_PENDING = "pending"
+SLOT_DONE = "done"
+SLOT_FAILED = "failed"
+
+
+class ServiceJob:
+    """服务中的一个生成任务（可包含多张图像）"""
+
+    def __init__(self, prompt: str, model: str, size: str, count: int):
+        self.job_id = uuid.uuid4().hex
+        self.prompt = prompt
+        self.model = model
+        self.size = size
+        self.count = count
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.slot_states: List[str] = [SLOT_PENDING] * count
+        self.images: List[Optional[bytes]] = [None] * count
+        self.version = 0
+
+    @property
+    def completed(self) -> int:
+        """已结束（成功或失败）的图像数"""
+        return sum(1 for state in self.slot_states if state != SLOT_PENDING)
+
+    @property
+    def state(self) -> str:
+        """任务整体状态：running、done、partial 或 failed"""
+        if self.completed < self.count:
+            return "running"
+        succeeded = self.slot_states.count(SLOT_DONE)
+        if succeeded == self.count:
+            return "done"
+        return "partial" if succeeded else "failed"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为接口返回的字典"""
+        return {
+            "job_id": self.job_id,
+            "state": self.state,
+            "prompt": self.prompt,
+            "model": self.model,
+            "size": self.size,
+            "count": self.count,
+            "completed": self.completed,
+            "created_at": round(self.created_at, 3),
+            "finished_at": round(self.finished_at, 3) if self.finished_at else None,
+            "images": [
+                {
+                    "index": index,
+                    "state": state,
+                    "url": f"/jobs/{self.job_id}/images/{index}" if state == SLOT_DONE else None
+                }
+                for index, state in enumerate(self.slot_states)
+            ]
+        }
+
+
+class JobService:
+    """任务服务：管理任务并通过共享的调度器执行生成"""
+
+    def __init__(self, image_utils, scheduler, max_jobs: Optional[int] = None):
+        """
+        初始化任务服务
+
+        Args:
+            image_utils: 共享的 ImageUtils 实例
+            scheduler: 共享的 GenerationScheduler 实例
+            max_jobs: 内存中保留的最大任务数
+        """
+        self.image_utils = image_utils
+        self.scheduler = scheduler
+        self.max_jobs = max_jobs or SERVICE_CONFIG["max_jobs"]
+        self.logger = get_logger(__name__)
+
+        self._jobs: "OrderedDict[str, ServiceJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def submit(self, prompt: str, model: Optional[str] = None, size: Optional[str] = None,
+               count: int = 1, coalesce: bool = False, priority: str = PRIORITY_NORMAL) -> ServiceJob:
+        """
+        提交生成任务
+
+        Args:
+            prompt: 图像描述文本
+            model: 模型名称
+            size: 图像尺寸
+            count: 图像数量
+            coalesce: 是否与其他客户端进行中的相同请求合并（同一任务内的多张图像不会互相合并）
+            priority: 任务优先级，interactive、normal 或 bulk
+
+        Returns:
+            新创建的任务
+
+        Raises:
+            ValidationException: 参数无效时抛出
+        """
+        model = model or GENERATION_CONFIG["default_model"]
+        size = size or GENERATION_CONFIG["default_size"]
+        if not isinstance(prompt, str):
+            raise ValidationException("prompt 必须是字符串", field="prompt", value=str(prompt))
+        if not isinstance(count, int) or isinstance(count, bool):
+            raise ValidationException("count 必须是整数", field="count", value=str(count))
+        if not isinstance(coalesce, bool):
+            raise ValidationException("coalesce 必须是布尔值", field="coalesce", value=str(coalesce))
+        if priority not in PRIORITIES:
+            raise ValidationException(f"priority 必须是 {', '.join(PRIORITIES)} 之一",
+                                      field="priority", value=str(priority))
+        validate_generation_request(count, size, model, prompt or "")
+
+        job = ServiceJob(prompt.strip(), model, size, count)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._evict()
+
+        for index in range(count):
+            self.scheduler.submit_generation(
+                self.image_utils, job.prompt, size, model,
+                callback=lambda i, result, job=job: self._on_image(job, i, result),
+                index=index,
+                coalesce=coalesce and index == 0,
+                priority=priority
+            )
+        self.logger.info(f"服务任务已提交: {job.job_id}, 数量: {count}, 模型: {model}, 尺寸: {size}")
+        return job
+
+    def _on_image(self, job: ServiceJob, index: int, result: Optional[str]) -> None:
+        """单张图像完成回调（在工作线程中运行）"""
+        image_bytes = None
+        if result:
+            try:
+                image_bytes = base64.b64decode(result)
+            except (binascii.Error, ValueError) as e:
+                self.logger.error(f"服务任务 {job.job_id} 第 {index + 1} 张图像解码失败: {e}")
+
+        with self._changed:
+            job.images[index] = image_bytes
+            job.slot_states[index] = SLOT_DONE if image_bytes else SLOT_FAILED
+            if job.completed == job.count:
+                job.finished_at = time.time()
+            job.version += 1
+            self._changed.notify_all()
+
+    def _evict(self) -> None:
+        """超过保留上限时淘汰最早结束的任务（需持有锁）"""
+        while len(self._jobs) > self.max_jobs:
+            finished = next((job_id for job_id, job in self._jobs.items()
+                             if job.finished_at is not None), None)
+            if finished is None:
+                break
+            del self._jobs[finished]
+
+    def get(self, job_id: str) -> Optional[ServiceJob]:
+        """获取任务"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def snapshot(self, job: ServiceJob) -> Dict[str, Any]:
+        """在锁内获取任务状态快照"""
+        with self._lock:
+            return job.to_dict()
+
+    def wait_for_change(self, job: ServiceJob, version: int, timeout: float) -> int:
+        """
+        等待任务状态变化
+
+        Args:
+            job: 任务
+            version: 调用方已知的版本号
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            当前版本号
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: job.version != version, timeout=timeout)
+            return job.version
+
+    def stats(self) -> Dict[str, Any]:
+        """服务状态统计"""
+        key_pool = getattr(self.image_utils, "key_pool", None)
+        router = getattr(self.image_utils, "router", None)
+        hedge_policy = getattr(self.image_utils, "hedge_policy", None)
+        single_flight = getattr(self.image_utils, "_single_flight", None)
+        response_cache = getattr(self.image_utils, "response_cache", None)
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.finished_at is None)
+            return {
+                "jobs": len(self._jobs),
+                "running_jobs": running,
+                "active_requests": self.scheduler.active_count,
+                "queued_requests": self.scheduler.pending_count,
+                "max_concurrency": self.scheduler.max_workers,
+                "queues": self.scheduler.queue_stats(),
+                "api_keys": key_pool.stats() if key_pool else [],
+                "endpoints": router.stats() if router else [],
+                "hedging": hedge_policy.stats() if hedge_policy else None,
+                "coalescing": single_flight.stats() if single_flight else None,
+                "response_cache": response_cache.stats() if response_cache else None
+            }
+
+
+class JobServiceHandler(BaseHTTPRequestHandler):
+    """任务服务的 HTTP 请求处理器"""
+
+    server_version = "ImageGeneratorService/1.0"
+    protocol_version = "HTTP/1.1"
+
+    _JOB_PATH = re.compile(r"^/jobs/([0-9a-f]{32})$")
+    _IMAGE_PATH = re.compile(r"^/jobs/([0-9a-f]{32})/images/(\d+)$")
+    _EVENTS_PATH = re.compile(r"^/jobs/([0-9a-f]{32})/events$")
+
+    @property
+    def service(self) -> JobService:
+        return self.server.service
+
+    def log_message(self, format: str, *args) -> None:
+        """将访问日志写入应用日志而不是标准错误"""
+        get_logger(__name__).debug(f"{self.address_string()} - {format % args}")
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        if path == "/health":
+            self._send_json(200, {"status": "ok", **self.service.stats()})
+            return
+        if path == "/metrics":
+            self._send_metrics()
+            return
+        if path == "/trace":
+            self._send_json(200, tracer.to_chrome_trace())
+            return
+
+        match = self._JOB_PATH.match(path)
+        if match:
+            job = self._get_job(match.group(1))
+            if job:
+                self._send_json(200, self.service.snapshot(job))
+            return
+
+        match = self._IMAGE_PATH.match(path)
+        if match:
+            job = self._get_job(match.group(1))
+            if job:
+                self._send_image(job, int(match.group(2)))
+            return
+
+        match = self._EVENTS_PATH.match(path)
+        if match:
+            job = self._get_job(match.group(1))
+            if job:
+                self._stream_events(job)
+            return
+
+        self._send_json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        if self.path.split("?", 1)[0] != "/jobs":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0 or length > SERVICE_CONFIG["max_body_size"]:
+            self._send_json(413 if length > 0 else 400, {"error": "invalid request body size"})
+            return
+
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("request body must be a JSON object")
+            job = self.service.submit(
+                body.get("prompt", ""),
+                model=body.get("model"),
+                size=body.get("size"),
+                count=body.get("count", 1),
+                coalesce=body.get("coalesce", False),
+                priority=body.get("priority", PRIORITY_NORMAL)
+            )
+        except (ValueError, ValidationException) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            log_exception(get_logger(__name__), e, "服务任务提交失败")
+            self._send_json(500, {"error": str(e)})
+            return
+
+        self._send_json(202, self.service.snapshot(job))
+
+    def _get_job(self, job_id: str) -> Optional[ServiceJob]:
+        """查找任务，不存在时返回 404"""
+        job = self.service.get(job_id)
+        if job is None:
+            self._send_json(404, {"error": "job not found"})
+        return job
+
+    def _send_json(self, status: int, data: Dict[str, Any]) -> None:
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_metrics(self) -> None:
+        """以 Prometheus 文本格式返回进程内指标"""
+        body = metrics.to_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_image(self, job: ServiceJob, index: int) -> None:
+        if index >= job.count:
+            self._send_json(404, {"error": "image index out of range"})
+            return
+        image_bytes = job.images[index]
+        if image_bytes is None:
+            self._send_json(409, {"error": "image not ready", "state": job.slot_states[index]})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(image_bytes)))
+        self.end_headers()
+        self.wfile.write(image_bytes)
+
+    def _stream_events(self, job: ServiceJob) -> None:
+        """以 server-sent events 推送任务进度，任务结束后关闭连接"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        version = -1
+        try:
+            while True:
+                current = self.service.wait_for_change(job, version, SERVICE_CONFIG["event_keepalive"])
+                if current == version:
+                    # 心跳，防止中间代理断开空闲连接
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+                    continue
+
+                version = current
+                snapshot = self.service.snapshot(job)
+                finished = snapshot["state"] != "running"
+                event = "complete" if finished else "progress"
+                payload = json.dumps(snapshot, ensure_ascii=False)
+                self.wfile.write(f"event: {event}\ndata: {payload}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                if finished:
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def create_server(service: JobService, host: Optional[str] = None,
+                  port: Optional[int] = None) -> ThreadingHTTPServer:
+    """
+    创建任务服务的 HTTP 服务器
+
+    Args:
+        service: 任务服务
+        host: 监听地址，默认仅本机
+        port: 监听端口，0 表示自动分配
+
+    Returns:
+        HTTP 服务器实例（调用 serve_forever 开始服务）
+    """
+    server = ThreadingHTTPServer(
+        (host or SERVICE_CONFIG["host"], SERVICE_CONFIG["port"] if port is None else port),
+        JobServiceHandler
+    )
+    server.daemon_threads = True
+    server.service = service
+    return server
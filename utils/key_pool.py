@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+API Key 池
+在多个 API Key 之间分配请求（最少负载或加权轮询），跟踪每个 Key 的 429/401 情况，
+暂时停用不健康的 Key，并记录每个 Key 的使用统计。相同 Key 列表的 Key 池在进程内共享
+"""
+
+import json
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from config.constants import KEY_POOL_CONFIG
+from utils.exceptions import ValidationException
+from utils.logger import get_logger
+
+# 分配策略
+STRATEGY_LEAST_LOADED = "least_loaded"
+STRATEGY_WEIGHTED_ROUND_ROBIN = "weighted_round_robin"
+
+
+def mask_key(api_key: str) -> str:
+    """隐藏 API Key 的敏感部分"""
+    return api_key[:8] + "..." + api_key[-4:] if len(api_key) > 12 else "***"
+
+
+class KeyState:
+    """单个 API Key 的状态和使用统计"""
+
+    def __init__(self, key: str, weight: int = 1, endpoint: Optional[str] = None):
+        self.key = key
+        self.weight = max(1, int(weight))
+        self.endpoint = endpoint
+        self.in_flight = 0
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.unauthorized = 0
+        self.consecutive_rate_limits = 0
+        self.benched_until = 0.0
+        self.current_weight = 0  # 平滑加权轮询使用
+
+    def is_benched(self, now: float) -> bool:
+        """当前是否处于停用期"""
+        return self.benched_until > now
+
+    def to_dict(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """转换为统计字典（Key 已隐藏）"""
+        now = now or time.time()
+        return {
+            "key": mask_key(self.key),
+            "endpoint": self.endpoint,
+            "weight": self.weight,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "successes": self.successes,
+            "failures": self.failures,
+            "rate_limited": self.rate_limited,
+            "unauthorized": self.unauthorized,
+            "benched_for": round(max(0.0, self.benched_until - now), 1)
+        }
+
+
+class KeyLease:
+    """一次请求借用的 API Key"""
+
+    def __init__(self, state: KeyState):
+        self.state = state
+        self.key = state.key
+        self.released = False
+
+
+class APIKeyPool:
+    """API Key 池"""
+
+    def __init__(self, keys: Iterable[Union[str, Dict[str, Any]]], strategy: Optional[str] = None):
+        """
+        初始化 Key 池
+
+        Args:
+            keys: Key 列表，元素为字符串或 {"key", "weight", "endpoint"} 字典
+            strategy: 分配策略，least_loaded 或 weighted_round_robin
+
+        Raises:
+            ValidationException: 没有可用的 Key 或策略无效时抛出
+        """
+        self.strategy = strategy or KEY_POOL_CONFIG["strategy"]
+        if self.strategy not in (STRATEGY_LEAST_LOADED, STRATEGY_WEIGHTED_ROUND_ROBIN):
+            raise ValidationException(f"无效的 Key 分配策略: {self.strategy}",
+                                      field="strategy", value=self.strategy)
+
+        self.logger = get_logger(__name__)
+        self._lock = threading.Lock()
+        self._states: List[KeyState] = []
+        seen = set()
+        for item in keys:
+            if isinstance(item, dict):
+                key = str(item.get("key") or "").strip()
+                state = KeyState(key, item.get("weight", 1), item.get("endpoint") or None)
+            else:
+                key = str(item or "").strip()
+                state = KeyState(key)
+            if key and (key, state.endpoint) not in seen:
+                seen.add((key, state.endpoint))
+                self._states.append(state)
+
+        if not self._states:
+            raise ValidationException("API Key 池为空", field="api_keys", value="")
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    @property
+    def primary_key(self) -> str:
+        """第一个 Key（用于连接测试等单次请求）"""
+        return self._states[0].key
+
+    def acquire(self, endpoint: Optional[str] = None) -> KeyLease:
+        """
+        为一次请求分配 API Key
+
+        只在有健康 Key 时跳过被停用的 Key；全部停用时选择最早恢复的 Key，
+        保证请求不会因为 Key 池而无法发出。
+
+        Args:
+            endpoint: 请求的端点，绑定了其他端点的 Key 不参与分配
+
+        Returns:
+            Key 租约，请求结束后必须调用 release
+        """
+        now = time.time()
+        with self._lock:
+            candidates = [s for s in self._states if s.endpoint in (None, endpoint)]
+            if not candidates:
+                candidates = [s for s in self._states if s.endpoint is None] or self._states
+
+            healthy = [s for s in candidates if not s.is_benched(now)]
+            if healthy:
+                state = self._choose(healthy)
+            else:
+                state = min(candidates, key=lambda s: s.benched_until)
+                self.logger.warning(f"所有 API Key 均被暂停，使用最早恢复的 Key: {mask_key(state.key)}")
+
+            state.in_flight += 1
+            state.requests += 1
+            return KeyLease(state)
+
+    def _choose(self, healthy: List[KeyState]) -> KeyState:
+        """按策略从健康的 Key 中选择一个（需持有锁）"""
+        if self.strategy == STRATEGY_WEIGHTED_ROUND_ROBIN:
+            # 平滑加权轮询：权重高的 Key 被选中更多次，且分布均匀
+            total = sum(s.weight for s in healthy)
+            for s in healthy:
+                s.current_weight += s.weight
+            chosen = max(healthy, key=lambda s: s.current_weight)
+            chosen.current_weight -= total
+            return chosen
+
+        # 最少负载：按权重归一化的在途请求数最少，其次累计请求数最少
+        return min(healthy, key=lambda s: (s.in_flight / s.weight, s.requests / s.weight))
+
+    def release(self, lease: KeyLease, status_code: Optional[int] = None,
+                retry_after: Optional[str] = None) -> None:
+        """
+        归还 Key 并根据请求结果更新健康状态
+
+        Args:
+            lease: acquire 返回的租约
+            status_code: HTTP 状态码，网络错误时为 None
+            retry_after: 响应的 Retry-After 头（秒）
+        """
+        if lease.released:
+            return
+        lease.released = True
+
+        state = lease.state
+        now = time.time()
+        with self._lock:
+            state.in_flight = max(0, state.in_flight - 1)
+
+            if status_code == 200:
+                state.successes += 1
+                state.consecutive_rate_limits = 0
+                return
+
+            state.failures += 1
+            if status_code == 429:
+                state.rate_limited += 1
+                state.consecutive_rate_limits += 1
+                cooldown = self._parse_retry_after(retry_after)
+                if cooldown is None:
+                    cooldown = min(
+                        KEY_POOL_CONFIG["rate_limit_cooldown"] * (2 ** (state.consecutive_rate_limits - 1)),
+                        KEY_POOL_CONFIG["rate_limit_cooldown_max"]
+                    )
+                state.benched_until = max(state.benched_until, now + cooldown)
+                self.logger.warning(f"API Key {mask_key(state.key)} 触发频率限制，暂停 {cooldown:.0f} 秒")
+            elif status_code in (401, 403):
+                state.unauthorized += 1
+                state.benched_until = max(state.benched_until, now + KEY_POOL_CONFIG["auth_cooldown"])
+                self.logger.warning(f"API Key {mask_key(state.key)} 认证失败，暂停 "
+                                    f"{KEY_POOL_CONFIG['auth_cooldown']} 秒")
+
+    def abandon(self, lease: KeyLease) -> None:
+        """
+        归还 Key 但不更新健康状态（请求被取消、结果未知时使用）
+
+        Args:
+            lease: acquire 返回的租约
+        """
+        if lease.released:
+            return
+        lease.released = True
+        with self._lock:
+            lease.state.in_flight = max(0, lease.state.in_flight - 1)
+
+    @staticmethod
+    def _parse_retry_after(retry_after: Optional[str]) -> Optional[float]:
+        """解析以秒为单位的 Retry-After 头"""
+        if not retry_after:
+            return None
+        try:
+            return max(0.0, min(float(retry_after), KEY_POOL_CONFIG["rate_limit_cooldown_max"]))
+        except (TypeError, ValueError):
+            return None
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        获取每个 Key 的使用统计
+
+        Returns:
+            统计字典列表（Key 已隐藏）
+        """
+        now = time.time()
+        with self._lock:
+            return [state.to_dict(now) for state in self._states]
+
+
+# 进程内按 Key 列表共享的 Key 池，停用状态和负载统计跨批次保留
+_pools: Dict[str, APIKeyPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_key_pool(keys: Iterable[Union[str, Dict[str, Any]]]) -> APIKeyPool:
+    """
+    获取 Key 列表对应的共享 Key 池
+
+    Args:
+        keys: Key 列表，元素为 Key 字符串或 {"key", "weight", "endpoint"} 字典
+
+    Returns:
+        Key 池
+
+    Raises:
+        ValidationException: Key 列表为空时抛出
+    """
+    keys = list(keys)
+    signature = json.dumps(keys, sort_keys=True)
+    with _pools_lock:
+        pool = _pools.get(signature)
+        if pool is None:
+            pool = _pools[signature] = APIKeyPool(keys)
+        return pool
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+延迟统计
+按模型和尺寸保存最近的请求延迟，用于计算分位数
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from config.constants import LATENCY_CONFIG
+
+
+def latency_key(model: str, size: str) -> str:
+    """
+    生成延迟统计的分组键
+
+    Args:
+        model: 模型名称
+        size: 图像尺寸
+
+    Returns:
+        分组键
+    """
+    return f"{model}|{size}"
+
+
+def nearest_rank(count: int, percent: float) -> int:
+    """
+    计算最近邻法分位数在升序样本中的下标（第 ceil(p/100*n) 个样本）
+
+    Args:
+        count: 样本数，大于 0
+        percent: 分位数，0-100
+
+    Returns:
+        下标，范围 0 到 count - 1
+    """
+    return min(count - 1, max(0, math.ceil(percent * count / 100.0) - 1))
+
+
+class LatencyStats:
+    """滚动窗口延迟统计"""
+
+    def __init__(self, window_size: Optional[int] = None):
+        """
+        初始化延迟统计
+
+        Args:
+            window_size: 每个分组保留的样本数
+        """
+        self.window_size = window_size or LATENCY_CONFIG["window_size"]
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, key: str, seconds: float) -> None:
+        """
+        记录一次延迟
+
+        Args:
+            key: 分组键
+            seconds: 延迟（秒）
+        """
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window_size)
+            samples.append(seconds)
+
+    def count(self, key: str) -> int:
+        """获取分组的样本数"""
+        with self._lock:
+            return len(self._samples.get(key, ()))
+
+    def percentile(self, key: str, percent: float) -> Optional[float]:
+        """
+        计算分组延迟的分位数（最近邻法）
+
+        Args:
+            key: 分组键
+            percent: 分位数，0-100
+
+        Returns:
+            延迟（秒），没有样本时返回 None
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples:
+            return None
+        return samples[nearest_rank(len(samples), percent)]
+
+    def snapshot(self) -> Dict[str, List[float]]:
+        """
+        导出所有分组的样本（用于持久化）
+
+        Returns:
+            分组键 -> 样本列表（按记录顺序）
+        """
+        with self._lock:
+            return {key: list(samples) for key, samples in self._samples.items()}
+
+    def restore(self, data: Dict[str, List[float]]) -> None:
+        """
+        导入样本，已有样本之前插入，窗口满时保留最新的样本
+
+        Args:
+            data: 分组键 -> 样本列表
+        """
+        with self._lock:
+            for key, values in data.items():
+                current = self._samples.get(key, ())
+                merged = [float(value) for value in values] + list(current)
+                self._samples[key] = deque(merged, maxlen=self.window_size)
+
+
+# 全局延迟统计实例
+latency_stats = LatencyStats()
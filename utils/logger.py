@@ -4,21 +4,116 @@
 提供应用程序的统一日志记录功能
 """
 
+import atexit
 import os
 import logging
 import logging.handlers
+import queue
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Iterator, Optional
 
 from config.constants import LOG_CONFIG, PATHS
 
+# 队列满时的处理策略
+OVERFLOW_DROP_OLDEST = "drop_oldest"  # 丢弃队列中最旧的低级别记录
+OVERFLOW_DROP_NEW = "drop_new"  # 丢弃新记录
+OVERFLOW_BLOCK = "block"  # 等待队列空位（最多 block_timeout 秒）
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEW, OVERFLOW_BLOCK)
+
+# 当前请求 ID，log_event 自动附加；在线程间传递需要复制上下文（contextvars.copy_context）
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    有界队列日志处理器
+
+    调用方线程只格式化消息并放入队列，不做文件 I/O；队列满时按策略丢弃或等待，
+    不低于 block_level 的记录总是等待，也不会被 drop_oldest 挤出队列，避免丢失错误日志
+    """
+    
+    def __init__(self, maxsize: int, policy: str = OVERFLOW_DROP_OLDEST,
+                 block_level: int = logging.ERROR, block_timeout: float = 1.0):
+        """
+        初始化处理器
+        
+        Args:
+            maxsize: 队列容量
+            policy: 队列满时的处理策略
+            block_level: 不低于该级别的记录在队列满时等待
+            block_timeout: 等待队列空位的最长时间（秒）
+            
+        Raises:
+            ValueError: 策略无效时抛出
+        """
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"无效的日志队列策略: {policy}，可选: {', '.join(OVERFLOW_POLICIES)}")
+        super().__init__(queue.Queue(maxsize))
+        self.policy = policy
+        self.block_level = block_level
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+    
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """按策略放入队列"""
+        if self.policy == OVERFLOW_BLOCK or record.levelno >= self.block_level:
+            try:
+                self.queue.put(record, timeout=self.block_timeout)
+                return
+            except queue.Full:
+                self._count_dropped()
+                return
+        
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        
+        if self.policy == OVERFLOW_DROP_OLDEST:
+            self._replace_oldest(record)
+        self._count_dropped()
+    
+    def _replace_oldest(self, record: logging.LogRecord) -> None:
+        """
+        用新记录替换队列中最旧的低级别记录
+        
+        队列中只剩不低于 block_level 的记录（或结束标记）时不替换，丢弃的是新记录。
+        """
+        with self.queue.mutex:
+            pending = self.queue.queue
+            for position, queued in enumerate(pending):
+                if isinstance(queued, logging.LogRecord) and queued.levelno < self.block_level:
+                    # 删除一条、追加一条，队列长度和未完成任务数都不变
+                    del pending[position]
+                    pending.append(record)
+                    return
+    
+    def _count_dropped(self) -> None:
+        with self._dropped_lock:
+            self.dropped += 1
+
+
+class _BoundedQueueListener(logging.handlers.QueueListener):
+    """停止时等待队列空位放入结束标记（默认实现在队列满时会抛出 queue.Full）"""
+    
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
 
 class LogManager:
     """日志管理器类"""
     
     _instance: Optional['LogManager'] = None
     _initialized: bool = False
+    _queue_handler: Optional[BoundedQueueHandler] = None
+    _listener: Optional[logging.handlers.QueueListener] = None
     
     def __new__(cls) -> 'LogManager':
         """单例模式"""
@@ -68,9 +163,24 @@ class LogManager:
             file_handler.setFormatter(formatter)
             console_handler.setFormatter(formatter)
             
-            # 添加处理器到根日志记录器
-            root_logger.addHandler(file_handler)
-            root_logger.addHandler(console_handler)
+            if LOG_CONFIG["async"]:
+                # 文件和控制台写入交给后台线程，界面线程和生成线程只做入队
+                self._queue_handler = BoundedQueueHandler(
+                    LOG_CONFIG["queue_size"],
+                    policy=LOG_CONFIG["overflow_policy"],
+                    block_level=getattr(logging, LOG_CONFIG["block_level"]),
+                    block_timeout=LOG_CONFIG["block_timeout"]
+                )
+                self._listener = _BoundedQueueListener(
+                    self._queue_handler.queue, file_handler, console_handler, respect_handler_level=True
+                )
+                self._listener.start()
+                root_logger.addHandler(self._queue_handler)
+                atexit.register(self.shutdown)
+            else:
+                # 添加处理器到根日志记录器
+                root_logger.addHandler(file_handler)
+                root_logger.addHandler(console_handler)
             
             # 记录初始化成功
             logging.info("日志系统初始化成功")
@@ -78,6 +188,43 @@ class LogManager:
         except Exception as e:
             print(f"日志系统初始化失败: {e}")
     
+    def flush(self) -> None:
+        """等待队列中的日志全部写出"""
+        if self._listener is not None:
+            self._queue_handler.queue.join()
+    
+    def shutdown(self) -> None:
+        """停止后台写日志线程，写出队列中剩余的日志（程序退出时自动调用）"""
+        listener, self._listener = self._listener, None
+        if listener is None:
+            return
+        logging.getLogger().removeHandler(self._queue_handler)
+        listener.stop()
+        if self._queue_handler.dropped:
+            # 监听线程已停止，直接交给原处理器记录丢弃数量
+            record = logging.LogRecord(
+                __name__, logging.WARNING, __file__, 0,
+                f"日志队列已满，共丢弃 {self._queue_handler.dropped} 条日志", None, None
+            )
+            for handler in listener.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取异步日志队列状态
+        
+        Returns:
+            {"async", "queued", "dropped", "policy"}
+        """
+        handler = self._queue_handler
+        return {
+            "async": self._listener is not None,
+            "queued": handler.queue.qsize() if handler else 0,
+            "dropped": handler.dropped if handler else 0,
+            "policy": handler.policy if handler else None
+        }
+    
     @staticmethod
     def get_logger(name: str) -> logging.Logger:
         """
@@ -124,6 +271,29 @@ class LogManager:
         else:
             logger.info(f"API请求: {method} {url}")
     
+    @staticmethod
+    def log_event(logger: logging.Logger, level: int, event: str, **fields: Any) -> None:
+        """
+        记录结构化事件，格式为 "事件名 key=value ..."
+        
+        级别未启用时直接返回，不格式化任何字段；设置了请求 ID 时自动附加 request_id 字段
+        
+        Args:
+            logger: 日志记录器
+            level: 日志级别，如 logging.INFO
+            event: 事件名称
+            **fields: 事件字段，浮点数保留三位小数
+        """
+        if not logger.isEnabledFor(level):
+            return
+        request_id = _request_id.get()
+        if request_id is not None and "request_id" not in fields:
+            fields = {"request_id": request_id, **fields}
+        parts = [event]
+        for name, value in fields.items():
+            parts.append(f"{name}={value:.3f}" if isinstance(value, float) else f"{name}={value}")
+        logger.log(level, " ".join(parts), extra={"event": event, "fields": fields})
+    
     @staticmethod
     def log_user_action(logger: logging.Logger, action: str, details: str = "") -> None:
         """
@@ -174,6 +344,36 @@ def log_api_request(logger: logging.Logger, url: str, method: str = "POST",
     """记录API请求的便捷函数"""
     LogManager.log_api_request(logger, url, method, status_code, response_time)
 
+def log_event(logger: logging.Logger, level: int, event: str, **fields: Any) -> None:
+    """记录结构化事件的便捷函数"""
+    LogManager.log_event(logger, level, event, **fields)
+
+def new_request_id() -> str:
+    """生成请求 ID"""
+    return uuid.uuid4().hex[:12]
+
+def get_request_id() -> Optional[str]:
+    """获取当前上下文中的请求 ID"""
+    return _request_id.get()
+
+@contextmanager
+def request_context(request_id: Optional[str] = None) -> Iterator[str]:
+    """
+    在上下文中设置请求 ID，期间 log_event 记录的事件都带有该 ID
+    
+    Args:
+        request_id: 请求 ID，默认生成新的 ID
+        
+    Yields:
+        请求 ID
+    """
+    request_id = request_id or new_request_id()
+    token = _request_id.set(request_id)
+    try:
+        yield request_id
+    finally:
+        _request_id.reset(token)
+
 def log_user_action(logger: logging.Logger, action: str, details: str = "") -> None:
     """记录用户操作的便捷函数"""
     LogManager.log_user_action(logger, action, details)
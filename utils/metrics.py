@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+"""
+指标统计
+进程内的计数器、仪表和延迟直方图，可导出为 JSON 快照和 Prometheus 文本格式
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config.constants import METRICS_CONFIG
+from utils.latency_stats import nearest_rank
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 指标类型
+TYPE_COUNTER = "counter"
+TYPE_GAUGE = "gauge"
+TYPE_HISTOGRAM = "histogram"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    """标签字典转为可哈希的键（按名称排序）"""
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class Counter:
+    """只增不减的计数器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        """
+        增加计数
+
+        Args:
+            amount: 增加量，不能为负数
+
+        Raises:
+            ValueError: 增加量为负数时抛出
+        """
+        if amount < 0:
+            raise ValueError("计数器只能增加")
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        with self._lock:
+            return self._value
+
+
+class Gauge:
+    """可增可减的仪表（当前值）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0.0
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self) -> float:
+        with self._lock:
+            return self._value
+
+
+class Histogram:
+    """
+    HDR 风格的延迟直方图
+
+    按 2 的幂分段，每段再等分为若干子桶，任意大小的值相对误差都不超过 10^-significant_digits；
+    只保存非空桶，内存与实际出现的取值范围有关而不是与样本数有关
+    """
+
+    def __init__(self, lowest: Optional[float] = None, significant_digits: Optional[int] = None):
+        """
+        初始化直方图
+
+        Args:
+            lowest: 可区分的最小值，不大于该值的样本计入同一个桶
+            significant_digits: 有效数字位数，决定相对误差
+        """
+        self.lowest = lowest or METRICS_CONFIG["histogram_lowest"]
+        digits = significant_digits or METRICS_CONFIG["histogram_significant_digits"]
+        # 子桶中点代表整个桶，相对误差不超过 1 / (2 × 子桶数)
+        self.sub_buckets = 2 ** math.ceil(math.log2(10 ** digits / 2))
+        self._lock = threading.Lock()
+        self._counts: Dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _index(self, value: float) -> int:
+        if value <= self.lowest:
+            return 0
+        exponent = math.floor(math.log2(value / self.lowest))
+        mantissa = value / self.lowest / 2 ** exponent  # [1, 2)
+        sub = min(self.sub_buckets - 1, int((mantissa - 1) * self.sub_buckets))
+        return 1 + exponent * self.sub_buckets + sub
+
+    def _value(self, index: int) -> float:
+        if index == 0:
+            return self.lowest
+        exponent, sub = divmod(index - 1, self.sub_buckets)
+        return self.lowest * 2 ** exponent * (1 + (sub + 0.5) / self.sub_buckets)
+
+    def observe(self, value: float) -> None:
+        """
+        记录一个样本
+
+        Args:
+            value: 样本值（通常为秒）
+        """
+        index = self._index(value)
+        with self._lock:
+            self._counts[index] = self._counts.get(index, 0) + 1
+            self.count += 1
+            self.sum += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """记录代码块的耗时（秒），代码块抛出异常时也记录"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        计算分位数
+
+        Args:
+            percent: 分位数，0-100
+
+        Returns:
+            分位数（不超出实际的最小/最大值），没有样本时返回 None
+        """
+        with self._lock:
+            if not self.count:
+                return None
+            rank = nearest_rank(self.count, percent) + 1
+            # 最小和最大值是精确记录的
+            if rank == 1:
+                return self.min
+            if rank >= self.count:
+                return self.max
+            seen = 0
+            for index in sorted(self._counts):
+                seen += self._counts[index]
+                if seen >= rank:
+                    return min(self.max, max(self.min, self._value(index)))
+            return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出统计摘要
+
+        Returns:
+            {"count", "sum", "min", "max", "p50", ...}，分位数由 METRICS_CONFIG["quantiles"] 决定
+        """
+        data = {"count": self.count, "sum": round(self.sum, 6), "min": self.min, "max": self.max}
+        for quantile in METRICS_CONFIG["quantiles"]:
+            value = self.percentile(quantile * 100)
+            data[f"p{quantile * 100:g}"] = round(value, 6) if value is not None else None
+        return data
+
+
+_METRIC_CLASSES = {TYPE_COUNTER: Counter, TYPE_GAUGE: Gauge, TYPE_HISTOGRAM: Histogram}
+
+
+class MetricsRegistry:
+    """指标注册表：按名称和标签获取或创建指标"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._types: Dict[str, str] = {}
+        self._help: Dict[str, str] = {}
+        self._metrics: Dict[Tuple[str, LabelKey], Any] = {}
+
+    def _get(self, metric_type: str, name: str, help_text: str, labels: Dict[str, Any]):
+        key = (name, _label_key(labels))
+        with self._lock:
+            registered = self._types.get(name)
+            if registered is None:
+                self._types[name] = metric_type
+                self._help[name] = help_text
+            elif registered != metric_type:
+                raise ValueError(f"指标 {name} 已注册为 {registered}，不能作为 {metric_type} 使用")
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = _METRIC_CLASSES[metric_type]()
+            return metric
+
+    def counter(self, name: str, help_text: str = "", **labels: Any) -> Counter:
+        """获取或创建计数器"""
+        return self._get(TYPE_COUNTER, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str = "", **labels: Any) -> Gauge:
+        """获取或创建仪表"""
+        return self._get(TYPE_GAUGE, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str = "", **labels: Any) -> Histogram:
+        """获取或创建直方图"""
+        return self._get(TYPE_HISTOGRAM, name, help_text, labels)
+
+    def clear(self) -> None:
+        """清除所有指标"""
+        with self._lock:
+            self._types.clear()
+            self._help.clear()
+            self._metrics.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._metrics)
+
+    def _items(self) -> List[Tuple[str, LabelKey, Any]]:
+        with self._lock:
+            return sorted(((name, labels, metric) for (name, labels), metric in self._metrics.items()),
+                          key=lambda item: (item[0], item[1]))
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        导出所有指标
+
+        Returns:
+            {"counters": [...], "gauges": [...], "histograms": [...]}，每项包含 name、labels 和数值
+        """
+        data = {"counters": [], "gauges": [], "histograms": []}
+        for name, labels, metric in self._items():
+            entry = {"name": name, "labels": dict(labels)}
+            metric_type = self._types[name]
+            if metric_type == TYPE_HISTOGRAM:
+                entry.update(metric.snapshot())
+            else:
+                entry["value"] = metric.value
+            data[metric_type + "s"].append(entry)
+        return data
+
+    def to_prometheus(self) -> str:
+        """
+        导出为 Prometheus 文本格式（直方图按 summary 类型导出分位数）
+
+        Returns:
+            文本内容
+        """
+        lines = []
+        current = None
+        for name, labels, metric in self._items():
+            metric_type = self._types[name]
+            if name != current:
+                current = name
+                if self._help[name]:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {'summary' if metric_type == TYPE_HISTOGRAM else metric_type}")
+            if metric_type != TYPE_HISTOGRAM:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(metric.value)}")
+                continue
+            for quantile in METRICS_CONFIG["quantiles"]:
+                value = metric.percentile(quantile * 100)
+                quantile_labels = labels + (("quantile", f"{quantile:g}"),)
+                lines.append(f"{name}{_format_labels(quantile_labels)} {_format_value(value)}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(metric.sum)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {metric.count}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def _format_labels(labels: LabelKey) -> str:
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+
+def _format_value(value: Optional[float]) -> str:
+    if value is None:
+        return "NaN"
+    return repr(float(value))
+
+
+def write_atomic(path: str, content: str) -> None:
+    """
+    写入文本文件：先写临时文件再替换，读取方不会读到写了一半的文件
+
+    Args:
+        path: 文件路径，所在目录不存在时创建
+        content: 文件内容
+
+    Raises:
+        OSError: 写入失败时抛出
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # 临时文件按线程区分，多个线程同时导出时互不干扰
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def export_metrics(json_path: Optional[str] = None, prometheus_path: Optional[str] = None,
+                   registry: Optional[MetricsRegistry] = None) -> bool:
+    """
+    把指标写入 JSON 快照和 Prometheus 文本文件
+
+    Args:
+        json_path: JSON 文件路径，默认为 METRICS_CONFIG["json_file"]
+        prometheus_path: Prometheus 文本文件路径，默认为 METRICS_CONFIG["prometheus_file"]
+        registry: 指标注册表，默认为全局注册表
+
+    Returns:
+        写入成功返回 True
+    """
+    registry = registry or metrics
+    try:
+        write_atomic(json_path or METRICS_CONFIG["json_file"],
+                      json.dumps(registry.snapshot(), indent=2, ensure_ascii=False))
+        write_atomic(prometheus_path or METRICS_CONFIG["prometheus_file"], registry.to_prometheus())
+        return True
+    except OSError as e:
+        logger.warning(f"导出指标失败: {e}")
+        return False
+
+
+def generation_summary(snapshot: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    按模型和尺寸汇总生成请求数、错误率和延迟分位数
+
+    Args:
+        snapshot: MetricsRegistry.snapshot() 或 JSON 快照的内容
+
+    Returns:
+        按模型、尺寸排序的列表，每项包含 model、size、requests、errors、error_rate、p50、p95
+    """
+    rows: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def row(labels: Dict[str, str]) -> Dict[str, Any]:
+        key = (labels.get("model", ""), labels.get("size", ""))
+        return rows.setdefault(key, {"model": key[0], "size": key[1], "requests": 0, "errors": 0,
+                                     "p50": None, "p95": None})
+
+    for entry in snapshot.get("counters", []):
+        if entry["name"] == "image_generation_total":
+            item = row(entry["labels"])
+            item["requests"] += int(entry["value"])
+            if entry["labels"].get("outcome") != "ok":
+                item["errors"] += int(entry["value"])
+    for entry in snapshot.get("histograms", []):
+        if entry["name"] == "image_generation_seconds":
+            item = row(entry["labels"])
+            item["p50"], item["p95"] = entry.get("p50"), entry.get("p95")
+
+    for item in rows.values():
+        item["error_rate"] = item["errors"] / item["requests"] if item["requests"] else 0.0
+    return [rows[key] for key in sorted(rows)]
+
+
+def format_generation_summary(summary: List[Dict[str, Any]]) -> str:
+    """
+    格式化生成请求汇总表
+
+    Args:
+        summary: generation_summary() 的结果
+
+    Returns:
+        文本表格
+    """
+    if not summary:
+        return "没有生成请求的指标"
+
+    def seconds(value: Optional[float]) -> str:
+        return f"{value:.2f}s" if value is not None else "-"
+
+    lines = [f"{'模型':<16}{'尺寸':<12}{'请求':>8}{'错误率':>10}{'p50':>10}{'p95':>10}"]
+    for item in summary:
+        lines.append(f"{item['model']:<16}{item['size']:<12}{item['requests']:>8}"
+                     f"{item['error_rate']:>10.1%}{seconds(item['p50']):>10}{seconds(item['p95']):>10}")
+    return "\n".join(lines)
+
+
+# 全局指标注册表
+metrics = MetricsRegistry()
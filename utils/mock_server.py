@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+本地模拟图像服务
+实现与 /v1/images/generations 兼容的接口，返回按提示词生成的渐变图像，
+请求 stream=true 时以事件流先返回低分辨率预览帧，用于离线开发和测试。
+可按比例注入 500、429 和被截断的响应，延迟可按多种分布随机，用于压力测试客户端、调度器和界面流水线
+"""
+
+import base64
+import hashlib
+import io
+import json
+import math
+import random
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image
+
+from config.constants import MOCK_SERVER_CONFIG
+from utils.logger import get_logger
+
+# 支持的延迟分布
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+# 请求结果类型
+OUTCOME_OK = "ok"
+OUTCOME_ERROR = "error"
+OUTCOME_RATE_LIMITED = "rate_limited"
+OUTCOME_PARTIAL = "partial"
+
+
+def parse_size(size: str) -> Tuple[int, int]:
+    """
+    解析尺寸字符串
+
+    Args:
+        size: 如 "1024x1536"
+
+    Returns:
+        (宽, 高)，无法解析时返回 (1024, 1024)
+    """
+    try:
+        width, height = (int(value) for value in str(size).lower().split("x", 1))
+        if 0 < width <= 4096 and 0 < height <= 4096:
+            return width, height
+    except ValueError:
+        pass
+    return 1024, 1024
+
+
+def render_image(prompt: str, size: Tuple[int, int], detail: float = 1.0) -> bytes:
+    """
+    按提示词生成确定性的渐变图像
+
+    Args:
+        prompt: 提示词（决定颜色）
+        size: 输出尺寸 (宽, 高)
+        detail: 细节比例，小于 1 时先以低分辨率绘制再放大，模拟预览帧
+
+    Returns:
+        PNG 图像数据
+    """
+    digest = hashlib.sha1(prompt.encode("utf-8")).digest()
+    start, end = tuple(digest[0:3]), tuple(digest[3:6])
+    width, height = size
+
+    # 先生成小尺寸渐变再放大，速度快且与尺寸无关
+    gradient = Image.linear_gradient("L").resize((max(1, int(64 * detail)), max(1, int(96 * detail))))
+    image = Image.merge("RGB", [
+        gradient.point(lambda v, a=a, b=b: a + (b - a) * v // 255) for a, b in zip(start, end)
+    ])
+    image = image.resize((width, height), Image.Resampling.NEAREST if detail < 1 else Image.Resampling.BILINEAR)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def sample_latency(rng: random.Random, mean: float, distribution: str = "fixed", spread: float = 0.5) -> float:
+    """
+    按分布随机生成一次延迟
+
+    Args:
+        rng: 随机数生成器
+        mean: 均值（lognormal 为中位数）
+        distribution: 分布名称，LATENCY_DISTRIBUTIONS 之一
+        spread: 分布宽度，uniform/normal 为相对均值的比例，lognormal 为对数标准差
+
+    Returns:
+        延迟（秒），不小于 0
+
+    Raises:
+        ValueError: 分布名称无效时抛出
+    """
+    if mean <= 0 or distribution == "fixed":
+        return max(0.0, mean)
+    if distribution == "uniform":
+        return max(0.0, rng.uniform(mean * (1 - spread), mean * (1 + spread)))
+    if distribution == "normal":
+        return max(0.0, rng.gauss(mean, mean * spread))
+    if distribution == "lognormal":
+        return rng.lognormvariate(math.log(mean), spread)
+    if distribution == "exponential":
+        return rng.expovariate(1.0 / mean)
+    raise ValueError(f"未知的延迟分布: {distribution}")
+
+
+def pad_png(data: bytes, target_bytes: int) -> bytes:
+    """
+    在 PNG 末尾的 IEND 之前插入私有的辅助数据块，使文件达到指定大小，图像内容不变
+
+    Args:
+        data: PNG 数据
+        target_bytes: 目标字节数，不大于当前大小时原样返回
+
+    Returns:
+        填充后的 PNG 数据
+    """
+    # 数据块结构：长度(4) + 类型(4) + 数据 + CRC(4)
+    padding = target_bytes - len(data) - 12
+    if padding < 0:
+        return data
+    chunk_type = b"mkPd"  # 小写首字母：辅助块，解码器会忽略
+    chunk_data = bytes(padding)
+    chunk = (struct.pack(">I", padding) + chunk_type + chunk_data
+             + struct.pack(">I", zlib.crc32(chunk_type + chunk_data) & 0xFFFFFFFF))
+    iend = data.rindex(b"IEND") - 4
+    return data[:iend] + chunk + data[iend:]
+
+
+class MockImageServer(ThreadingHTTPServer):
+    """模拟图像服务，保存故障注入配置和请求统计"""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], profile: Dict[str, Any]):
+        """
+        初始化服务
+
+        Args:
+            address: 监听地址 (host, port)
+            profile: 行为配置，键与 MOCK_SERVER_CONFIG 相同
+        """
+        if profile["latency_distribution"] not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"未知的延迟分布: {profile['latency_distribution']}")
+        super().__init__(address, MockImageHandler)
+        self.path = profile["path"]
+        self.latency = profile["latency"]
+        self.profile = profile
+        self._rng = random.Random(profile["seed"])
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, OUTCOME_OK: 0, OUTCOME_ERROR: 0, OUTCOME_RATE_LIMITED: 0, OUTCOME_PARTIAL: 0}
+
+    def next_response(self) -> Tuple[str, float]:
+        """
+        决定下一个请求的结果和延迟
+
+        Returns:
+            (结果类型, 延迟秒数)
+        """
+        profile = self.profile
+        with self._lock:
+            roll = self._rng.random()
+            latency = sample_latency(self._rng, self.latency, profile["latency_distribution"],
+                                     profile["latency_spread"])
+            self._stats["requests"] += 1
+
+        outcome = OUTCOME_OK
+        for name, rate in ((OUTCOME_RATE_LIMITED, profile["rate_limit_rate"]),
+                           (OUTCOME_ERROR, profile["error_rate"]),
+                           (OUTCOME_PARTIAL, profile["partial_rate"])):
+            if roll < rate:
+                outcome = name
+                break
+            roll -= rate
+
+        with self._lock:
+            self._stats[outcome] += 1
+        return outcome, latency
+
+    def stats(self) -> Dict[str, int]:
+        """
+        获取请求统计
+
+        Returns:
+            各结果类型的请求数
+        """
+        with self._lock:
+            return dict(self._stats)
+
+
+class MockImageHandler(BaseHTTPRequestHandler):
+    """模拟图像服务的请求处理器"""
+
+    server_version = "MockImageServer/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args) -> None:
+        """将访问日志写入应用日志而不是标准错误"""
+        get_logger(__name__).debug(f"{self.address_string()} - {format % args}")
+
+    def do_GET(self) -> None:
+        # 模型列表，供连接测试和熔断恢复探测使用
+        if not self.path.split("?", 1)[0].endswith("/models"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        self._send_json(200, {"object": "list", "data": [{"id": "sora_image", "object": "model"},
+                                                         {"id": "gpt-image-1", "object": "model"}]})
+
+    def do_POST(self) -> None:
+        if self.path.split("?", 1)[0] != self.server.path:
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict) or not body.get("prompt"):
+                raise ValueError("prompt is required")
+        except ValueError as e:
+            self._send_json(400, {"error": {"message": str(e), "type": "invalid_request_error"}})
+            return
+
+        prompt = str(body["prompt"])
+        size = parse_size(body.get("size", "1024x1024"))
+        outcome, latency = self.server.next_response()
+
+        if outcome == OUTCOME_RATE_LIMITED:
+            # 限流响应立即返回，与真实服务一致
+            self._send_json(429, {"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}},
+                            headers={"Retry-After": str(self.server.profile["retry_after"])})
+            return
+
+        if body.get("stream") and outcome != OUTCOME_ERROR:
+            self._stream_image(prompt, size, int(body.get("partial_images") or 0), latency,
+                               truncate=outcome == OUTCOME_PARTIAL)
+            return
+
+        time.sleep(latency)
+        if outcome == OUTCOME_ERROR:
+            self._send_json(500, {"error": {"message": "The server had an error processing your request",
+                                            "type": "server_error"}})
+            return
+
+        self._send_json(200, {
+            "created": int(time.time()),
+            "data": [{"b64_json": self._final_image(prompt, size)}]
+        }, truncate=outcome == OUTCOME_PARTIAL)
+
+    def _final_image(self, prompt: str, size: Tuple[int, int]) -> str:
+        """生成最终图像（按配置填充到指定大小）的 base64 数据"""
+        image = pad_png(render_image(prompt, size), self.server.profile["payload_bytes"])
+        return base64.b64encode(image).decode("ascii")
+
+    def _stream_image(self, prompt: str, size: Tuple[int, int], partial_images: int, latency: float,
+                      truncate: bool = False) -> None:
+        """
+        以事件流返回预览帧和最终图像，预览帧均匀分布在生成耗时内；truncate 时不发送最终图像
+
+        使用分块传输编码，每个事件单独作为一个块发送并立即刷新，客户端收到即可处理，不必等响应结束
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        steps = max(0, min(partial_images, 3))
+        interval = latency / (steps + 1)
+        try:
+            for index in range(steps):
+                time.sleep(interval)
+                # 预览帧尺寸较小，界面缩略图也只有 160x240
+                preview = render_image(prompt, (size[0] // 4, size[1] // 4), detail=(index + 1) / (steps + 1))
+                self._send_event("image_generation.partial_image", {
+                    "b64_json": base64.b64encode(preview).decode("ascii"),
+                    "partial_image_index": index
+                })
+            if not truncate:
+                time.sleep(interval)
+                self._send_event("image_generation.completed", {"b64_json": self._final_image(prompt, size)})
+            # 结束块：事件流正常结束（truncate 时在最终图像之前结束）
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_event(self, event_type: str, data: Dict[str, Any]) -> None:
+        payload = json.dumps({"type": event_type, **data})
+        event = f"event: {event_type}\ndata: {payload}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, data: Dict[str, Any], headers: Optional[Dict[str, str]] = None,
+                   truncate: bool = False) -> None:
+        """发送 JSON 响应；truncate 时声明完整长度但只发送一半后断开连接"""
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if truncate:
+            self.close_connection = True
+            body = body[:len(body) // 2]
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def create_mock_server(host: Optional[str] = None, port: Optional[int] = None,
+                       latency: Optional[float] = None, **profile) -> MockImageServer:
+    """
+    创建模拟图像服务
+
+    Args:
+        host: 监听地址，默认仅本机
+        port: 监听端口，0 表示自动分配
+        latency: 每张图像的模拟生成耗时（秒）
+        **profile: 其他行为配置，如 latency_distribution、error_rate、rate_limit_rate、
+            partial_rate、payload_bytes、seed（见 MOCK_SERVER_CONFIG）
+
+    Returns:
+        HTTP 服务器实例（调用 serve_forever 开始服务），接口地址为
+        http://<host>:<port>/v1/images/generations
+
+    Raises:
+        ValueError: 配置项无效时抛出
+    """
+    unknown = set(profile) - set(MOCK_SERVER_CONFIG)
+    if unknown:
+        raise ValueError(f"未知的模拟服务配置: {', '.join(sorted(unknown))}")
+    settings = dict(MOCK_SERVER_CONFIG)
+    settings.update({key: value for key, value in profile.items() if value is not None})
+    if latency is not None:
+        settings["latency"] = latency
+    return MockImageServer(
+        (host or settings["host"], settings["port"] if port is None else port),
+        settings
+    )
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+分阶段处理流水线
+每个阶段有独立的工作线程和有界输入队列，下游处理不过来时上游的提交会阻塞（背压），
+使网络请求、解码、缩略图和保存等步骤可以重叠执行，同时限制内存中堆积的图像数量
+"""
+
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from config.constants import PIPELINE_CONFIG
+from utils.logger import get_logger
+
+# 工作线程退出标记
+_STOP = object()
+
+
+class PipelineStage:
+    """流水线阶段"""
+
+    def __init__(self, name: str, fn: Callable[[Any], Any], workers: int = 1,
+                 queue_size: Optional[int] = None):
+        """
+        初始化阶段
+
+        Args:
+            name: 阶段名称，用于线程命名和统计
+            fn: 处理函数，接收上一阶段的输出并返回本阶段的输出
+            workers: 工作线程数
+            queue_size: 输入队列容量，队列满时上游阻塞
+        """
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size or PIPELINE_CONFIG["queue_size"]))
+        self.processed = 0
+        self.failed = 0
+        self.active = 0
+
+
+class Pipeline:
+    """分阶段处理流水线"""
+
+    def __init__(self, stages: List[PipelineStage], on_result: Optional[Callable[[Any, Any], None]] = None,
+                 on_error: Optional[Callable[[Any, str, BaseException], None]] = None,
+                 name: str = "pipeline"):
+        """
+        初始化流水线并启动各阶段的工作线程
+
+        Args:
+            stages: 按处理顺序排列的阶段
+            on_result: 最后一个阶段完成后的回调，签名为 on_result(context, value)
+            on_error: 某个阶段处理失败时的回调，签名为 on_error(context, stage_name, error)，失败的条目不再向下游传递
+            name: 流水线名称，用于线程命名
+
+        Raises:
+            ValueError: 没有任何阶段时抛出
+        """
+        if not stages:
+            raise ValueError("流水线至少需要一个阶段")
+        self.stages = stages
+        self.on_result = on_result
+        self.on_error = on_error
+        self.name = name
+        self.logger = get_logger(__name__)
+
+        self._lock = threading.Lock()
+        self._closed = False
+        self._threads: List[threading.Thread] = []
+        for position, stage in enumerate(stages):
+            for number in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker_loop,
+                    args=(position,),
+                    name=f"{name}-{stage.name}-{number + 1}",
+                    daemon=True
+                )
+                self._threads.append(thread)
+                thread.start()
+
+    def submit(self, value: Any, context: Any = None, timeout: Optional[float] = None) -> None:
+        """
+        提交条目，第一个阶段的队列满时阻塞
+
+        Args:
+            value: 第一个阶段的输入
+            context: 随条目传递给回调的上下文（如图像索引）
+            timeout: 最长阻塞时间（秒），None 表示一直等待
+
+        Raises:
+            RuntimeError: 流水线已关闭时抛出
+            queue.Full: 超时仍无法放入队列时抛出
+        """
+        if self._closed:
+            raise RuntimeError("流水线已关闭，无法提交新条目")
+        self.stages[0].queue.put((context, value), timeout=timeout)
+
+    def _worker_loop(self, position: int) -> None:
+        """阶段工作线程主循环"""
+        stage = self.stages[position]
+        next_stage = self.stages[position + 1] if position + 1 < len(self.stages) else None
+
+        while True:
+            item = stage.queue.get()
+            if item is _STOP:
+                break
+
+            context, value = item
+            with self._lock:
+                stage.active += 1
+            try:
+                result = stage.fn(value)
+            except Exception as e:
+                with self._lock:
+                    stage.active -= 1
+                    stage.failed += 1
+                self.logger.warning(f"流水线阶段 {stage.name} 处理失败: {type(e).__name__}: {e}")
+                self._notify(self.on_error, context, stage.name, e)
+                continue
+
+            with self._lock:
+                stage.active -= 1
+                stage.processed += 1
+            if next_stage is not None:
+                # 下游队列满时阻塞，背压逐级传递到提交方
+                next_stage.queue.put((context, result))
+            else:
+                self._notify(self.on_result, context, result)
+
+    def _notify(self, callback: Optional[Callable], *args) -> None:
+        """调用回调，回调异常不影响工作线程"""
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            self.logger.error(f"流水线回调执行失败: {type(e).__name__}: {e}")
+
+    def close(self, wait: bool = True) -> None:
+        """
+        关闭流水线，已提交的条目处理完后工作线程退出
+
+        Args:
+            wait: 是否等待所有工作线程退出
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        if wait:
+            self._drain()
+        else:
+            threading.Thread(target=self._drain, name=f"{self.name}-close", daemon=True).start()
+
+    def _drain(self) -> None:
+        """逐个阶段发送退出标记：本阶段线程全部退出后，下游不会再收到新条目"""
+        for position, stage in enumerate(self.stages):
+            for _ in range(stage.workers):
+                stage.queue.put(_STOP)
+            for thread in self._stage_threads(position):
+                thread.join()
+
+    def _stage_threads(self, position: int) -> List[threading.Thread]:
+        """获取某个阶段的工作线程"""
+        start = sum(stage.workers for stage in self.stages[:position])
+        return self._threads[start:start + self.stages[position].workers]
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        获取各阶段统计
+
+        Returns:
+            列表，每项包含 name、workers、queued、active、processed、failed
+        """
+        with self._lock:
+            return [{
+                "name": stage.name,
+                "workers": stage.workers,
+                "queued": stage.queue.qsize(),
+                "active": stage.active,
+                "processed": stage.processed,
+                "failed": stage.failed
+            } for stage in self.stages]
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+响应缓存
+按完整请求数据的哈希把生成的图像保存在磁盘上，相同请求再次出现时直接返回，不再调用 API。
+缓存条目有有效期，总大小超过上限时淘汰最久未使用的图像。
+锁只保护内存中的索引，读写和删除文件都在锁外进行
+"""
+
+import base64
+import binascii
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.constants import RESPONSE_CACHE_CONFIG
+from utils.logger import get_logger
+
+# 缓存文件扩展名
+CACHE_SUFFIX = ".png"
+
+
+class ResponseCache:
+    """磁盘响应缓存"""
+
+    def __init__(self, directory: Optional[str] = None, ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None):
+        """
+        初始化响应缓存
+
+        Args:
+            directory: 缓存目录
+            ttl: 缓存有效期（秒）
+            max_bytes: 缓存总大小上限（字节）
+        """
+        self.directory = directory or RESPONSE_CACHE_CONFIG["directory"]
+        self.ttl = RESPONSE_CACHE_CONFIG["ttl"] if ttl is None else ttl
+        self.max_bytes = max_bytes or RESPONSE_CACHE_CONFIG["max_bytes"]
+        self.logger = get_logger(__name__)
+
+        self._lock = threading.Lock()
+        # 哈希 -> (文件大小, 最近使用时间)
+        self._entries: Dict[str, Tuple[int, float]] = {}
+        self._total_bytes = 0
+        self._hits = 0
+        self._misses = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._scan()
+
+    def _path(self, key: str) -> str:
+        """缓存文件路径"""
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def _scan(self) -> None:
+        """启动时扫描缓存目录，建立索引并清理过期条目"""
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".tmp"):
+                # 上次写入中断留下的临时文件
+                self._remove_file(path)
+                continue
+            if not name.endswith(CACHE_SUFFIX):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.ttl:
+                self._remove_file(path)
+                continue
+            self._entries[name[:-len(CACHE_SUFFIX)]] = (stat.st_size, stat.st_mtime)
+            self._total_bytes += stat.st_size
+        with self._lock:
+            evicted = self._evict()
+        self._remove_entries(evicted)
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        查找缓存
+
+        Args:
+            key: 请求数据哈希
+
+        Returns:
+            base64 编码的图像数据，未命中或已过期时返回 None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+        image_bytes = None
+        try:
+            with open(self._path(key), "rb") as f:
+                if now - os.fstat(f.fileno()).st_mtime <= self.ttl:
+                    image_bytes = f.read()
+        except OSError:
+            # 文件在读取前被删除（如并发淘汰），视为未命中
+            pass
+
+        stale = False
+        with self._lock:
+            if image_bytes is None:
+                self._misses += 1
+                # 期间被重新写入的条目保留
+                stale = self._entries.get(key) is entry
+                if stale:
+                    self._forget(key)
+            else:
+                self._hits += 1
+                current = self._entries.get(key)
+                if current is not None:
+                    self._entries[key] = (current[0], now)
+        if stale:
+            self._remove_entries([key])
+        if image_bytes is None:
+            return None
+        return base64.b64encode(image_bytes).decode("ascii")
+
+    def put(self, key: str, b64_data: str) -> None:
+        """
+        写入缓存（先写临时文件再替换）
+
+        Args:
+            key: 请求数据哈希
+            b64_data: base64 编码的图像数据
+        """
+        try:
+            image_bytes = base64.b64decode(b64_data)
+        except (binascii.Error, ValueError) as e:
+            self.logger.warning(f"响应不是有效的 base64 数据，不写入缓存: {e}")
+            return
+        if len(image_bytes) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(image_bytes)
+            os.replace(temp_path, path)
+        except OSError as e:
+            self._remove_file(temp_path)
+            self.logger.warning(f"写入响应缓存失败: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            old = self._entries.get(key)
+            if old is not None:
+                self._total_bytes -= old[0]
+            self._entries[key] = (len(image_bytes), now)
+            self._total_bytes += len(image_bytes)
+            evicted = self._evict(keep=key)
+        self._remove_entries(evicted)
+
+    def _evict(self, keep: Optional[str] = None) -> List[str]:
+        """
+        总大小超过上限时从索引中移除最久未使用的条目（需持有锁）
+
+        Returns:
+            被移除的键，调用方释放锁后删除对应文件
+        """
+        evicted: List[str] = []
+        if self._total_bytes <= self.max_bytes:
+            return evicted
+        for key, _ in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if key != keep:
+                self._forget(key)
+                evicted.append(key)
+        return evicted
+
+    def _forget(self, key: str) -> None:
+        """从索引中移除一个条目（需持有锁）"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[0]
+
+    def _remove_entries(self, keys: List[str]) -> None:
+        """删除已从索引中移除的条目的文件（不需持有锁）"""
+        for key in keys:
+            self._remove_file(self._path(key))
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        """删除文件，忽略不存在等错误"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            keys = list(self._entries)
+            for key in keys:
+                self._forget(key)
+        self._remove_entries(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+
+        Returns:
+            统计字典
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "hits": self._hits,
+                "misses": self._misses
+            }
+
+
+# 进程内按目录共享的缓存实例，界面每次生成都会新建 ImageUtils，避免重复扫描目录
+_caches: Dict[str, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(directory: Optional[str] = None) -> ResponseCache:
+    """
+    获取目录对应的共享响应缓存
+
+    Args:
+        directory: 缓存目录，默认为配置中的目录
+
+    Returns:
+        响应缓存实例
+    """
+    path = os.path.abspath(directory or RESPONSE_CACHE_CONFIG["directory"])
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = ResponseCache(path)
+        return cache
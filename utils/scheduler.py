@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+"""
+生成任务调度器
+使用固定数量的工作线程执行图像生成任务，供界面和命令行模式共用。
+任务分为界面操作、普通和批量三个优先级，界面操作优先执行并保留一部分工作线程；
+延后执行的任务（如退避后的重试）在到期前不占用工作线程
+"""
+
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from config.constants import PERFORMANCE, SCHEDULER_CONFIG
+from utils.logger import get_logger
+from utils.tracing import tracer
+
+# 任务优先级（按从高到低排列）
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_NORMAL = "normal"
+PRIORITY_BULK = "bulk"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_NORMAL, PRIORITY_BULK)
+
+
+class GenerationScheduler:
+    """生成任务调度器类"""
+
+    def __init__(self, max_workers: Optional[int] = None, name: str = "generation",
+                 reserved_interactive: Optional[int] = None, starvation_timeout: Optional[float] = None):
+        """
+        初始化调度器
+
+        Args:
+            max_workers: 最大并发工作线程数，默认使用性能配置中的并发上限
+            name: 调度器名称，用于工作线程命名
+            reserved_interactive: 只执行界面操作任务的工作线程数（至少留一个线程给其他任务）
+            starvation_timeout: 任务等待超过该时间（秒）后不再被更高优先级的任务插队
+        """
+        self.max_workers = max(1, max_workers or PERFORMANCE["max_concurrent_generations"])
+        self.name = name
+        if reserved_interactive is None:
+            reserved_interactive = SCHEDULER_CONFIG["reserved_interactive"]
+        self.reserved_interactive = max(0, min(reserved_interactive, self.max_workers - 1))
+        self.starvation_timeout = (SCHEDULER_CONFIG["starvation_timeout"]
+                                   if starvation_timeout is None else starvation_timeout)
+        self.logger = get_logger(__name__)
+
+        # 每个优先级一个先进先出队列，元素为 (future, fn, args, kwargs, 提交时间, 提交时的上下文)
+        self._queues: Dict[str, Deque[Tuple]] = {priority: deque() for priority in PRIORITIES}
+        # 延后执行的任务堆，元素为 (可执行时间, 序号, 优先级, (future, fn, args, kwargs, 上下文))，到期后移入队列
+        self._delayed: List[Tuple] = []
+        self._delayed_seq = itertools.count()
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._active: Dict[str, int] = {priority: 0 for priority in PRIORITIES}
+        self._shutdown = False
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        以普通优先级提交任务
+
+        Args:
+            fn: 要执行的函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            任务对应的 Future 对象
+
+        Raises:
+            RuntimeError: 调度器已关闭时抛出
+        """
+        return self.submit_with_priority(PRIORITY_NORMAL, fn, *args, **kwargs)
+
+    def submit_with_priority(self, priority: str, fn: Callable, *args, **kwargs) -> Future:
+        """
+        按指定优先级提交任务
+
+        Args:
+            priority: 优先级，PRIORITIES 之一
+            fn: 要执行的函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            任务对应的 Future 对象
+
+        Raises:
+            ValueError: 优先级无效时抛出
+            RuntimeError: 调度器已关闭时抛出
+        """
+        if priority not in self._queues:
+            raise ValueError(f"无效的任务优先级: {priority}")
+        future: Future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("调度器已关闭，无法提交新任务")
+            # 任务在提交时的上下文中执行，请求 ID 和追踪区间随任务传到工作线程
+            self._queues[priority].append((future, fn, args, kwargs, time.monotonic(), contextvars.copy_context()))
+            self._adjust_workers()
+            self._changed.notify()
+        return future
+
+    def submit_later(self, delay: float, priority: str, fn: Callable, *args, **kwargs) -> Future:
+        """
+        延后指定时间后按优先级提交任务，等待期间不占用工作线程
+
+        Args:
+            delay: 延后时间（秒），不大于 0 时立即提交
+            priority: 优先级，PRIORITIES 之一
+            fn: 要执行的函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            任务对应的 Future 对象
+
+        Raises:
+            ValueError: 优先级无效时抛出
+            RuntimeError: 调度器已关闭时抛出
+        """
+        if delay <= 0:
+            return self.submit_with_priority(priority, fn, *args, **kwargs)
+        if priority not in self._queues:
+            raise ValueError(f"无效的任务优先级: {priority}")
+        future: Future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("调度器已关闭，无法提交新任务")
+            heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._delayed_seq), priority,
+                                           (future, fn, args, kwargs, contextvars.copy_context())))
+            self._adjust_workers()
+            self._changed.notify()
+        return future
+
+    def submit_generation(self, image_utils, prompt: str, size: str, model: str,
+                          callback: Optional[Callable] = None, index: int = 0,
+                          coalesce: bool = False, partial_callback: Optional[Callable] = None,
+                          start_callback: Optional[Callable] = None,
+                          priority: str = PRIORITY_NORMAL) -> Future:
+        """
+        提交单张图像生成任务
+
+        Args:
+            image_utils: ImageUtils 实例
+            prompt: 图像描述文本
+            size: 图像尺寸
+            model: 使用的模型
+            callback: 完成时的回调函数，签名为 callback(index, result)
+            index: 图像索引
+            coalesce: 是否与进行中的相同请求合并
+            partial_callback: 收到预览帧时的回调，签名为 partial_callback(index, image_data)
+            start_callback: 工作线程开始执行任务时的回调，签名为 start_callback(index)
+            priority: 任务优先级，PRIORITIES 之一
+
+        Returns:
+            任务对应的 Future 对象，结果为 base64 图像数据或 None
+        """
+        # 只传入启用的可选参数，兼容只接受三个参数的 generate_image 实现
+        options = {}
+        if coalesce:
+            options["coalesce"] = True
+        if partial_callback:
+            options["on_partial"] = lambda image_data, _partial_index: partial_callback(index, image_data)
+        if index and getattr(image_utils, "response_cache", None) is not None:
+            # 同一批的各张图像分别缓存
+            options["cache_slot"] = index
+        queued_at = tracer.clock()
+
+        def run():
+            # 每张图像一个区间；提交时没有所在的 trace（如命令行模式）则开始新的 trace
+            with tracer.span("scheduler.task", index=index, priority=priority):
+                tracer.record("scheduler.queued", queued_at, index=index)
+                if start_callback:
+                    start_callback(index)
+                return image_utils.generate_image(prompt, size, model, **options)
+
+        future = self.submit_with_priority(priority, run)
+        if callback:
+            future.add_done_callback(lambda f: callback(index, self.get_result(f)))
+        return future
+
+    def get_result(self, future: Future) -> Any:
+        """获取任务结果，任务失败或取消时返回 None"""
+        if future.cancelled():
+            return None
+        error = future.exception()
+        if error is not None:
+            self.logger.error(f"生成任务执行失败: {type(error).__name__}: {error}")
+            return None
+        return future.result()
+
+    def _adjust_workers(self) -> None:
+        """按需启动工作线程（需持有锁）"""
+        pending = self.pending_count + self.active_count
+        while len(self._workers) < min(self.max_workers, pending):
+            worker = threading.Thread(
+                target=self._worker_loop,
+                name=f"{self.name}-worker-{len(self._workers) + 1}",
+                daemon=True
+            )
+            self._workers.append(worker)
+            worker.start()
+
+    def _promote_delayed(self) -> Optional[float]:
+        """
+        把到期的延后任务移入对应优先级的队列（需持有锁）
+
+        Returns:
+            距下一个延后任务到期的秒数，没有延后任务时返回 None
+        """
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, priority, (future, fn, args, kwargs, context) = heapq.heappop(self._delayed)
+            # 从到期时开始计算等待时间
+            self._queues[priority].append((future, fn, args, kwargs, now, context))
+        return self._delayed[0][0] - now if self._delayed else None
+
+    def _next_task(self) -> Optional[Tuple[str, Tuple]]:
+        """
+        取出下一个可执行的任务（需持有锁）
+
+        优先执行等待超时的任务（按提交顺序），否则按优先级从高到低；
+        非界面操作任务不能占用保留给界面操作的工作线程
+
+        Returns:
+            (优先级, 任务)，没有可执行的任务时返回 None
+        """
+        busy = sum(count for priority, count in self._active.items() if priority != PRIORITY_INTERACTIVE)
+        background_allowed = busy < self.max_workers - self.reserved_interactive
+
+        candidates = [priority for priority in PRIORITIES
+                      if self._queues[priority]
+                      and (priority == PRIORITY_INTERACTIVE or background_allowed)]
+        if not candidates:
+            return None
+
+        now = time.monotonic()
+        starving = [priority for priority in candidates
+                    if now - self._queues[priority][0][4] >= self.starvation_timeout]
+        if starving:
+            chosen = min(starving, key=lambda priority: self._queues[priority][0][4])
+        else:
+            chosen = candidates[0]
+        return chosen, self._queues[chosen].popleft()
+
+    def _worker_loop(self) -> None:
+        """工作线程主循环"""
+        while True:
+            with self._changed:
+                while True:
+                    next_due = self._promote_delayed()
+                    item = self._next_task()
+                    if item is not None:
+                        break
+                    if self._shutdown and self.pending_count == 0:
+                        return
+                    self._changed.wait(next_due)
+                priority, (future, fn, args, kwargs, _, context) = item
+                self._active[priority] += 1
+
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        result = context.run(fn, *args, **kwargs)
+                    except BaseException as e:
+                        future.set_exception(e)
+                    else:
+                        future.set_result(result)
+            finally:
+                with self._changed:
+                    self._active[priority] -= 1
+                    self._changed.notify_all()
+
+    @property
+    def active_count(self) -> int:
+        """正在执行的任务数"""
+        return sum(self._active.values())
+
+    @property
+    def pending_count(self) -> int:
+        """等待执行的任务数（包括尚未到期的延后任务）"""
+        return sum(len(tasks) for tasks in self._queues.values()) + len(self._delayed)
+
+    def queue_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        按优先级统计任务数
+
+        Returns:
+            优先级 -> {"active": 执行中, "queued": 等待中}
+        """
+        with self._lock:
+            return {priority: {"active": self._active[priority], "queued": len(self._queues[priority])}
+                    for priority in PRIORITIES}
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        """
+        关闭调度器
+
+        Args:
+            wait: 是否等待所有工作线程退出
+            cancel_pending: 是否取消尚未开始执行的任务
+        """
+        cancelled = []
+        with self._changed:
+            if self._shutdown:
+                return
+            self._shutdown = True
+
+            if cancel_pending:
+                for tasks in self._queues.values():
+                    cancelled.extend(item[0] for item in tasks)
+                    tasks.clear()
+                cancelled.extend(item[3][0] for item in self._delayed)
+                self._delayed.clear()
+
+            workers = list(self._workers)
+            self._changed.notify_all()
+
+        # 在锁外取消，完成回调中可能再次访问调度器
+        for future in cancelled:
+            future.cancel()
+
+        if wait:
+            for worker in workers:
+                worker.join()
+        self.logger.debug(f"调度器已关闭: {self.name}")
+
+
+# 全局调度器实例（延迟创建）
+_default_scheduler: Optional[GenerationScheduler] = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> GenerationScheduler:
+    """获取进程内共享的全局调度器"""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = GenerationScheduler()
+        return _default_scheduler
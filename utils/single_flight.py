@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+请求合并
+相同的请求同时进行时只执行一次，其余调用方等待并共享同一个结果（或异常）
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class _Call:
+    """一次进行中的调用"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """按键合并同时进行的相同调用"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._executed = 0
+        self._coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        执行调用；同一个键已有调用在进行时，等待它完成并共享结果
+
+        Args:
+            key: 调用的唯一键
+            fn: 实际执行的函数
+
+        Returns:
+            函数结果
+
+        Raises:
+            Exception: 函数抛出的异常（所有等待方都会收到）
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                # 先移除再唤醒，之后到达的调用会重新执行而不是拿到旧结果
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self) -> Dict[str, int]:
+        """
+        获取合并统计
+
+        Returns:
+            统计字典：实际执行次数、被合并的调用数、进行中的调用数
+        """
+        with self._lock:
+            return {
+                "executed": self._executed,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._calls)
+            }
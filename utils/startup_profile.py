@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+启动耗时分析
+在新的解释器中用 python -X importtime 导入入口模块，统计总耗时和各模块的导入耗时，
+用于发现拖慢冷启动的重量级依赖
+"""
+
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+from config.constants import STARTUP_CONFIG
+
+# 项目根目录，子进程在这里运行以便导入项目模块
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(output: str) -> List[Dict[str, object]]:
+    """
+    解析 -X importtime 的输出
+
+    Args:
+        output: 子进程的标准错误输出
+
+    Returns:
+        按导入顺序排列的 {"module", "self_us", "cumulative_us", "depth"} 列表
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # 表头
+        name = parts[2].rstrip()
+        entries.append({
+            "module": name.strip(),
+            "self_us": int(parts[0]),
+            "cumulative_us": int(parts[1]),
+            "depth": (len(name) - len(name.lstrip())) // 2
+        })
+    return entries
+
+
+def profile_import(module: Optional[str] = None) -> Dict[str, object]:
+    """
+    在新的解释器中导入模块并分析导入耗时
+
+    Args:
+        module: 模块名，默认使用配置中的入口模块
+
+    Returns:
+        {"module", "total_ms", "entries", "loaded"}，loaded 为导入后 sys.modules 中的模块名
+
+    Raises:
+        RuntimeError: 导入失败时抛出
+    """
+    module = module or STARTUP_CONFIG["profile_module"]
+    code = f"import sys, {module}; print('\\n'.join(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, encoding="utf-8", errors="replace"
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败: {result.stderr.strip().splitlines()[-1:]}")
+
+    entries = parse_importtime(result.stderr)
+    top = next((e for e in entries if e["module"] == module and e["depth"] == 0), None)
+    return {
+        "module": module,
+        "total_ms": top["cumulative_us"] / 1000 if top else 0.0,
+        "entries": entries,
+        "loaded": set(result.stdout.split())
+    }
+
+
+def measure_cold_start(module: Optional[str] = None, runs: int = 3) -> float:
+    """
+    多次测量冷启动导入耗时，取最小值以排除系统调度的干扰
+
+    Args:
+        module: 模块名，默认使用配置中的入口模块
+        runs: 测量次数
+
+    Returns:
+        导入耗时（毫秒）
+    """
+    return min(profile_import(module)["total_ms"] for _ in range(max(1, runs)))
+
+
+def format_profile(profile: Dict[str, object], top: int = 20) -> str:
+    """
+    格式化分析结果：按自身耗时排序的模块、总耗时以及提前加载的延迟模块
+
+    Args:
+        profile: profile_import 的返回值
+        top: 显示的模块数
+
+    Returns:
+        报告文本
+    """
+    entries = sorted(profile["entries"], key=lambda e: e["self_us"], reverse=True)[:top]
+    lines = [f"{'自身(ms)':>9} {'累计(ms)':>9}  模块"]
+    for entry in entries:
+        lines.append(f"{entry['self_us'] / 1000:>9.1f} {entry['cumulative_us'] / 1000:>9.1f}  {entry['module']}")
+
+    budget = STARTUP_CONFIG["import_budget_ms"]
+    lines.append("")
+    lines.append(f"导入 {profile['module']} 共 {profile['total_ms']:.1f}ms（上限 {budget}ms）")
+    eager = [name for name in STARTUP_CONFIG["deferred_modules"] if name in profile["loaded"]]
+    if eager:
+        lines.append(f"启动时提前加载了应延迟导入的模块: {', '.join(eager)}")
+    return "\n".join(lines)
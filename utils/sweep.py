@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+参数矩阵对比
+将提示词 × 模型 × 尺寸 × 重复次数展开为去重后的任务，按模型交错调度，
+并在结果到达时实时更新对比网格
+"""
+
+import html
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+from config.constants import API_CONFIG, SWEEP_CONFIG
+from utils.job_runner import JobTask, make_task_key
+from utils.logger import get_logger
+
+
+def expand_matrix(prompts: Sequence[str], models: Sequence[str], sizes: Sequence[str],
+                  repeats: int = 1) -> List[JobTask]:
+    """
+    展开参数矩阵并去除重复任务
+
+    相同的提示词/模型/尺寸/重复序号只会生成一个任务，任务 ID 与批量任务运行器一致。
+
+    Args:
+        prompts: 提示词列表
+        models: 模型列表
+        sizes: 尺寸列表
+        repeats: 每个组合的重复次数
+
+    Returns:
+        去重后的任务列表（按提示词、模型、尺寸、重复序号排列）
+    """
+    tasks: "OrderedDict[str, JobTask]" = OrderedDict()
+    for prompt in _unique(p.strip() for p in prompts):
+        for model in _unique(models):
+            for size in _unique(sizes):
+                key = make_task_key(prompt, model, size)
+                for repeat in range(max(1, repeats)):
+                    task_id = f"{key}-{repeat}"
+                    if task_id not in tasks:
+                        tasks[task_id] = JobTask(task_id, prompt, model, size)
+    return list(tasks.values())
+
+
+def _unique(items) -> List[str]:
+    """保持顺序去重，忽略空值"""
+    seen = set()
+    result = []
+    for item in items:
+        if item and item not in seen:
+            seen.add(item)
+            result.append(item)
+    return result
+
+
+def interleave_tasks(tasks: Sequence[JobTask]) -> List[JobTask]:
+    """
+    按模型轮流交错排列任务，使相邻的请求分散到不同模型上
+
+    Args:
+        tasks: 任务列表
+
+    Returns:
+        交错排列后的任务列表
+    """
+    buckets: "OrderedDict[str, List[JobTask]]" = OrderedDict()
+    for task in tasks:
+        buckets.setdefault(task.model, []).append(task)
+
+    queues = [list(reversed(bucket)) for bucket in buckets.values()]
+    result: List[JobTask] = []
+    while queues:
+        for bucket in list(queues):
+            result.append(bucket.pop())
+            if not bucket:
+                queues.remove(bucket)
+    return result
+
+
+class SweepGrid:
+    """对比网格：行为提示词，列为模型 × 尺寸 × 重复序号"""
+
+    def __init__(self, tasks: Sequence[JobTask], output_dir: str, refresh_interval: Optional[float] = None):
+        """
+        初始化对比网格
+
+        Args:
+            tasks: 参与对比的任务列表
+            output_dir: 输出目录，网格页面写入该目录
+            refresh_interval: 网格页面的最短重写间隔（秒）
+        """
+        self.output_dir = output_dir
+        self.refresh_interval = (SWEEP_CONFIG["grid_refresh_interval"]
+                                 if refresh_interval is None else refresh_interval)
+        self.logger = get_logger(__name__)
+        self._lock = threading.Lock()
+        self._written_at: Optional[float] = None
+        self._dirty = False
+
+        self.prompts = _unique(task.prompt for task in tasks)
+        self.columns = _unique(self._column_of(task) for task in tasks)
+        self._cells: Dict[tuple, JobTask] = {
+            (task.prompt, self._column_of(task)): task for task in tasks
+        }
+        self._results: Dict[str, Optional[str]] = {}
+
+    @staticmethod
+    def _column_of(task: JobTask) -> str:
+        """任务所在列的标识"""
+        return f"{task.model}|{task.size}|{task.repeat}"
+
+    @property
+    def html_path(self) -> str:
+        """网格页面路径"""
+        return os.path.join(self.output_dir, SWEEP_CONFIG["grid_html"])
+
+    def update(self, task: JobTask, image_path: Optional[str]) -> None:
+        """
+        记录一个结果；距上次写入超过刷新间隔或全部完成时重写网格页面，
+        避免每个结果都重写一次整个页面
+
+        Args:
+            task: 完成的任务
+            image_path: 输出图像路径，失败时为 None
+        """
+        with self._lock:
+            self._results[task.task_id] = image_path
+            self._dirty = True
+            now = time.monotonic()
+            if (self._written_at is None or now - self._written_at >= self.refresh_interval
+                    or len(self._results) >= len(self._cells)):
+                self._write_html()
+                self._written_at = now
+
+    def flush(self) -> None:
+        """写入尚未反映到网格页面的结果"""
+        with self._lock:
+            if self._dirty:
+                self._write_html()
+                self._written_at = time.monotonic()
+
+    def _write_html(self) -> None:
+        """写入网格页面（先写临时文件再替换，浏览器刷新时不会读到半个文件）"""
+        width = SWEEP_CONFIG["cell_width"]
+        header_cells = "".join(
+            "<th>{}<br>{}<br>#{}</th>".format(
+                html.escape(API_CONFIG["models"].get(model, model)),
+                html.escape(API_CONFIG["sizes"].get(size, size)),
+                int(repeat) + 1)
+            for model, size, repeat in (column.split("|") for column in self.columns)
+        )
+        rows = []
+        for prompt in self.prompts:
+            cells = []
+            for column in self.columns:
+                task = self._cells.get((prompt, column))
+                if task is None:
+                    cells.append("<td></td>")
+                elif task.task_id not in self._results:
+                    cells.append('<td class="pending">⏳</td>')
+                elif self._results[task.task_id] is None:
+                    cells.append('<td class="failed">❌</td>')
+                else:
+                    src = html.escape(os.path.relpath(self._results[task.task_id], self.output_dir))
+                    cells.append(f'<td><a href="{src}"><img src="{src}" width="{width}"></a></td>')
+            rows.append(f"<tr><th class=\"prompt\">{html.escape(prompt)}</th>{''.join(cells)}</tr>")
+
+        done = len(self._results)
+        total = len(self._cells)
+        refresh = '<meta http-equiv="refresh" content="5">' if done < total else ""
+        page = (
+            "<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+            f"{refresh}<title>Sweep {done}/{total}</title>"
+            "<style>body{font-family:sans-serif;background:#222;color:#eee}"
+            "table{border-collapse:collapse}td,th{border:1px solid #444;padding:4px;"
+            "text-align:center;vertical-align:middle}th.prompt{max-width:240px;text-align:left}"
+            "td.pending,td.failed{font-size:24px}</style></head><body>"
+            f"<h3>{done}/{total}</h3><table><tr><th></th>{header_cells}</tr>{''.join(rows)}"
+            "</table></body></html>"
+        )
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        temp_path = self.html_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(page)
+        os.replace(temp_path, self.html_path)
+        self._dirty = False
+
+    def render_contact_sheet(self, file_path: Optional[str] = None) -> Optional[str]:
+        """
+        将已完成的结果拼接为一张对比图
+
+        Args:
+            file_path: 输出路径，默认写入输出目录
+
+        Returns:
+            对比图路径，没有可用结果时返回 None
+        """
+        from PIL import Image
+
+        file_path = file_path or os.path.join(self.output_dir, SWEEP_CONFIG["grid_image"])
+        cell_width = SWEEP_CONFIG["cell_width"]
+        cell_height = int(cell_width * 1.5)
+        padding = SWEEP_CONFIG["cell_padding"]
+
+        with self._lock:
+            results = dict(self._results)
+        if not any(results.values()):
+            return None
+
+        sheet = Image.new(
+            "RGB",
+            (len(self.columns) * (cell_width + padding) + padding,
+             len(self.prompts) * (cell_height + padding) + padding),
+            (34, 34, 34)
+        )
+        for row, prompt in enumerate(self.prompts):
+            for col, column in enumerate(self.columns):
+                task = self._cells.get((prompt, column))
+                image_path = results.get(task.task_id) if task else None
+                if not image_path:
+                    continue
+                try:
+                    with Image.open(image_path) as image:
+                        image.thumbnail((cell_width, cell_height))
+                        x = padding + col * (cell_width + padding) + (cell_width - image.width) // 2
+                        y = padding + row * (cell_height + padding) + (cell_height - image.height) // 2
+                        sheet.paste(image.convert("RGB"), (x, y))
+                except Exception as e:
+                    self.logger.warning(f"对比图中跳过无法读取的图像 {image_path}: {e}")
+
+        sheet.save(file_path)
+        return file_path
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+请求链路追踪
+记录生成过程各阶段（排队、等待响应、下载、解码、缩放、界面显示）的耗时区间，
+同一次生成的区间共享一个 trace_id，可导出为 Chrome trace-event JSON，
+在 chrome://tracing 或 https://ui.perfetto.dev 中按时间线查看
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from config.constants import TRACING_CONFIG
+from utils.logger import get_logger
+from utils.metrics import write_atomic
+
+logger = get_logger(__name__)
+
+# 当前线程（或任务）所在的区间，子区间从这里继承 trace_id
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class Span:
+    """
+    一个耗时区间
+
+    用 Tracer.span() 创建的区间在同一线程内开始和结束，导出为完整事件；
+    用 Tracer.start_span() 创建的区间可以跨线程结束（如整批生成），导出为异步事件
+    """
+
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_id", "start", "end",
+                 "thread_id", "thread_name", "attributes", "detached")
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], attributes: Dict[str, Any],
+                 detached: bool = False, start: Optional[float] = None):
+        thread = threading.current_thread()
+        parent = parent if isinstance(parent, Span) else None
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent else _new_id()
+        self.span_id = _new_id()
+        self.parent_id = parent.span_id if parent else None
+        self.start = tracer.clock() if start is None else start
+        self.end: Optional[float] = None
+        self.thread_id = thread.ident
+        self.thread_name = thread.name
+        self.attributes = attributes
+        self.detached = detached
+
+    def set(self, **attributes: Any) -> None:
+        """添加或更新区间属性"""
+        self.attributes.update(attributes)
+
+    def finish(self, end: Optional[float] = None) -> None:
+        """结束区间，重复调用时忽略"""
+        if self.end is None:
+            self.end = self.tracer.clock() if end is None else end
+            self.tracer._record(self)
+
+    @property
+    def duration(self) -> Optional[float]:
+        """耗时（秒），未结束时为 None"""
+        return None if self.end is None else self.end - self.start
+
+
+class _NoopSpan:
+    """未启用追踪时返回的区间，调用方不需要判断是否启用"""
+
+    trace_id = span_id = None
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def finish(self, end: Optional[float] = None) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """区间收集器：只保留最近结束的 max_spans 个区间"""
+
+    def __init__(self, max_spans: Optional[int] = None, enabled: Optional[bool] = None,
+                 clock: Callable[[], float] = time.perf_counter):
+        """
+        初始化收集器
+
+        Args:
+            max_spans: 保留的区间数上限
+            enabled: 是否记录区间，关闭时 span() 不创建区间
+            clock: 计时函数（秒）
+        """
+        self.enabled = TRACING_CONFIG["enabled"] if enabled is None else enabled
+        self.clock = clock
+        self._origin = clock()
+        self._lock = threading.Lock()
+        self._spans: Deque[Span] = deque(maxlen=max_spans or TRACING_CONFIG["max_spans"])
+
+    @staticmethod
+    def current() -> Optional[Span]:
+        """当前上下文中的区间"""
+        return _current_span.get()
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Span:
+        """
+        开始一个可跨线程结束的区间，需要调用 finish()；不会成为当前区间（见 use()）
+
+        Args:
+            name: 区间名称
+            parent: 父区间，默认为当前区间；都没有时开始新的 trace
+            **attributes: 区间属性
+
+        Returns:
+            区间，未启用时返回不记录任何内容的区间
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, parent or self.current(), attributes, detached=True)
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Iterator[Span]:
+        """
+        记录代码块的耗时区间，代码块内创建的区间以它为父区间；抛出异常时记录 error 属性
+
+        Args:
+            name: 区间名称
+            parent: 父区间，默认为当前区间；都没有时开始新的 trace
+            **attributes: 区间属性
+
+        Yields:
+            区间，未启用时为不记录任何内容的区间
+        """
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+        span = Span(self, name, parent or self.current(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.finish()
+
+    @contextmanager
+    def use(self, span: Optional[Span]) -> Iterator[None]:
+        """在代码块内把指定区间作为当前区间（span 为 None 或未启用追踪时不做任何事）"""
+        if span is None or span is _NOOP_SPAN:
+            yield
+            return
+        token = _current_span.set(span)
+        try:
+            yield
+        finally:
+            _current_span.reset(token)
+
+    def record(self, name: str, start: float, end: Optional[float] = None, parent: Optional[Span] = None,
+               **attributes: Any) -> Span:
+        """
+        记录已经测得起止时间的区间（如排队等待），起止时间不一定在同一线程，导出为异步事件
+
+        Args:
+            name: 区间名称
+            start: 开始时间，取自 clock()
+            end: 结束时间，默认为现在
+            parent: 父区间，默认为当前区间
+            **attributes: 区间属性
+
+        Returns:
+            区间，未启用时返回不记录任何内容的区间
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        span = Span(self, name, parent or self.current(), attributes, detached=True, start=start)
+        span.finish(end)
+        return span
+
+    def _record(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    def spans(self, trace_id: Optional[str] = None) -> List[Span]:
+        """
+        获取已结束的区间
+
+        Args:
+            trace_id: 只返回该 trace 的区间，默认返回全部
+
+        Returns:
+            按开始时间排序的区间列表
+        """
+        with self._lock:
+            spans = list(self._spans)
+        if trace_id is not None:
+            spans = [span for span in spans if span.trace_id == trace_id]
+        return sorted(spans, key=lambda span: span.start)
+
+    def clear(self) -> None:
+        """清除已记录的区间"""
+        with self._lock:
+            self._spans.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._spans)
+
+    def to_chrome_trace(self, trace_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        转换为 Chrome trace-event 格式
+
+        Args:
+            trace_id: 只导出该 trace 的区间，默认导出全部
+
+        Returns:
+            {"traceEvents": [...], "displayTimeUnit": "ms"}，时间单位为微秒
+        """
+        pid = os.getpid()
+        events = []
+        threads = {}
+        for span in self.spans(trace_id):
+            args = {"trace_id": span.trace_id, "span_id": span.span_id, **span.attributes}
+            if span.parent_id:
+                args["parent_id"] = span.parent_id
+            args = {key: value if isinstance(value, (int, float, bool, type(None))) else str(value)
+                    for key, value in args.items()}
+            ts = (span.start - self._origin) * 1e6
+            base = {"name": span.name, "cat": span.name.split(".", 1)[0], "pid": pid, "tid": span.thread_id}
+            if span.detached:
+                # 跨线程的区间显示为独立的异步轨道
+                base.update(cat="async", id=span.span_id)
+                events.append({**base, "ph": "b", "ts": ts, "args": args})
+                events.append({**base, "ph": "e", "ts": (span.end - self._origin) * 1e6})
+            else:
+                events.append({**base, "ph": "X", "ts": ts, "dur": span.duration * 1e6, "args": args})
+            threads[span.thread_id] = span.thread_name
+        for thread_id, thread_name in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id,
+                           "args": {"name": thread_name}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: Optional[str] = None, trace_id: Optional[str] = None) -> bool:
+        """
+        把区间写入 Chrome trace-event JSON 文件
+
+        Args:
+            path: 文件路径，默认为 TRACING_CONFIG["trace_file"]
+            trace_id: 只导出该 trace 的区间，默认导出全部
+
+        Returns:
+            写入成功返回 True
+        """
+        try:
+            write_atomic(path or TRACING_CONFIG["trace_file"],
+                         json.dumps(self.to_chrome_trace(trace_id), ensure_ascii=False))
+            return True
+        except OSError as e:
+            logger.warning(f"导出追踪数据失败: {e}")
+            return False
+
+
+def current_trace_id() -> Optional[str]:
+    """当前上下文的 trace_id，不在任何区间内时返回 None"""
+    span = _current_span.get()
+    return span.trace_id if span else None
+
+
+# 全局区间收集器
+tracer = Tracer()